@@ -1,5 +1,5 @@
 import os
-from flask import Flask, render_template, session, redirect, url_for, flash, request
+from flask import Flask, render_template, session, redirect, url_for, flash, request, jsonify, abort
 from dotenv import load_dotenv
 
 # Load environment variables from .env (only locally)
@@ -10,6 +10,9 @@ from app.config import DevelopmentConfig, ProductionConfig
 
 # Extensions
 from app.extensions import mail, csrf
+from database import close_db, pool_stats
+from app.cli import register_commands
+from app.utils.query_metrics import init_query_metrics, render_metrics
 
 # Blueprints
 from app.routes.dashboard import dashboard_bp
@@ -19,6 +22,10 @@ from app.routes.cattle import cattle_bp
 from app.routes.breeding import breeding_bp
 from app.routes.calving import calving_bp
 from app.routes.milk import milk_bp
+from app.routes.sync import sync_bp
+from app.routes.export import export_bp
+from app.routes.imports import import_bp
+from app.routes.pedigree import pedigree_bp
 
 
 def create_app():
@@ -45,6 +52,15 @@ def create_app():
     # Register blueprints
     register_blueprints(app)
 
+    # Return the DB connection at the end of every request / app context
+    app.teardown_appcontext(close_db)
+
+    # 📈 Per-request query counts, N+1 warnings and per-route histograms
+    init_query_metrics(app)
+
+    # `flask run-job`, `flask job-history`, ...
+    register_commands(app)
+
     # Custom error handlers
     @app.errorhandler(404)
     def not_found_error(error):
@@ -59,6 +75,19 @@ def create_app():
     def health_check():
         return "OK", 200
 
+    # 🔌 Connection pool statistics for this worker
+    @app.route('/healthz/db')
+    def db_health():
+        return jsonify(pool_stats()), 200
+
+    # 📈 Prometheus scrape target (per worker; set METRICS_TOKEN to require a bearer token)
+    @app.route('/metrics')
+    def metrics():
+        token = app.config.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f"Bearer {token}":
+            abort(401)
+        return render_metrics(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
     # Optional: Debug logging for requests
     if app.config.get("DEBUG"):
         @app.before_request
@@ -76,5 +105,9 @@ def register_blueprints(app):
     app.register_blueprint(breeding_bp, url_prefix='/breeding')
     app.register_blueprint(calving_bp, url_prefix='/calving')
     app.register_blueprint(milk_bp, url_prefix='/milk')
+    app.register_blueprint(sync_bp, url_prefix='/sync')
+    app.register_blueprint(export_bp, url_prefix='/export')
+    app.register_blueprint(import_bp, url_prefix='/import')
+    app.register_blueprint(pedigree_bp, url_prefix='/pedigree')
 
 
@@ -0,0 +1,146 @@
+# cli.py — `flask <command>` entry points for out-of-process work
+import os
+import click
+from database import get_db
+from app.utils.job_runner import JOBS, run_job, recent_runs, job_lock
+from app.utils.migrations import upgrade, pending, applied_versions
+from app.utils.query_plans import verify_plans
+from app.utils.milk_rollups import rebuild_milk_rollups
+from app.utils.milk_anomalies import rebuild_yield_stats
+from app.utils.bulk_import import IMPORTS, import_records, reject_writer
+from app.utils.pedigree import rebuild_ancestry
+from app.utils.archive import archive_inactive, restore_animal
+import app.jobs  # noqa: F401  (registers jobs)
+
+
+def register_commands(app):
+
+    @app.cli.command('run-job')
+    @click.argument('name', type=click.Choice(sorted(JOBS)))
+    def run_job_command(name):
+        """Run one background job now, under its single-leader lock."""
+        if run_job(name) is None:
+            raise click.ClickException(f"{name} is already running in another process.")
+
+    @app.cli.command('job-history')
+    @click.option('--limit', default=20, show_default=True)
+    def job_history_command(limit):
+        """Show the most recent job runs."""
+        for run in recent_runs(get_db(), limit):
+            click.echo(
+                f"{run['started_at']}  {run['job_name']:<24} {run['status']:<8} "
+                f"{run['duration_ms'] or 0:>7} ms  {run['rows_touched'] or 0:>6} rows  {run['host']}"
+            )
+
+    @app.cli.command('db-upgrade')
+    def db_upgrade_command():
+        """Apply pending schema migrations (run at deploy time)."""
+        db = get_db()
+        with job_lock(db, 'migrations') as locked:
+            if not locked:
+                raise click.ClickException("Another process is applying migrations.")
+            applied = upgrade(db)
+        click.echo(f"{len(applied)} migration(s) applied." if applied else "Schema is up to date.")
+
+    @app.cli.command('db-status')
+    def db_status_command():
+        """List applied and pending migrations."""
+        db = get_db()
+        click.echo(f"Applied: {', '.join(sorted(applied_versions(db))) or 'none'}")
+        for version, name, _ in pending(db):
+            click.echo(f"Pending: {version}_{name}")
+
+    @app.cli.command('db-verify')
+    @click.option('--min-rows', default=10000, show_default=True,
+                  help="Tables with at least this many rows count as large.")
+    def db_verify_command(min_rows):
+        """EXPLAIN the hot queries; fail if any sequentially scans a large table."""
+        failures = verify_plans(get_db(), min_rows)
+        for name, table, rows in failures:
+            click.echo(f"❌ {name}: sequential scan on {table} ({rows} rows)")
+        if failures:
+            raise click.ClickException(f"{len(failures)} hot query plan(s) need an index.")
+        click.echo("✅ All hot queries use indexes.")
+
+    @app.cli.command('rebuild-milk-rollups')
+    @click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+                  help="Only re-sum from this date (default: all history).")
+    def rebuild_milk_rollups_command(since):
+        """Regenerate the daily/weekly/monthly milk rollups from milk_production."""
+        days = rebuild_milk_rollups(get_db(), since=since.date() if since else None)
+        click.echo(f"✅ Milk rollups rebuilt for {days} day(s).")
+
+    @app.cli.command('rebuild-milk-anomalies')
+    def rebuild_milk_anomalies_command():
+        """Replay milk_production into the rolling yield statistics (after imports or threshold changes)."""
+        rows = rebuild_yield_stats(get_db())
+        click.echo(f"✅ Yield statistics rebuilt for {rows} cow session(s).")
+
+    @app.cli.command('rebuild-pedigree')
+    def rebuild_pedigree_command():
+        """Recompute the ancestor closure table from the dam/sire links (after manual SQL edits)."""
+        rows = rebuild_ancestry(get_db())
+        click.echo(f"✅ Ancestry rebuilt: {rows} ancestor link(s).")
+
+    @app.cli.command('archive-inactive')
+    @click.option('--days', type=int, default=None, help="Inactive for longer than this (default: ARCHIVE_AFTER_DAYS).")
+    @click.option('--dry-run', is_flag=True, help="Only count the animals that would move.")
+    def archive_inactive_command(days, dry_run):
+        """Move long-inactive animals and all their history to the archive tables."""
+        db = get_db()
+        days = app.config['ARCHIVE_AFTER_DAYS'] if days is None else days
+        with job_lock(db, 'cold_archive') as locked:
+            if not locked:
+                raise click.ClickException("An archival run is already in progress.")
+            summary = archive_inactive(db, days, dry_run=dry_run)
+        if dry_run:
+            click.echo(f"{summary['animals']} animal(s) inactive since {summary['cutoff']} would be archived.")
+            return
+        rows = ', '.join(f"{count} {table}" for table, count in summary['rows'].items())
+        click.echo(f"✅ {summary['animals']} animal(s) archived" + (f" ({rows})." if rows else "."))
+
+    @app.cli.command('restore-animal')
+    @click.argument('cattle_id', type=int)
+    def restore_animal_command(cattle_id):
+        """Bring an archived animal, with its history, back to the hot tables."""
+        try:
+            family, rows = restore_animal(get_db(), cattle_id)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        others = [str(cid) for cid in family if cid != cattle_id]
+        click.echo(f"✅ Animal {cattle_id} restored ({', '.join(f'{n} {t}' for t, n in rows.items())})."
+                   + (f" Restored with it (family links): {', '.join(others)}." if others else ""))
+
+    @app.cli.command('import-records')
+    @click.argument('kind', type=click.Choice(sorted(IMPORTS)))
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--user', 'username', required=True, help="Username the records are attributed to.")
+    @click.option('--rejects', 'rejects_path', type=click.Path(dir_okay=False), default=None,
+                  help="Reject file (default: <path>.rejects.csv).")
+    @click.option('--batch-size', default=5000, show_default=True)
+    def import_records_command(kind, path, username, rejects_path, batch_size):
+        """Bulk-load a milk, breeding or calving CSV (validated, all-or-nothing)."""
+        db = get_db()
+        cursor = db.cursor()
+        cursor.execute("SELECT id, username FROM users WHERE username = %s", (username,))
+        user = cursor.fetchone()
+        if not user:
+            raise click.ClickException(f"No user named {username}.")
+
+        rejects_path = rejects_path or f"{path}.rejects.csv"
+
+        def progress(summary):
+            rate = summary['read'] / summary['seconds'] if summary['seconds'] else 0
+            click.echo(f"[IMPORT] {summary['read']:,} read, {summary['loaded']:,} loaded, "
+                       f"{summary['rejected']:,} rejected ({rate:,.0f} rows/s)")
+
+        with open(path, newline='', encoding='utf-8-sig') as source, \
+                open(rejects_path, 'w', newline='', encoding='utf-8') as rejects:
+            summary = import_records(db, kind, source, dict(user), rejects=reject_writer(rejects),
+                                     progress=progress, batch_size=batch_size)
+        progress(summary)
+        click.echo(f"✅ {summary['loaded']:,} {kind} record(s) imported in {summary['seconds']} s.")
+        if summary['rejected']:
+            click.echo(f"⚠️ {summary['rejected']:,} row(s) rejected; see {rejects_path}")
+        else:
+            os.remove(rejects_path)
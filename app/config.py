@@ -20,6 +20,49 @@ class Config:
     # 🛢️ Database: Overridden by environment-specific subclasses
     DATABASE = None
 
+    # 🔌 Connection pool (per gunicorn worker: keep workers × DB_POOL_MAX under the server limit)
+    DB_POOL_MIN = int(os.environ.get('DB_POOL_MIN', 1))
+    DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', 5))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))       # seconds to wait for a free connection
+    DB_POOL_PING_AFTER = float(os.environ.get('DB_POOL_PING_AFTER', 30))  # ping connections idle this long
+
+    # 🪶 Embedded SQLite backend (DATABASE_URL=path/to/file.db or sqlite:///path)
+    SQLITE_CACHE_KB = int(os.environ.get('SQLITE_CACHE_KB', 20000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+
+    # 📈 Query instrumentation and /metrics
+    QUERY_N_PLUS_ONE_THRESHOLD = int(os.environ.get('QUERY_N_PLUS_ONE_THRESHOLD', 10))  # same statement shape per request
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 500))   # log the slowest statements above this
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # 🩺 Milk yield anomaly flags (rolling per-cow, per-session statistics)
+    MILK_ANOMALY_Z = float(os.environ.get('MILK_ANOMALY_Z', 2.5))         # flag yields this many std devs from the mean
+    MILK_ANOMALY_DAYS = int(os.environ.get('MILK_ANOMALY_DAYS', 7))       # how long a flag stays on the lists
+
+    # 🧬 Pedigree and mating advice (/pedigree)
+    PEDIGREE_MAX_INBREEDING = float(os.environ.get('PEDIGREE_MAX_INBREEDING', 0.0625))  # calves above this are flagged
+
+    # 🗓️ Per-animal timelines (/cattle/<id>/timeline)
+    TIMELINE_CACHE_SIZE = int(os.environ.get('TIMELINE_CACHE_SIZE', 500))  # animals kept per process
+
+    # 📶 Offline device sync (/sync)
+    SYNC_MAX_ENTRIES = int(os.environ.get('SYNC_MAX_ENTRIES', 2000))
+    SYNC_MAX_BYTES = int(os.environ.get('SYNC_MAX_BYTES', 5 * 1024 * 1024))     # after decompression
+    SYNC_VERSION_OVERLAP = int(os.environ.get('SYNC_VERSION_OVERLAP', 100))     # events re-sent on delta downloads
+    SYNC_RECEIPT_DAYS = int(os.environ.get('SYNC_RECEIPT_DAYS', 90))            # how long retries stay idempotent
+
+    # 📥 Bulk CSV import (/import and `flask import-records`)
+    IMPORT_REJECTS_SHOWN = int(os.environ.get('IMPORT_REJECTS_SHOWN', 1000))  # rejected rows listed in the response
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 64 * 1024 * 1024))
+    REGISTRATION_MAX_ANIMALS = int(os.environ.get('REGISTRATION_MAX_ANIMALS', 1000))  # per bulk registration (/cattle/add_bulk)
+
+    # ⏰ Background jobs
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'false').lower() == 'true'  # in-process timer; the clock process runs scheduler.py
+    JOB_LOCK_DIR = os.environ.get('JOB_LOCK_DIR')  # SQLite only; defaults to the temp dir
+    HERD_SNAPSHOT_INTERVAL_DAYS = int(os.environ.get('HERD_SNAPSHOT_INTERVAL_DAYS', 7))
+    MILK_ROLLUP_REFRESH_DAYS = int(os.environ.get('MILK_ROLLUP_REFRESH_DAYS', 35))  # nightly re-sum window
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 730))  # inactive animals move to the archive tables
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
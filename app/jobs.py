@@ -0,0 +1,49 @@
+# jobs.py — batch work run by the scheduler or `flask run-job <name>`
+from datetime import date, timedelta
+from flask import current_app
+from app.utils.job_runner import job
+from app.utils.herd_history import write_snapshot
+from app.utils.milk_rollups import rebuild_milk_rollups
+from app.utils.archive import archive_inactive
+from app.utils.status_updater import update_cattle_statuses, update_due_cattle_statuses
+
+
+@job('status_check')
+def status_check(db):
+    """Daily: recompute animals whose next status transition is due."""
+    return update_due_cattle_statuses(db)['updated']
+
+
+@job('status_full_recompute')
+def status_full_recompute(db):
+    """Recompute every active animal (after imports or rule changes)."""
+    return update_cattle_statuses(db)['updated']
+
+
+@job('herd_snapshot')
+def herd_snapshot(db):
+    """Checkpoint herd state so as-of-date queries replay only recent events."""
+    return write_snapshot(db, min_interval_days=current_app.config['HERD_SNAPSHOT_INTERVAL_DAYS'])
+
+
+@job('milk_rollups')
+def milk_rollups(db):
+    """Daily: re-sum the last few weeks of milk rollups from raw records."""
+    since = date.today() - timedelta(days=current_app.config['MILK_ROLLUP_REFRESH_DAYS'])
+    return rebuild_milk_rollups(db, since=since)
+
+
+@job('sync_receipts_prune')
+def sync_receipts_prune(db):
+    """Daily: forget idempotency receipts older than SYNC_RECEIPT_DAYS."""
+    cutoff = date.today() - timedelta(days=current_app.config['SYNC_RECEIPT_DAYS'])
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM sync_receipts WHERE received_at < %s", (cutoff,))
+    db.commit()
+    return cursor.rowcount
+
+
+@job('cold_archive')
+def cold_archive(db):
+    """Daily: move animals inactive longer than ARCHIVE_AFTER_DAYS, with their history, to the archive tables."""
+    return archive_inactive(db, current_app.config['ARCHIVE_AFTER_DAYS'])['animals']
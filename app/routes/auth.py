@@ -5,7 +5,6 @@ from database import get_db, get_cursor
 from datetime import datetime, timedelta
 import secrets
 from app.extensions import mail
-from app.utils.status_updater import update_cattle_statuses
 from app.utils.decorators import login_required
 
 auth_bp = Blueprint('auth', __name__)
@@ -32,8 +31,6 @@ def login():
                 'role': user['role']
             })
 
-            update_cattle_statuses(db)
-
             required_fields = [
                 user.get('first_name'), user.get('last_name'), user.get('age'),
                 user.get('national_id'), user.get('address'),
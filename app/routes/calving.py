@@ -1,8 +1,10 @@
 from flask import Blueprint, render_template, request, redirect, flash, session, url_for
-from datetime import datetime
 from database import get_db, get_cursor
 from app.utils.decorators import login_required, admin_required
-from app.utils.status_updater import update_cattle_statuses
+from app.utils.status_updater import mark_status_dirty, flush_status_dirty
+from app.utils.herd_records import eligible_dam, insert_calving
+from app.utils.herd_history import record_event
+from app.utils.herd_index import herd_index
 
 calving_bp = Blueprint('calving', __name__, url_prefix='/calving')
 
@@ -24,16 +26,8 @@ def calving_list():
     """)
     records = cursor.fetchall()
 
-    # Fetch eligible dams for modal dropdown
-    cursor.execute("""
-        SELECT DISTINCT ca.cattle_id, ca.tag_number, ca.name
-        FROM cattle ca
-        JOIN breeding_records b ON ca.cattle_id = b.cattle_id
-        WHERE b.steaming_date <= CURRENT_DATE
-          AND ca.is_active = TRUE
-        ORDER BY ca.tag_number
-    """)
-    eligible_dams = cursor.fetchall()
+    # Eligible dams for the modal dropdown, from the in-memory herd index
+    eligible_dams = herd_index(get_db()).eligible_dams()
 
     return render_template('calving/calving_list.html', records=records, eligible_dams=eligible_dams)
 
@@ -46,81 +40,22 @@ def add_calving():
 
     if request.method == 'POST':
         dam_id = request.form.get('dam_id')
-        calf_name = request.form.get('calf_name')
-        calf_sex = request.form.get('calf_sex')
-        birth_date = request.form.get('birth_date')
-        breed = request.form.get('breed')
-        calf_condition = request.form.get('calf_condition')
-        notes = request.form.get('notes')
-
-        # Validate dam
-        cursor.execute("""
-            SELECT ca.tag_number, ca.name
-            FROM cattle ca
-            JOIN breeding_records b ON ca.cattle_id = b.cattle_id
-            WHERE ca.cattle_id = %s AND b.steaming_date IS NOT NULL
-              AND b.steaming_date <= CURRENT_DATE
-              AND ca.is_active = TRUE
-            ORDER BY b.breeding_date DESC
-            LIMIT 1
-        """, (dam_id,))
-        dam = cursor.fetchone()
-
+        dam = eligible_dam(cursor, dam_id)
         if not dam:
             flash('Selected dam is not eligible for calving (must have a breeding record and be past steaming date).', 'danger')
             return redirect(url_for('calving.calving_list'))
 
-        dam_tag_number = dam.get('tag_number')
-        dam_name = dam.get('name')
-        recorded_by = session.get('username', 'unknown')
-
-        # Insert into calving table
-        cursor.execute("""
-            INSERT INTO calving (
-                dam_id, dam_tag_number, dam_name, calf_name, calf_sex,
-                birth_date, breed, calf_condition, notes, recorded_by
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING calving_id
-        """, (dam_id, dam_tag_number, dam_name, calf_name, calf_sex, birth_date,
-              breed, calf_condition, notes, recorded_by))
-
-        # Generate unique calf tag
-        tag_prefix = 'CLF'
-        cursor.execute("""
-            SELECT MAX(CAST(SUBSTRING(tag_number FROM '[0-9]+') AS INTEGER))
-            FROM cattle WHERE tag_number LIKE %s
-        """, (f'{tag_prefix}%',))
-        row = cursor.fetchone()
-        max_tag = row[0] if row and row[0] is not None else 0
-        next_tag_number = f"{tag_prefix}{(max_tag + 1) if max_tag else 1:04}"
-
-        # Insert calf into cattle table
-        cursor.execute("""
-            INSERT INTO cattle (
-                tag_number, name, sex, birth_date, breed,
-                status_category, status, is_active, remark, recorded_by
-            )
-            VALUES (%s, %s, %s, %s, %s,
-                    'young stock', 'newborn calf', TRUE, 'active', %s)
-        """, (next_tag_number, calf_name, calf_sex, birth_date, breed, recorded_by))
-
+        calving_id, calf_id, next_tag_number = insert_calving(
+            cursor, request.form, dam, session.get('username', 'unknown'))
+        mark_status_dirty(dam_id, calf_id)
+        flush_status_dirty(db)
         db.commit()
-        update_cattle_statuses(db)
 
         flash(f'Calving record added. New calf tag: {next_tag_number}', 'success')
         return redirect(url_for('calving.calving_list'))
 
     # GET method: show form
-    cursor.execute("""
-        SELECT DISTINCT ca.cattle_id, ca.tag_number, ca.name
-        FROM cattle ca
-        JOIN breeding_records b ON ca.cattle_id = b.cattle_id
-        WHERE b.steaming_date <= CURRENT_DATE
-          AND ca.is_active = TRUE
-        ORDER BY ca.tag_number
-    """)
-    eligible_dams = cursor.fetchall()
+    eligible_dams = herd_index(db).eligible_dams()
     return render_template('calving/calving_form.html', eligible_dams=eligible_dams)
 
 
@@ -136,7 +71,12 @@ def soft_delete_calving(calving_id):
         UPDATE calving
         SET is_active = FALSE, remark = %s
         WHERE calving_id = %s
+        RETURNING dam_id
     """, (remark, calving_id))
+    for row in cursor.fetchall():
+        record_event(cursor, row['dam_id'], 'calving_deleted', details={'calving_id': calving_id, 'remark': remark})
+        mark_status_dirty(row['dam_id'])
+    flush_status_dirty(db)
     db.commit()
     flash('Calving record archived.', 'info')
     return redirect(url_for('calving.calving_list'))
@@ -149,7 +89,11 @@ def hard_delete_calving(calving_id):
     db = get_db()
     cursor = get_cursor()
 
-    cursor.execute("DELETE FROM calving WHERE calving_id = %s", (calving_id,))
+    cursor.execute("DELETE FROM calving WHERE calving_id = %s RETURNING dam_id", (calving_id,))
+    for row in cursor.fetchall():
+        record_event(cursor, row['dam_id'], 'calving_deleted', details={'calving_id': calving_id, 'hard': True})
+        mark_status_dirty(row['dam_id'])
+    flush_status_dirty(db)
     db.commit()
     flash('Calving record permanently deleted.', 'danger')
     return redirect(url_for('calving.calving_list'))
@@ -1,13 +1,27 @@
 # ✅ cattle.py (Updated with pagination, filtering, admin control, and status logic)
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from datetime import datetime, date
+import io
+from itertools import zip_longest
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, make_response, current_app
+from werkzeug.http import is_resource_modified
+from datetime import date
 from database import get_db, get_cursor
-from app.utils.status_updater import update_cattle_statuses
-from app.utils.status_logic import determine_initial_status
+from app.utils.status_updater import mark_status_dirty, flush_status_dirty
+from app.utils.herd_history import record_event
+from app.utils.herd_records import register_cattle
+from app.utils.status_logic import initial_statuses
+from app.utils.bulk_import import REGISTRATION_FIELDS, RowError, registration, read_registrations
 from app.utils.decorators import login_required, admin_required
+from app.utils.pagination import keyset_page, cached_count
+from app.utils.search import search_filter
+from app.utils.herd_index import herd_index, TYPEAHEAD_LIMIT, TYPEAHEAD_MAX
+from app.utils.timeline import animal_timeline
 
 cattle_bp = Blueprint('cattle', __name__, url_prefix='/cattle')
 
+# ✅ Cattle list base query, narrowed by the page's filters and paged on cattle_id
+CATTLE_LIST_QUERY = "SELECT * FROM cattle WHERE is_active = TRUE"
+CATTLE_LIST_KEYS = [('cattle_id', 'cattle_id')]
+
 
 # ✅ List Cattle (with pagination, filtering)
 @cattle_bp.route('/')
@@ -16,21 +30,19 @@ def cattle_list():
     db = get_db()
     cursor = get_cursor()
 
-    page = int(request.args.get('page', 1))
     per_page = 10
-    offset = (page - 1) * per_page
 
     search = request.args.get('search', '').strip()
     sex = request.args.get('sex')
     status_category = request.args.get('status_category')
 
-    query = "SELECT * FROM cattle WHERE is_active = TRUE"
+    query = CATTLE_LIST_QUERY
     params = []
 
     if search:
-        query += " AND (LOWER(name) LIKE %s OR LOWER(tag_number) LIKE %s OR LOWER(breed) LIKE %s)"
-        keyword = f"%{search.lower()}%"
-        params += [keyword, keyword, keyword]
+        clause, search_params = search_filter(cursor, 'cattle', search)
+        query += f" AND {clause}"
+        params += search_params
 
     if sex:
         query += " AND sex = %s"
@@ -40,106 +52,130 @@ def cattle_list():
         query += " AND status_category = %s"
         params.append(status_category)
 
-    count_query = f"SELECT COUNT(*) AS total FROM ({query}) AS filtered"
-    cursor.execute(count_query, params)
-    count_row = cursor.fetchone()
-    total_records = count_row['total'] if count_row else 0
-    total_pages = (total_records + per_page - 1) // per_page
-
-    query += " ORDER BY cattle_id DESC LIMIT %s OFFSET %s"
-    params += [per_page, offset]
-    cursor.execute(query, params)
-    cattle = cursor.fetchall()
+    # ✅ Seek past the last cattle_id seen; the total is only counted on request
+    page = keyset_page(cursor, query, params, CATTLE_LIST_KEYS, per_page,
+                       after=request.args.get('after'), before=request.args.get('before'))
+    if request.args.get('count'):
+        page.total = cached_count(cursor, query, params)
 
     return render_template('cattle/cattle_list.html',
-        cattle=cattle,
-        current_page=page,
-        total_pages=total_pages
+        cattle=page.items,
+        page=page
     )
 
 
+# ✅ Typeahead: active animals whose tag number or name starts with ?q= (served from memory)
+@cattle_bp.route('/typeahead')
+@login_required
+def cattle_typeahead():
+    prefix = request.args.get('q', '').strip()
+    limit = request.args.get('limit', str(TYPEAHEAD_LIMIT))
+    if not limit.isdigit():
+        return jsonify({'error': 'limit must be a number'}), 400
+    if not prefix:
+        return jsonify([])
+    matches = herd_index(get_db()).prefix(prefix, max(1, min(int(limit), TYPEAHEAD_MAX)))
+    return jsonify([{'cattle_id': a.cattle_id, 'tag_number': a.tag_number, 'name': a.name} for a in matches])
+
+
+# ✅ Timeline: one animal's breedings, calvings, status changes and monthly milk, newest first
+@cattle_bp.route('/<int:cattle_id>/timeline')
+@login_required
+def cattle_timeline(cattle_id):
+    """Served from a per-animal cache that any write to the animal invalidates;
+    the ETag lets a client flipping back to a cow revalidate with a 304."""
+    etag, timeline = animal_timeline(get_cursor(), cattle_id)
+    if timeline is None:
+        return jsonify({'error': 'animal not found'}), 404
+    if not is_resource_modified(request.environ, etag=etag):
+        response = make_response('', 304)
+    else:
+        response = jsonify(timeline)
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
 # ✅ Add Cattle
 @cattle_bp.route('/add', methods=['POST'])
 @login_required
 def add_cattle():
-    db = get_db()
-    cursor = get_cursor()
-
-    name = request.form['name']
-    breed = request.form['breed']
-    birth_date_str = request.form['birth_date']
-    sex = request.form.get('sex').lower()
-    remark = request.form['remark']
-
-    # Validate and parse birth date
     try:
-        birth_date = datetime.strptime(birth_date_str, '%Y-%m-%d').date()
-    except ValueError:
-        flash("Invalid birth date format", "danger")
+        animal = registration(request.form, date.today())
+    except RowError as e:
+        flash(f"Invalid entry: {e}", "danger")
         return redirect(url_for('cattle.cattle_list'))
+    return _register([(None, animal)])
 
-    # Generate tag number
-    today = datetime.today()
-    prefix = "TNF"
-    month = today.strftime('%m')
-    year = today.strftime('%Y')
-
-    cursor.execute("SELECT tag_number FROM cattle WHERE tag_number LIKE 'TNF%' ORDER BY cattle_id DESC LIMIT 1")
-    latest_tag = cursor.fetchone()
 
-    if latest_tag:
-        last_number = int(latest_tag['tag_number'].split('/')[0][3:])
-        next_number = last_number + 1
+# ✅ Bulk registration: a CSV upload (`file`) or repeated form rows, in one transaction
+@cattle_bp.route('/add_bulk', methods=['POST'])
+@login_required
+def add_cattle_bulk():
+    """CSV columns (or repeated form fields): name, breed, birth_date, sex,
+    status_category, status, remark. Status choices are only needed for
+    females over 10 months. Either every row is registered or none is."""
+    upload = request.files.get('file')
+    label = 'Line' if upload else 'Row'
+    if upload:
+        try:
+            animals, errors = read_registrations(io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline=''))
+        except UnicodeDecodeError:
+            flash("The file must be UTF-8 CSV.", "danger")
+            return redirect(url_for('cattle.cattle_list'))
+    else:
+        animals, errors = [], []
+        columns = [request.form.getlist(field) for field in REGISTRATION_FIELDS]
+        for row_number, values in enumerate(zip_longest(*columns, fillvalue=''), start=1):
+            row = dict(zip(REGISTRATION_FIELDS, values))
+            if not any(value.strip() for value in values):
+                continue  # blank row left on the form
+            try:
+                animals.append((row_number, registration(row, date.today())))
+            except RowError as e:
+                errors.append((row_number, str(e)))
+
+    limit = current_app.config['REGISTRATION_MAX_ANIMALS']
+    if len(animals) + len(errors) > limit:
+        flash(f"At most {limit} animals can be registered at once.", "danger")
+    elif errors:
+        _, status_errors = initial_statuses([animal for _, animal in animals])
+        _flash_errors(sorted(errors + [(animals[i][0], error) for i, error in status_errors]), label)
+    elif not animals:
+        flash("No animals to register.", "warning")
     else:
-        next_number = 1
+        return _register(animals, label)
+    return redirect(url_for('cattle.cattle_list'))
 
-    tag_number = f"{prefix}{str(next_number).zfill(4)}/{month}/{year}"
 
-    # Determine status and category
-    age_months = (date.today().year - birth_date.year) * 12 + (date.today().month - birth_date.month)
+def _flash_errors(errors, label='Row', shown=10):
+    for row_number, error in errors[:shown]:
+        flash(f"{label} {row_number}: {error}" if row_number else error, "danger")
+    if len(errors) > shown:
+        flash(f"...and {len(errors) - shown} more row(s) with errors. Nothing was registered.", "danger")
 
-    if sex == 'female':
-        if age_months <= 10:
-            status_category, status = determine_initial_status(sex, birth_date)
-        else:
-            # Expect user selection for 11+ month old females
-            status_category = request.form.get('status_category')
-            if status_category == 'young_stock':
-                status = 'bullying heifer'
-            elif status_category == 'mature_stock':
-                status = request.form.get('status')
-                if not status:
-                    flash("Please select a valid status for mature stock cattle.", "danger")
-                    return redirect(url_for('cattle.cattle_list'))
-            else:
-                flash("Invalid or missing status category for female cattle over 10 months old.", "danger")
-                return redirect(url_for('cattle.cattle_list'))
-
-    elif sex == 'male':
-        status_category, status = determine_initial_status(sex, birth_date)
-        if not status_category or not status:
-            flash("Unable to determine status for male cattle.", "danger")
-            return redirect(url_for('cattle.cattle_list'))
 
-    else:
-        flash("Invalid sex value.", "danger")
-        return redirect(url_for('cattle.cattle_list'))
-
-    # Insert into database
+def _register(numbered, label='Row'):
+    """Register [(row_number, registration)]: one tag block, one insert, one status flush."""
+    db = get_db()
+    cursor = get_cursor()
+    # The tags are reserved in the same transaction
     try:
-        cursor.execute('''
-            INSERT INTO cattle (
-               name, tag_number, breed, birth_date, sex,
-                status_category, status, recorded_by, is_active, remark
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, TRUE, %s)
-        ''', (
-            name, tag_number, breed, birth_date, sex.upper(),
-            status_category, status, session['user_id'], remark
-        ))
+        registered, errors = register_cattle(cursor, [animal for _, animal in numbered], session['user_id'])
+        if errors:
+            db.rollback()
+            _flash_errors([(numbered[i][0], error) for i, error in errors], label)
+            return redirect(url_for('cattle.cattle_list'))
+        mark_status_dirty(*(cattle_id for cattle_id, _ in registered))
+        flush_status_dirty(db)
         db.commit()
-        update_cattle_statuses(db)
-        flash(f"Cattle added successfully. Tag Number: {tag_number}", "success")
+        if len(registered) == 1:
+            flash(f"Cattle added successfully. Tag Number: {registered[0][1]}", "success")
+        else:
+            flash(f"{len(registered)} cattle added. Tag Numbers: {registered[0][1]} to {registered[-1][1]}", "success")
     except Exception as e:
+        db.rollback()  # releases the tag counter lock
         flash(f"Error adding cattle: {e}", "danger")
 
     return redirect(url_for('cattle.cattle_list'))
@@ -169,6 +205,9 @@ def edit_cattle(cattle_id):
                 status_category=%s, status=%s, remark=%s
             WHERE cattle_id=%s
         ''', (name, breed, birth_date, sex, status_category, status, remark, cattle_id))
+        record_event(cursor, cattle_id, 'updated', status_category=status_category, status=status)
+        mark_status_dirty(cattle_id)
+        flush_status_dirty(db)
         db.commit()
         flash("Cattle updated successfully", "success")
         return redirect(url_for('cattle.cattle_list'))
@@ -188,6 +227,7 @@ def delete_cattle(cattle_id):
 
     if request.method == 'POST':
         cursor.execute("UPDATE cattle SET is_active = FALSE, remark = 'deleted' WHERE cattle_id = %s", (cattle_id,))
+        record_event(cursor, cattle_id, 'archived', is_active=False, details={'remark': 'deleted'})
         db.commit()
         flash("Cattle deleted successfully", "success")
         return redirect(url_for('cattle.cattle_list'))
@@ -208,6 +248,7 @@ def archive_cattle():
     cattle_id = request.form.get('cattle_id')
     remark = request.form.get('remark')
     cursor.execute("UPDATE cattle SET is_active = FALSE, remark = %s WHERE cattle_id = %s", (remark, cattle_id))
+    record_event(cursor, cattle_id, 'archived', is_active=False, details={'remark': remark})
     db.commit()
     flash("Cattle archived as: " + remark, "success")
     return redirect(url_for('cattle.cattle_list'))
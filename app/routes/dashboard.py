@@ -1,6 +1,9 @@
-from flask import Blueprint, render_template, session, redirect, url_for, flash, request
-from database import get_cursor
+from flask import Blueprint, render_template, session, redirect, url_for, flash, request, jsonify
+from datetime import datetime, date
+from database import get_db, get_cursor
 from app.utils.decorators import login_required
+from app.utils.herd_history import herd_composition_as_of
+from app.utils.milk_anomalies import flagged_cows
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -44,19 +47,34 @@ def dashboard():
         row = cursor.fetchone()
         stats['recent_calvings'] = row['total'] if row else 0
 
-        # Total milk records
-        cursor.execute("SELECT COUNT(*) AS total FROM milk_production")
+        # Total milk records (from the monthly rollup)
+        cursor.execute("SELECT COALESCE(SUM(records), 0) AS total FROM milk_rollup_monthly")
         row = cursor.fetchone()
         stats['total_milk_records'] = row['total'] if row else 0
 
         # Total breeding records
-        cursor.execute("SELECT COUNT(*) AS total FROM breeding_records")
+        cursor.execute("SELECT COUNT(*) AS total FROM breeding_records_all")
         row = cursor.fetchone()
         stats['total_breeding'] = row['total'] if row else 0
 
-        # Total calvings (all time)
-        cursor.execute("SELECT COUNT(*) AS total FROM calving WHERE is_active = TRUE")
+        # Total calvings (all time, archived animals included)
+        cursor.execute("SELECT COUNT(*) AS total FROM calving_all WHERE is_active = TRUE")
         row = cursor.fetchone()
         stats['total_calvings'] = row['total'] if row else 0
 
-    return render_template('dashboard/dashboard.html', stats=stats)
+        # Cows with an unusual milk yield recently
+        yield_anomalies = flagged_cows(cursor, date.today())
+
+    return render_template('dashboard/dashboard.html', stats=stats, yield_anomalies=yield_anomalies)
+
+
+# 🕰️ Herd composition on a past date (snapshot + event replay)
+@dashboard_bp.route('/dashboard/herd_composition')
+@login_required
+def herd_composition():
+    as_of = request.args.get('as_of')
+    try:
+        as_of = datetime.strptime(as_of, '%Y-%m-%d').date() if as_of else date.today()
+    except ValueError:
+        return jsonify({'error': 'as_of must be YYYY-MM-DD'}), 400
+    return jsonify(herd_composition_as_of(get_db(), as_of))
@@ -0,0 +1,121 @@
+from datetime import date, datetime
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from database import get_stream_cursor
+from app.utils.decorators import login_required
+from app.utils.csv_export import csv_chunks, stream_rows
+
+export_bp = Blueprint('export', __name__)
+
+# Each export: its SELECT (with a {where} slot; the *_all views add archived animals' rows), the header row (in SELECT order), the date
+# column that start/end filter on, and the optional exact-match filters it accepts.
+EXPORTS = {
+    'milk': {
+        'query': """
+            SELECT mp.id, mp.date, mp.cattle_id, c.tag_number, c.name AS cattle_name,
+                   mp.morning_milk, mp.mid_day_milk, mp.evening_milk,
+                   COALESCE(mp.morning_milk, 0) + COALESCE(mp.mid_day_milk, 0)
+                       + COALESCE(mp.evening_milk, 0) AS total_milk,
+                   mp.notes, u.username AS recorded_by
+            FROM milk_production_all mp
+            JOIN cattle_all c ON c.cattle_id = mp.cattle_id
+            LEFT JOIN users u ON u.id = mp.recorded_by
+            WHERE {where}
+            ORDER BY mp.date, mp.id
+        """,
+        'columns': ['id', 'date', 'cattle_id', 'tag_number', 'cattle_name', 'morning_milk',
+                    'mid_day_milk', 'evening_milk', 'total_milk', 'notes', 'recorded_by'],
+        'date_column': 'mp.date',
+        'filters': {'cattle_id': 'mp.cattle_id', 'tag_number': 'c.tag_number'},
+        'default': 'TRUE',
+    },
+    'breeding': {
+        'query': """
+            SELECT b.id, b.breeding_date, b.cattle_id, c.tag_number, c.name AS cattle_name,
+                   b.method, b.semen_type, b.semen_price, b.semen_batch_number, b.sire_name,
+                   b.breeding_attempt_number, b.steaming_date, b.expected_calving_date,
+                   b.pregnancy_check_date, b.pregnancy_test_result, b.breeding_outcome,
+                   b.notes, b.remark, u.username AS recorded_by, b.created_at
+            FROM breeding_records_all b
+            JOIN cattle_all c ON c.cattle_id = b.cattle_id
+            LEFT JOIN users u ON u.id = b.recorded_by
+            WHERE {where}
+            ORDER BY b.breeding_date, b.id
+        """,
+        'columns': ['id', 'breeding_date', 'cattle_id', 'tag_number', 'cattle_name', 'method',
+                    'semen_type', 'semen_price', 'semen_batch_number', 'sire_name',
+                    'breeding_attempt_number', 'steaming_date', 'expected_calving_date',
+                    'pregnancy_check_date', 'pregnancy_test_result', 'breeding_outcome',
+                    'notes', 'remark', 'recorded_by', 'created_at'],
+        'date_column': 'b.breeding_date',
+        'filters': {'cattle_id': 'b.cattle_id', 'tag_number': 'c.tag_number', 'method': 'b.method',
+                    'pregnancy_test_result': 'b.pregnancy_test_result'},
+        'default': "b.remark IS DISTINCT FROM 'deleted'",
+    },
+    'calving': {
+        'query': """
+            SELECT cv.calving_id, cv.birth_date, cv.dam_id, cv.dam_tag_number, cv.dam_name,
+                   cv.calf_name, cv.calf_sex, cv.breed, cv.calf_condition, cv.notes,
+                   cv.recorded_by, cv.is_active, cv.remark, cv.created_at
+            FROM calving_all cv
+            WHERE {where}
+            ORDER BY cv.birth_date, cv.calving_id
+        """,
+        'columns': ['calving_id', 'birth_date', 'dam_id', 'dam_tag_number', 'dam_name', 'calf_name',
+                    'calf_sex', 'breed', 'calf_condition', 'notes', 'recorded_by', 'is_active',
+                    'remark', 'created_at'],
+        'date_column': 'cv.birth_date',
+        'filters': {'cattle_id': 'cv.dam_id', 'tag_number': 'cv.dam_tag_number', 'calf_sex': 'cv.calf_sex'},
+        'default': 'cv.is_active = TRUE',
+    },
+}
+
+
+def _parse_day(name):
+    value = request.args.get(name)
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+
+# ✅ Stream records as CSV (or .csv.gz with ?gzip=1)
+@export_bp.route('/<dataset>.csv')
+@login_required
+def export_csv(dataset):
+    """Filters: start, end (YYYY-MM-DD, inclusive), plus the dataset's exact-match
+    filters; ?all=1 includes deleted breeding records and archived calvings.
+    Rows are read through a server-side cursor and written as they arrive."""
+    spec = EXPORTS.get(dataset)
+    if spec is None:
+        return jsonify({'error': f"unknown export; choose one of {', '.join(EXPORTS)}"}), 404
+    try:
+        start, end = _parse_day('start'), _parse_day('end')
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD'}), 400
+    if not request.args.get('cattle_id', '0').isdigit():
+        return jsonify({'error': 'cattle_id must be a number'}), 400
+
+    where, params = [], []
+    if request.args.get('all') != '1':
+        where.append(spec['default'])
+    if start:
+        where.append(f"{spec['date_column']} >= %s")
+        params.append(start)
+    if end:
+        where.append(f"{spec['date_column']} <= %s")
+        params.append(end)
+    for arg, column in spec['filters'].items():
+        value = request.args.get(arg)
+        if value:
+            where.append(f"{column} = %s")
+            params.append(int(value) if arg == 'cattle_id' else value)
+    query = spec['query'].format(where=' AND '.join(where) or 'TRUE')
+
+    compress = request.args.get('gzip') == '1'
+    filename = f"{dataset}_{start or 'all'}_{end or date.today()}.csv" + ('.gz' if compress else '')
+    cursor = get_stream_cursor(f'export_{dataset}')
+    body = csv_chunks(spec['columns'], stream_rows(cursor, query, params), compress=compress)
+
+    response = Response(stream_with_context(body),
+                        mimetype='application/gzip' if compress else 'text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['X-Accel-Buffering'] = 'no'  # let proxies pass chunks through
+    response.headers['Cache-Control'] = 'no-store'
+    return response
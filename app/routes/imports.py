@@ -0,0 +1,44 @@
+import io
+from flask import Blueprint, request, jsonify, session, current_app
+from database import get_db
+from app.utils.decorators import login_required, admin_required
+from app.utils.bulk_import import IMPORTS, import_records
+
+import_bp = Blueprint('imports', __name__)
+
+
+# ✅ Bulk-load a CSV of historical records
+@import_bp.route('/<kind>', methods=['POST'])
+@login_required
+@admin_required
+def import_csv(kind):
+    """Multipart upload with a `file` field (send the csrf-token as X-CSRFToken).
+
+    Valid rows are loaded in one transaction; the response lists the rejected
+    rows (line, error) up to IMPORT_REJECTS_SHOWN. Large files load faster
+    through `flask import-records`.
+    """
+    if kind not in IMPORTS:
+        return jsonify({'error': f"unknown import; choose one of {', '.join(IMPORTS)}"}), 404
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'error': 'attach the CSV as the "file" field'}), 400
+
+    shown = current_app.config['IMPORT_REJECTS_SHOWN']
+    rejected = []
+
+    def rejects(line, error, row):
+        if len(rejected) < shown:
+            rejected.append({'line': line, 'error': error})
+
+    def progress(summary):
+        print(f"[IMPORT] {kind}: {summary['read']} read, {summary['loaded']} loaded, "
+              f"{summary['rejected']} rejected")
+
+    source = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    try:
+        summary = import_records(get_db(), kind, source, {'id': session['user_id'], 'username': session.get('username')},
+                                 rejects=rejects, progress=progress)
+    except UnicodeDecodeError:
+        return jsonify({'error': 'the file must be UTF-8 CSV'}), 400
+    return jsonify(dict(summary, rejects=rejected)), 200
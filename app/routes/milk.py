@@ -1,27 +1,71 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from datetime import date as dt_date
+import math
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, make_response
+from werkzeug.http import is_resource_modified
+from datetime import date as dt_date, timedelta
 from database import get_db, get_cursor
 from app.utils.decorators import login_required, admin_required
-from app.utils.status_updater import update_cattle_statuses
+from app.utils.milk_sessions import SESSION_FIELDS, parse_quantity, upsert_session, active_cattle_ids
+from app.utils.pagination import keyset_page, cached_count
+from app.utils.milk_rollups import refresh_milk_rollups, recent_totals, month_start
+from app.utils.timeseries import DEFAULT_POINTS, MAX_POINTS, series_version, daily_yield, downsample
+from app.utils.lactation import herd_lactations
+from app.utils.milk_anomalies import update_yield_stats, forget_yields, flagged_cows
+from app.utils.search import search_filter
+from app.utils.herd_index import herd_index, MILKING_STATUSES
+from app.utils.status_engine import to_date
 from datetime import datetime  # ✅ add at the top if not already present
 
 
 milk_bp = Blueprint('milk', __name__)
 
+# ✅ Milk list base query; `filters` is the page's extra WHERE conditions. Latest
+# calving/breeding are looked up per row (index seeks) instead of grouping the
+# whole calving and breeding tables.
+MILK_LIST_QUERY = '''
+    SELECT
+        mp.id,
+        mp.date,
+        mp.cattle_id,
+        c.tag_number,
+        c.name AS cattle_name,
+        c.status,
+        c.status_category,
+        mp.morning_milk,
+        mp.mid_day_milk,
+        mp.evening_milk,
+        u.username AS recorded_by,
+        mp.notes,
+        (
+            SELECT MAX(cv.birth_date) FROM calving cv
+            WHERE cv.dam_id = c.cattle_id AND cv.is_active = TRUE
+        ) AS latest_calving_date
+    FROM milk_production mp
+    JOIN cattle c ON mp.cattle_id = c.cattle_id
+    LEFT JOIN users u ON mp.recorded_by = u.id
+    WHERE
+        c.status IN ('lactating', 'lactating in_calf')
+        AND (
+            c.status != 'lactating in_calf' OR
+            CURRENT_DATE <= (
+                SELECT MAX(b.breeding_date) FROM breeding_records b WHERE b.cattle_id = c.cattle_id
+            ) + INTERVAL '7 months'
+        )
+        AND {filters}
+'''
+MILK_LIST_KEYS = [('mp.date', 'date'), ('mp.id', 'id')]
+
+
 @milk_bp.route('/milk', methods=['GET', 'POST'])
 @login_required
 def milk_list():
     db = get_db()
     cursor = get_cursor()
-    update_cattle_statuses(db)
 
     search_query = request.args.get('search', '')
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
 
-    page = int(request.args.get('page', 1))
     per_page = 10
-    offset = (page - 1) * per_page
 
     # ✅ Prepare filters
     where_clauses = ["c.is_active = TRUE"]
@@ -36,131 +80,52 @@ def milk_list():
         params.append(end_date)
 
     if search_query:
-        where_clauses.append("(c.name ILIKE %s OR u.username ILIKE %s)")
-        params.extend([f"%{search_query}%", f"%{search_query}%"])
-
-    where_sql = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
-    
-    # Sanitize where_sql: remove leading WHERE if accidentally included
-    if where_sql.strip().lower().startswith("where "):
-        where_sql = where_sql.strip()[6:]
-
-    # ✅ Base query with filters
-    base_query = f'''
-        SELECT 
-            mp.id,
-            mp.date,
-            mp.cattle_id,
-            c.tag_number,
-            c.name AS cattle_name,
-            c.status,
-            c.status_category,
-            mp.morning_milk,
-            mp.mid_day_milk,
-            mp.evening_milk,
-            u.username AS recorded_by,
-            mp.notes,
-            lc.latest_calving_date
-        FROM milk_production mp
-        JOIN cattle c ON mp.cattle_id = c.cattle_id
-        LEFT JOIN users u ON mp.recorded_by = u.id
-
-        -- Latest calving date per cow
-        LEFT JOIN (
-            SELECT 
-                dam_id, 
-                MAX(birth_date) AS latest_calving_date
-            FROM calving
-            WHERE is_active = TRUE
-            GROUP BY dam_id
-        ) lc ON lc.dam_id = c.cattle_id
-
-        -- Latest breeding date per cow
-        LEFT JOIN (
-            SELECT 
-                cattle_id,
-                MAX(breeding_date) AS latest_breeding_date
-            FROM breeding_records
-           
-            GROUP BY cattle_id
-        ) lb ON lb.cattle_id = c.cattle_id
-
-        WHERE 
-            c.status IN ('lactating', 'lactating in_calf')
-            AND (
-                c.status != 'lactating in_calf' OR
-                (
-                    lb.latest_breeding_date IS NOT NULL AND 
-                    CURRENT_DATE <= lb.latest_breeding_date + INTERVAL '7 months'
-                )
-            )
-            AND c.is_active = TRUE
-            {f"AND {where_sql}" if where_sql else ""}
-        ORDER BY 
-            lc.latest_calving_date DESC NULLS LAST,
-            mp.date DESC,
-            mp.id DESC
-    '''
-
-
-
-    # ✅ Count total matching records for pagination
-    count_query = f"SELECT COUNT(*) AS total FROM ({base_query}) AS count_query"
-    cursor.execute(count_query, params)
-    total_records = cursor.fetchone()['total']
-
-    # ✅ Apply pagination
-    paginated_query = base_query + " LIMIT %s OFFSET %s"
-    cursor.execute(paginated_query, params + [per_page, offset])
-    records = cursor.fetchall()
-
-    total_pages = (total_records + per_page - 1) // per_page
-
-    # ✅ Get all active cattle
-    cursor.execute("""
-        SELECT cattle_id, name, status, status_category
-        FROM cattle
-        WHERE is_active = TRUE
-        ORDER BY name ASC
-    """)
-    all_cattle = cursor.fetchall()
-
-    # ✅ Filter only lactating cows for the Add Milk modal
-    lactating_statuses = ('lactating', 'lactating_incalf')
-    cows = [cow for cow in all_cattle if cow['status'] in lactating_statuses]
-
-    # ✅ Weekly summary
-    cursor.execute('''
-        SELECT DATE_TRUNC('week', mp.date) AS week_start,
-               SUM(COALESCE(mp.morning_milk, 0) + COALESCE(mp.mid_day_milk, 0) + COALESCE(mp.evening_milk, 0)) AS total_milk
-        FROM milk_production mp
-        JOIN cattle c ON mp.cattle_id = c.cattle_id
-        WHERE c.is_active = TRUE
-        GROUP BY DATE_TRUNC('week', mp.date)
-        ORDER BY week_start DESC
-        LIMIT 4
-    ''')
-    weekly_summary = cursor.fetchall()
+        by_cow, cow_params = search_filter(cursor, 'cattle', search_query, columns=['name'], key='mp.cattle_id')
+        by_user, user_params = search_filter(cursor, 'users', search_query, columns=['username'], key='mp.recorded_by')
+        where_clauses.append(f"({by_cow} OR {by_user})")
+        params.extend(cow_params + user_params)
+
+    where_sql = " AND ".join(where_clauses)
+
+    # ✅ Keyset pagination on (date, id); the total is only counted on request
+    base_query = MILK_LIST_QUERY.format(filters=where_sql)
+    page = keyset_page(cursor, base_query, params, MILK_LIST_KEYS, per_page,
+                       after=request.args.get('after'), before=request.args.get('before'))
+    if request.args.get('count'):
+        page.total = cached_count(cursor, base_query, params)
+    records = page.items
+
+    # ✅ Lactating cows for the Add Milk modal, from the in-memory herd index
+    cows = herd_index(db).with_status(*MILKING_STATUSES)
+
+    # ✅ Weekly / monthly summaries from the rollup tables
+    weekly_summary, monthly_summary = recent_totals(cursor, weeks=4, months=6)
     weekly_total = sum(row['total_milk'] for row in weekly_summary)
-
-    # ✅ Monthly summary
-    cursor.execute('''
-        SELECT DATE_TRUNC('month', mp.date) AS month,
-               SUM(COALESCE(mp.morning_milk, 0) + COALESCE(mp.mid_day_milk, 0) + COALESCE(mp.evening_milk, 0)) AS total_milk
-        FROM milk_production mp
-        JOIN cattle c ON mp.cattle_id = c.cattle_id
-        WHERE c.is_active = TRUE
-        GROUP BY DATE_TRUNC('month', mp.date)
-        ORDER BY month DESC
-        LIMIT 6
-    ''')
-    monthly_summary = cursor.fetchall()
     monthly_total = sum(row['total_milk'] for row in monthly_summary)
 
+    # ✅ Cows whose latest session yield is far from their rolling average
+    yield_anomalies = flagged_cows(cursor, dt_date.today())
+    flagged_ids = {cow['cattle_id'] for cow in yield_anomalies}
+
+    # ✅ Per-cow totals this month for the bar chart (the daily chart loads from milk_series)
+    cursor.execute("""
+        SELECT r.cattle_id, c.name, r.total_litres
+        FROM milk_rollup_cow_monthly r
+        JOIN cattle c ON c.cattle_id = r.cattle_id
+        WHERE r.month_start = %s
+        ORDER BY r.total_litres DESC
+        LIMIT 15
+    """, (month_start(dt_date.today()),))
+    top_cows = cursor.fetchall()
+    cattle_chart_data = {
+        'labels': [row['name'] for row in top_cows],
+        'cattle_ids': [row['cattle_id'] for row in top_cows],
+        'datasets': [{'label': 'Litres this month', 'data': [float(row['total_litres']) for row in top_cows]}],
+    }
+
     return render_template('milk/milk_list.html',
         milk_records=records,
         page=page,
-        total_pages=total_pages,
         search_query=search_query,
         start_date=start_date,
         end_date=end_date,
@@ -169,62 +134,149 @@ def milk_list():
         monthly_summary=monthly_summary,
         weekly_total=weekly_total,
         monthly_total=monthly_total,
-        daily_chart_data={},  # Placeholder
-        cattle_chart_data={},  # Placeholder
-        pagination=None  # Optional: use a helper to render if needed
+        cattle_chart_data=cattle_chart_data,
+        yield_anomalies=yield_anomalies,
+        flagged_ids=flagged_ids,
     )
 
+@milk_bp.route('/milk/series')
+@login_required
+def milk_series():
+    """Daily yield for the herd, or one cow with ?cattle_id=, downsampled to ?points=.
+
+    Defaults to the last year. Carries ETag/Last-Modified from the rollup
+    tables, so an unchanged chart revalidates with a 304 and no series query.
+    """
+    try:
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else dt_date.today()
+        start = (datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start')
+                 else end - timedelta(days=365))
+        cattle_id = int(request.args['cattle_id']) if request.args.get('cattle_id') else None
+        points = min(max(int(request.args.get('points', DEFAULT_POINTS)), 3), MAX_POINTS)
+    except ValueError:
+        return jsonify({'error': 'start/end must be YYYY-MM-DD; cattle_id and points must be integers'}), 400
+
+    cursor = get_cursor()
+    etag, modified = series_version(cursor, start, end, cattle_id)
+    if not is_resource_modified(request.environ, etag=etag, last_modified=modified):
+        response = make_response('', 304)
+    else:
+        series = daily_yield(cursor, start, end, cattle_id)
+        sampled = downsample(series, points)
+        response = jsonify({
+            'cattle_id': cattle_id,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'raw_points': len(series),
+            'points': [[day.isoformat(), round(litres, 2)] for day, litres in sampled],
+        })
+    response.set_etag(etag)
+    if modified:
+        response.last_modified = modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+@milk_bp.route('/milk/lactation')
+@login_required
+def lactation_curves():
+    """Days in milk, peak, persistency, Wood's curve and 305-day projection per cow (?cattle_id= for one)."""
+    cows = herd_lactations(get_db())
+    if request.args.get('cattle_id'):
+        try:
+            cattle_id = int(request.args['cattle_id'])
+        except ValueError:
+            return jsonify({'error': 'cattle_id must be an integer'}), 400
+        cows = [cow for cow in cows if cow['cattle_id'] == cattle_id]
+    return jsonify({'count': len(cows), 'cows': cows}), 200
+
+
 @milk_bp.route('/milk/add', methods=['POST'])
 @login_required
 def record_milk():
     db = get_db()
     cursor = get_cursor()
 
-   
-    today_str = request.form.get('date')
-    today = datetime.strptime(today_str, '%Y-%m-%d').date() if today_str else dt_date.today()
     session_type = request.form.get('session')
     recorded_by = session['user_id']
 
-    update_field = {
-        'morning': 'morning_milk',
-        'mid_day': 'mid_day_milk',
-        'evening': 'evening_milk'
-    }.get(session_type)
-
-    if not update_field:
+    if session_type not in SESSION_FIELDS:
         flash("Invalid session type.", "danger")
         return redirect(url_for('milk.milk_list'))
 
-    cattle_ids = request.form.getlist('cattle_ids')
-    for cid in cattle_ids:
-        try:
-            quantity = float(request.form.get(f'milk_{cid}', 0))
-        except (ValueError, TypeError):
-            quantity = 0
-        notes = request.form.get(f'notes_{cid}', '')
-
-        # Check if already exists
-        cursor.execute("SELECT id FROM milk_production WHERE cattle_id = %s AND date = %s", (cid, today))
-        existing = cursor.fetchone()
-
-        if existing:
-            cursor.execute(f"""
-                UPDATE milk_production
-                SET {update_field} = %s, notes = %s, recorded_by = %s
-                WHERE id = %s
-            """, (quantity, notes, recorded_by, existing['id']))
-        else:
-            cursor.execute(f"""
-                INSERT INTO milk_production (cattle_id, date, recorded_by, notes, {update_field})
-                VALUES (%s, %s, %s, %s, %s)
-            """, (cid, today, recorded_by, notes, quantity))
+    try:
+        today_str = request.form.get('date')
+        today = datetime.strptime(today_str, '%Y-%m-%d').date() if today_str else dt_date.today()
+    except ValueError:
+        flash("Invalid date. Please use YYYY-MM-DD.", "danger")
+        return redirect(url_for('milk.milk_list'))
+
+    form_ids = request.form.getlist('cattle_ids')
+    if not all(cid.strip().isdecimal() for cid in form_ids):
+        flash("Invalid cattle selection.", "danger")
+        return redirect(url_for('milk.milk_list'))
+
+    # ✅ Whole session sheet in one upsert, for animals that are still active
+    active = active_cattle_ids(cursor, form_ids)
+    entries = [
+        (int(cid), parse_quantity(request.form.get(f'milk_{cid}')), request.form.get(f'notes_{cid}', ''))
+        for cid in form_ids if int(cid) in active
+    ]
+    skipped = len({int(cid) for cid in form_ids} - active)
+    upsert_session(cursor, today, session_type, entries, recorded_by)
 
     db.commit()
+    if skipped:
+        flash(f"{skipped} unknown or inactive animal(s) skipped.", "warning")
     flash("Milk records saved successfully.", "success")
     return redirect(url_for('milk.milk_list'))
 
 
+@milk_bp.route('/milk/session', methods=['POST'])
+@login_required
+def record_milk_session():
+    """JSON bulk save for parlor tablets (send the page's csrf-token as X-CSRFToken).
+
+    {"date": "2024-05-01", "session": "evening",
+     "entries": [{"cattle_id": 12, "quantity": 8.5, "notes": ""}, ...]}
+    """
+    payload = request.get_json(silent=True) or {}
+    session_type = payload.get('session')
+    if session_type not in SESSION_FIELDS:
+        return jsonify({'error': f"session must be one of {', '.join(SESSION_FIELDS)}"}), 400
+    try:
+        day = datetime.strptime(payload['date'], '%Y-%m-%d').date() if payload.get('date') else dt_date.today()
+    except (ValueError, TypeError):
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+
+    entries, rejected = [], []
+    for entry in payload.get('entries') or []:
+        try:
+            cattle_id = int(entry['cattle_id'])
+            quantity = float(entry.get('quantity') or 0)
+        except (KeyError, ValueError, TypeError, AttributeError):
+            rejected.append({'entry': entry, 'error': 'cattle_id and a numeric quantity are required'})
+            continue
+        if not math.isfinite(quantity):
+            rejected.append({'cattle_id': cattle_id, 'error': 'quantity must be a finite number'})
+            continue
+        if quantity < 0:
+            rejected.append({'cattle_id': cattle_id, 'error': 'quantity cannot be negative'})
+            continue
+        entries.append((cattle_id, quantity, entry.get('notes') or ''))
+
+    db = get_db()
+    cursor = get_cursor()
+    active = active_cattle_ids(cursor, [cid for cid, _, _ in entries])
+    rejected += [{'cattle_id': cid, 'error': 'unknown or inactive animal'} for cid, _, _ in entries if cid not in active]
+    entries = [entry for entry in entries if entry[0] in active]
+
+    saved = upsert_session(cursor, day, session_type, entries, session['user_id'])
+    db.commit()
+    return jsonify({'date': day.isoformat(), 'session': session_type, 'saved': saved, 'rejected': rejected}), 200
+
+
 @milk_bp.route('/milk/edit/<int:record_id>', methods=['POST'])
 @login_required
 @admin_required
@@ -239,6 +291,9 @@ def edit_milk(record_id):
     except ValueError:
         flash("Invalid input. Please enter valid milk quantities.", "danger")
         return redirect(url_for('milk.milk_list'))
+    if not all(math.isfinite(litres) for litres in (morning, mid_day, evening)):
+        flash("Invalid input. Please enter valid milk quantities.", "danger")
+        return redirect(url_for('milk.milk_list'))
 
     notes = request.form.get('notes')
 
@@ -246,7 +301,18 @@ def edit_milk(record_id):
         UPDATE milk_production
         SET morning_milk = %s, mid_day_milk = %s, evening_milk = %s, notes = %s
         WHERE id = %s
+        RETURNING cattle_id, date
     """, (morning, mid_day, evening, notes, record_id))
+    row = cursor.fetchone()
+    if row:
+        refresh_milk_rollups(cursor, row['date'], row['date'], cattle_ids=[row['cattle_id']])
+        day = to_date(row['date'])
+        for session_type, litres in zip(SESSION_FIELDS, (morning, mid_day, evening)):
+            if litres > 0:
+                update_yield_stats(cursor, day, session_type, [(row['cattle_id'], litres)])
+            else:
+                # A session edited down to 0 (usually a mistyped figure) no longer counts
+                forget_yields(cursor, day, [session_type], [row['cattle_id']])
 
     db.commit()
     flash('Milk record updated successfully!', 'success')
@@ -259,7 +325,11 @@ def edit_milk(record_id):
 def delete_milk(record_id):
     db = get_db()
     cursor = get_cursor()
-    cursor.execute("DELETE FROM milk_production WHERE id = %s", (record_id,))
+    cursor.execute("DELETE FROM milk_production WHERE id = %s RETURNING cattle_id, date", (record_id,))
+    row = cursor.fetchone()
+    if row:
+        refresh_milk_rollups(cursor, row['date'], row['date'], cattle_ids=[row['cattle_id']])
+        forget_yields(cursor, to_date(row['date']), list(SESSION_FIELDS), [row['cattle_id']])
     db.commit()
     flash('Milk record deleted successfully.', 'success')
     return redirect(url_for('milk.milk_list'))
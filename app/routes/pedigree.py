@@ -0,0 +1,95 @@
+from flask import Blueprint, request, jsonify, current_app
+from database import get_db, get_cursor
+from app.utils.decorators import login_required, admin_required
+from app.utils.pedigree import herd_pedigree, lineage, set_parents, candidate_sires, score_mates
+
+pedigree_bp = Blueprint('pedigree', __name__)
+
+
+def _animal(cursor, cattle_id):
+    cursor.execute("""
+        SELECT cattle_id, tag_number, name, sex, birth_date, is_active, dam_id, sire_id, sire_name
+        FROM cattle WHERE cattle_id = %s
+    """, (cattle_id,))
+    return cursor.fetchone()
+
+
+def _optional_id(value):
+    return int(value) if value not in (None, '') else None
+
+
+# ✅ Ancestors and descendants of one animal, with its inbreeding coefficient
+@pedigree_bp.route('/<int:cattle_id>')
+@login_required
+def pedigree_view(cattle_id):
+    """?depth=N limits both directions to N generations."""
+    cursor = get_cursor()
+    animal = _animal(cursor, cattle_id)
+    if animal is None:
+        return jsonify({'error': 'animal not found'}), 404
+    depth = request.args.get('depth', '')
+    if depth and not depth.isdigit():
+        return jsonify({'error': 'depth must be a number'}), 400
+
+    pedigree = herd_pedigree(get_db())
+    return jsonify({
+        'animal': dict(animal),
+        'inbreeding': round(pedigree.inbreeding(cattle_id), 5),
+        'ancestors': [dict(row) for row in lineage(cursor, cattle_id, ancestors=True, max_depth=int(depth or 0))],
+        'descendants': [dict(row) for row in lineage(cursor, cattle_id, ancestors=False, max_depth=int(depth or 0))],
+    }), 200
+
+
+# ✅ Record or correct an animal's dam and sire
+@pedigree_bp.route('/<int:cattle_id>/parents', methods=['POST'])
+@login_required
+@admin_required
+def update_parents(cattle_id):
+    """JSON or form fields: dam_id, sire_id (a herd bull) and/or sire_name (AI or outside bull).
+    Send the csrf-token as X-CSRFToken."""
+    db = get_db()
+    cursor = get_cursor()
+    data = request.get_json(silent=True) or request.form
+    if _animal(cursor, cattle_id) is None:
+        return jsonify({'error': 'animal not found'}), 404
+    try:
+        dam_id, sire_id = _optional_id(data.get('dam_id')), _optional_id(data.get('sire_id'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'dam_id and sire_id must be numbers'}), 400
+    for parent_id in (dam_id, sire_id):
+        if parent_id and _animal(cursor, parent_id) is None:
+            return jsonify({'error': f'parent {parent_id} not found'}), 400
+
+    try:
+        set_parents(cursor, cattle_id, dam_id, sire_id, (data.get('sire_name') or '').strip() or None)
+    except ValueError as e:
+        db.rollback()
+        return jsonify({'error': str(e)}), 400
+    db.commit()
+    return jsonify(dict(_animal(cursor, cattle_id))), 200
+
+
+# ✅ Mating advisor: candidate sires for a cow, least related first
+@pedigree_bp.route('/<int:cattle_id>/mates')
+@login_required
+def mating_advisor(cattle_id):
+    """Herd bulls and recently used outside sires, each with the inbreeding
+    coefficient a calf of the pair would have. ?limit= caps the list."""
+    cursor = get_cursor()
+    cow = _animal(cursor, cattle_id)
+    if cow is None:
+        return jsonify({'error': 'animal not found'}), 404
+    limit = request.args.get('limit', '20')
+    if not limit.isdigit():
+        return jsonify({'error': 'limit must be a number'}), 400
+
+    pedigree = herd_pedigree(get_db())
+    threshold = current_app.config['PEDIGREE_MAX_INBREEDING']
+    mates = score_mates(pedigree, cattle_id, candidate_sires(cursor), threshold)
+    return jsonify({
+        'cattle_id': cattle_id,
+        'tag_number': cow['tag_number'],
+        'inbreeding': round(pedigree.inbreeding(cattle_id), 5),
+        'max_inbreeding': threshold,
+        'candidates': mates[:int(limit)],
+    }), 200
@@ -0,0 +1,251 @@
+import gzip
+import json
+import math
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from flask import Blueprint, request, jsonify, session, current_app
+from database import get_db, get_cursor
+from sql_dialect import bulk_insert, bulk_update
+from app.utils.decorators import login_required
+from app.utils.herd_records import insert_breeding, eligible_dam, insert_calving
+from app.utils.milk_sessions import SESSION_FIELDS, upsert_session, active_cattle_ids
+from app.utils.status_updater import mark_status_dirty, flush_status_dirty
+
+sync_bp = Blueprint('sync', __name__)
+
+ENTRY_TYPES = ('milk', 'breeding', 'calving')
+MAX_KEY_LENGTH = 100
+
+
+def _read_payload():
+    """JSON body, gunzipped when sent with Content-Encoding: gzip; capped at SYNC_MAX_BYTES."""
+    limit = current_app.config['SYNC_MAX_BYTES']
+    body = request.get_data(cache=False)
+    if request.headers.get('Content-Encoding', '').lower() == 'gzip':
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        body = inflater.decompress(body, limit + 1)
+        if inflater.unconsumed_tail:
+            raise ValueError('batch too large')
+    if len(body) > limit:
+        raise ValueError('batch too large')
+    return json.loads(body or b'{}')
+
+
+def _savepoint(cursor, apply, *args):
+    """Run one entry inside a savepoint so a failing entry leaves the rest of the batch intact."""
+    cursor.execute("SAVEPOINT sync_entry")
+    try:
+        result = apply(cursor, *args)
+    except Exception as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT sync_entry")
+        cursor.execute("RELEASE SAVEPOINT sync_entry")
+        return None, str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__
+    cursor.execute("RELEASE SAVEPOINT sync_entry")
+    return result, None
+
+
+def _apply_milk(cursor, entries, recorded_by, results):
+    """Milk entries grouped by (date, session): one upsert per group."""
+    groups = defaultdict(list)
+    for key, data in entries:
+        try:
+            day = datetime.strptime(data['date'], '%Y-%m-%d').date()
+            quantity = float(data.get('quantity') or 0)
+            cattle_id = int(data['cattle_id'])
+        except (KeyError, ValueError, TypeError):
+            results[key] = {'status': 'rejected', 'error': 'cattle_id, date and a numeric quantity are required'}
+            continue
+        if data.get('session') not in SESSION_FIELDS:
+            results[key] = {'status': 'rejected', 'error': f"session must be one of {', '.join(SESSION_FIELDS)}"}
+        elif not math.isfinite(quantity):
+            results[key] = {'status': 'rejected', 'error': 'quantity must be a finite number'}
+        elif quantity < 0:
+            results[key] = {'status': 'rejected', 'error': 'quantity cannot be negative'}
+        else:
+            groups[(day, data['session'])].append((key, cattle_id, quantity, data.get('notes') or ''))
+
+    active = active_cattle_ids(cursor, [entry[1] for group in groups.values() for entry in group])
+    for (day, session_type), group in groups.items():
+        for key, cattle_id, _, _ in group:
+            if cattle_id not in active:
+                results[key] = {'status': 'rejected', 'error': 'unknown or inactive animal'}
+        group = [entry for entry in group if entry[1] in active]
+        if not group:
+            continue
+        _, error = _savepoint(cursor, upsert_session, day, session_type,
+                              [entry[1:] for entry in group], recorded_by)
+        for key, cattle_id, _, _ in group:
+            results[key] = {'status': 'rejected', 'error': error} if error else {'status': 'applied', 'cattle_id': cattle_id}
+
+
+def _apply_breeding(cursor, entries, recorded_by, results, dirty):
+    required = ('cattle_id', 'method', 'breeding_date', 'breeding_attempt_number')
+    known = active_cattle_ids(cursor, [data['cattle_id'] for _, data in entries
+                                       if str(data.get('cattle_id', '')).isdigit()])
+    for key, data in entries:
+        if any(not data.get(field) for field in required):
+            results[key] = {'status': 'rejected', 'error': f"{', '.join(required)} are required"}
+            continue
+        if not str(data['cattle_id']).isdigit() or int(data['cattle_id']) not in known:
+            results[key] = {'status': 'rejected', 'error': 'unknown or inactive animal'}
+            continue
+        cattle_id, error = _savepoint(cursor, insert_breeding, data, recorded_by)
+        if error:
+            results[key] = {'status': 'rejected', 'error': error}
+        else:
+            dirty.append(cattle_id)
+            results[key] = {'status': 'applied', 'cattle_id': int(cattle_id)}
+
+
+def _apply_calving(cursor, entries, recorded_by, results, dirty):
+    required = ('dam_id', 'calf_name', 'calf_sex', 'birth_date', 'breed')
+    for key, data in entries:
+        if any(not data.get(field) for field in required):
+            results[key] = {'status': 'rejected', 'error': f"{', '.join(required)} are required"}
+            continue
+        dam = eligible_dam(cursor, data['dam_id'])
+        if not dam:
+            results[key] = {'status': 'rejected', 'error': 'dam is not eligible for calving'}
+            continue
+        created, error = _savepoint(cursor, insert_calving, data, dam, recorded_by)
+        if error:
+            results[key] = {'status': 'rejected', 'error': error}
+            continue
+        calving_id, calf_id, calf_tag = created
+        dirty += [data['dam_id'], calf_id]
+        results[key] = {'status': 'applied', 'calving_id': calving_id, 'calf_id': calf_id, 'calf_tag': calf_tag}
+
+
+def reference_version(cursor):
+    cursor.execute("SELECT COALESCE(MAX(event_id), 0) AS version FROM herd_events")
+    return int(cursor.fetchone()['version'])
+
+
+# ✅ Upload queued entries from an offline device
+@sync_bp.route('/batch', methods=['POST'])
+@login_required
+def sync_batch():
+    """Apply a device's queued entries in one transaction (send the csrf-token as X-CSRFToken).
+
+    {"device_id": "shed-tablet-1",
+     "entries": [{"key": "<uuid>", "type": "milk|breeding|calving", "data": {...}}, ...]}
+
+    milk data matches /milk/milk/session entries plus date and session; breeding
+    and calving data use the add-form field names. Keys already seen return their
+    stored result with status "duplicate". The body may be gzip-compressed.
+    """
+    try:
+        payload = _read_payload()
+    except (ValueError, OSError, zlib.error) as e:
+        return jsonify({'error': f'unreadable batch: {e}'}), 400
+    entries = payload.get('entries') if isinstance(payload, dict) else None
+    if not isinstance(entries, list):
+        return jsonify({'error': 'entries must be a list'}), 400
+    if len(entries) > current_app.config['SYNC_MAX_ENTRIES']:
+        return jsonify({'error': f"at most {current_app.config['SYNC_MAX_ENTRIES']} entries per batch"}), 413
+    device_id = str(payload.get('device_id') or '')[:MAX_KEY_LENGTH] or None
+
+    results, order, fresh = {}, [], {}
+    for entry in entries:
+        key = entry.get('key') if isinstance(entry, dict) else None
+        if not isinstance(key, str) or not key or len(key) > MAX_KEY_LENGTH:
+            order.append(None)
+            continue
+        order.append(key)
+        if key in fresh or key in results:
+            continue
+        if entry.get('type') not in ENTRY_TYPES or not isinstance(entry.get('data'), dict):
+            results[key] = {'status': 'rejected', 'error': f"type must be one of {', '.join(ENTRY_TYPES)} with a data object"}
+        else:
+            fresh[key] = entry
+
+    db = get_db()
+    cursor = get_cursor()
+
+    # Claim keys first: a key another request already holds stays unclaimed and is reported as a duplicate
+    claimed = {row['idempotency_key'] for row in bulk_insert(
+        cursor, 'sync_receipts', ['idempotency_key', 'device_id', 'entry_type'],
+        [(key, device_id, entry['type']) for key, entry in fresh.items()],
+        returning='idempotency_key', on_conflict='(idempotency_key) DO NOTHING'
+    )}
+    seen = [key for key in fresh if key not in claimed]
+    if seen:
+        marks = ', '.join(['%s'] * len(seen))
+        cursor.execute(f"SELECT idempotency_key, result FROM sync_receipts WHERE idempotency_key IN ({marks})", seen)
+        for row in cursor.fetchall():
+            results[row['idempotency_key']] = dict(json.loads(row['result'] or '{}'), status='duplicate')
+
+    by_type = defaultdict(list)
+    for key, entry in fresh.items():
+        if key in claimed:
+            by_type[entry['type']].append((key, entry['data']))
+
+    dirty = []
+    _apply_milk(cursor, by_type['milk'], session['user_id'], results)
+    _apply_breeding(cursor, by_type['breeding'], session['user_id'], results, dirty)
+    _apply_calving(cursor, by_type['calving'], session.get('username', 'unknown'), results, dirty)
+
+    # Rejected keys are released so a corrected entry can be resent under the same key
+    rejected = [key for key in claimed if results[key]['status'] == 'rejected']
+    if rejected:
+        marks = ', '.join(['%s'] * len(rejected))
+        cursor.execute(f"DELETE FROM sync_receipts WHERE idempotency_key IN ({marks})", rejected)
+    bulk_update(cursor, 'sync_receipts', 'idempotency_key', ['result'],
+                [(key, json.dumps(results[key])) for key in claimed if results[key]['status'] == 'applied'])
+
+    mark_status_dirty(*dirty)
+    flush_status_dirty(db)
+    version = reference_version(cursor)
+    db.commit()
+
+    response = [dict(results[key], key=key) if key else {'key': None, 'status': 'rejected', 'error': 'key is required'}
+                for key in order]
+    counts = defaultdict(int)
+    for item in response:
+        counts[item['status']] += 1
+    return jsonify({'device_id': device_id, 'results': response, 'counts': counts,
+                    'reference_version': version}), 200
+
+
+# ✅ Reference data changed since a version
+@sync_bp.route('/reference')
+@login_required
+def sync_reference():
+    """Cows (and the herd's statuses) for offline pick lists.
+
+    ?since=0 (or omitted) returns every active animal; ?since=<reference_version>
+    returns only animals with herd events after it, including ones that became
+    inactive (is_active false) so devices can drop them. The version window is
+    widened by SYNC_VERSION_OVERLAP events to cover writes that committed late.
+    """
+    since = max(request.args.get('since', 0, type=int), 0)
+    cursor = get_cursor()
+    version = reference_version(cursor)
+    columns = "c.cattle_id, c.tag_number, c.name, c.sex, c.breed, c.status_category, c.status, c.is_active"
+
+    if since == 0:
+        cursor.execute(f"SELECT {columns} FROM cattle c WHERE c.is_active = TRUE ORDER BY c.cattle_id")
+    else:
+        cursor.execute(f"""
+            SELECT {columns} FROM cattle c
+            WHERE c.cattle_id IN (SELECT cattle_id FROM herd_events WHERE event_id > %s)
+            ORDER BY c.cattle_id
+        """, (since - current_app.config['SYNC_VERSION_OVERLAP'],))
+    cattle = [dict(row, is_active=bool(row['is_active'])) for row in cursor.fetchall()]
+
+    cursor.execute("""
+        SELECT DISTINCT status_category, status FROM cattle
+        WHERE is_active = TRUE AND status IS NOT NULL
+        ORDER BY status_category, status
+    """)
+    statuses = [dict(row) for row in cursor.fetchall()]
+
+    body = json.dumps({'version': version, 'full': since == 0, 'cattle': cattle, 'statuses': statuses},
+                      default=str).encode()
+    response = current_app.response_class(body, mimetype='application/json')
+    if 'gzip' in request.headers.get('Accept-Encoding', '').lower():
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+    return response
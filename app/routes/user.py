@@ -3,6 +3,8 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from database import get_db, get_cursor
 from app.utils.decorators import login_required, admin_required
+from app.utils.pagination import keyset_page, cached_count
+from app.utils.search import search_filter
 import os
 
 user_bp = Blueprint('user', __name__)
@@ -100,17 +102,16 @@ def manage_users():
     cursor = get_cursor()
     search = request.args.get('search', '').strip()
     role = request.args.get('role', '')
-    page = int(request.args.get('page', 1))
     per_page = 10
-    offset = (page - 1) * per_page
 
-    base_query = "FROM users WHERE 1=1"
+    base_query = "SELECT * FROM users WHERE 1=1"
     filters = []
     params = []
 
     if search:
-        filters.append("(username ILIKE %s OR email ILIKE %s OR first_name ILIKE %s OR last_name ILIKE %s)")
-        params.extend([f"%{search}%"] * 4)
+        clause, search_params = search_filter(cursor, 'users', search)
+        filters.append(clause)
+        params.extend(search_params)
 
     if role:
         filters.append("role = %s")
@@ -119,15 +120,12 @@ def manage_users():
     if filters:
         base_query += " AND " + " AND ".join(filters)
 
-    cursor.execute(f"SELECT * {base_query} ORDER BY id DESC LIMIT %s OFFSET %s", (*params, per_page, offset))
-    users = cursor.fetchall()
+    page = keyset_page(cursor, base_query, params, [('id', 'id')], per_page,
+                       after=request.args.get('after'), before=request.args.get('before'))
+    if request.args.get('count'):
+        page.total = cached_count(cursor, base_query, params)
 
-    cursor.execute(f"SELECT COUNT(*) AS total {base_query}", params)
-    row = cursor.fetchone()
-    total_users = row['total'] if row else 0
-    total_pages = (total_users + per_page - 1) // per_page
-
-    return render_template('user/user_list.html', users=users, current_page=page, total_pages=total_pages)
+    return render_template('user/user_list.html', users=page.items, page=page)
 
 # ➕ Add User
 @user_bp.route('/add_user', methods=['POST'])
@@ -0,0 +1,178 @@
+from datetime import date, timedelta
+from sql_dialect import bulk_insert
+from app.utils.herd_history import record_events
+from app.utils.milk_rollups import refresh_milk_rollups, utc_now
+from app.utils.pedigree import rebuild_lineage
+from app.utils.status_engine import to_date
+
+ARCHIVE_IDS = 'archive_ids'
+
+# Hot table -> (archive table, column naming the owning animal, columns), parents
+# first: restores insert in this order and archival deletes in reverse.
+ARCHIVES = {
+    'cattle': ('cattle_archive', 'cattle_id', [
+        'cattle_id', 'name', 'tag_number', 'breed', 'birth_date', 'sex', 'status', 'status_category',
+        'recorded_by', 'is_active', 'remark', 'next_status_change', 'dam_id', 'sire_id', 'sire_name']),
+    'calving': ('calving_archive', 'dam_id', [
+        'calving_id', 'dam_id', 'dam_tag_number', 'dam_name', 'calf_name', 'calf_sex', 'birth_date', 'breed',
+        'calf_condition', 'notes', 'recorded_by', 'created_at', 'updated_at', 'is_active', 'remark', 'calf_id']),
+    'breeding_records': ('breeding_records_archive', 'cattle_id', [
+        'id', 'cattle_id', 'recorded_by', 'method', 'semen_type', 'semen_price', 'semen_batch_number',
+        'sire_name', 'breeding_date', 'breeding_attempt_number', 'notes', 'steaming_date',
+        'pregnancy_check_date', 'pregnancy_test_result', 'created_at', 'breeding_outcome', 'remark',
+        'expected_calving_date']),
+    'milk_production': ('milk_production_archive', 'cattle_id', [
+        'id', 'cattle_id', 'date', 'morning_milk', 'mid_day_milk', 'evening_milk', 'notes', 'recorded_by']),
+    'herd_events': ('herd_events_archive', 'cattle_id', [
+        'event_id', 'cattle_id', 'event_type', 'event_date', 'status_category', 'status', 'is_active',
+        'details', 'recorded_at']),
+}
+
+# Derived per-animal rows: dropped on archival, rebuilt on restore
+DERIVED = [('cattle_ancestry', 'ancestor_id'), ('cattle_ancestry', 'descendant_id'),
+           ('milk_yield_stats', 'cattle_id'), ('milk_rollup_cow_monthly', 'cattle_id')]
+
+# Inactive animals with no record of any kind after the cutoff ('baseline' events only seed history)
+CANDIDATES_QUERY = """
+    SELECT c.cattle_id FROM cattle c
+    WHERE c.is_active = FALSE
+      AND NOT EXISTS (SELECT 1 FROM herd_events e
+                      WHERE e.cattle_id = c.cattle_id AND e.event_date > %s AND e.event_type <> 'baseline')
+      AND NOT EXISTS (SELECT 1 FROM milk_production m WHERE m.cattle_id = c.cattle_id AND m.date > %s)
+      AND NOT EXISTS (SELECT 1 FROM breeding_records b WHERE b.cattle_id = c.cattle_id AND b.breeding_date > %s)
+      AND NOT EXISTS (SELECT 1 FROM calving cv WHERE cv.dam_id = c.cattle_id AND cv.birth_date > %s)
+"""
+
+
+def archive_candidates(cursor, cutoff):
+    """Ids of inactive animals untouched since `cutoff` that can leave the hot tables.
+
+    An animal stays hot while a hot animal names it as dam or sire, or a hot
+    calving names it as the calf, so the live herd's pedigree, and the foreign
+    keys behind it, stay whole. Families inactive together go cold together.
+    """
+    cursor.execute(CANDIDATES_QUERY, (cutoff,) * 4)
+    candidates = {row['cattle_id'] for row in cursor.fetchall()}
+    if not candidates:
+        return set()
+    cursor.execute("""
+        SELECT cattle_id AS child, dam_id AS parent FROM cattle WHERE dam_id IS NOT NULL
+        UNION ALL
+        SELECT cattle_id, sire_id FROM cattle WHERE sire_id IS NOT NULL
+        UNION ALL
+        SELECT dam_id, calf_id FROM calving WHERE calf_id IS NOT NULL
+    """)
+    links = [(row['child'], row['parent']) for row in cursor.fetchall()]
+    while True:
+        blocked = {parent for child, parent in links if parent in candidates and child not in candidates}
+        if not blocked:
+            return candidates
+        candidates -= blocked
+
+
+def _stage_ids(cursor, cattle_ids):
+    cursor.execute(f"DROP TABLE IF EXISTS {ARCHIVE_IDS}")
+    cursor.execute(f"CREATE TEMP TABLE {ARCHIVE_IDS} (cattle_id INTEGER PRIMARY KEY)")
+    bulk_insert(cursor, ARCHIVE_IDS, ['cattle_id'], [(cid,) for cid in sorted(cattle_ids)])
+    return f"IN (SELECT cattle_id FROM {ARCHIVE_IDS})"
+
+
+def archive_animals(db, cattle_ids):
+    """Move the animals and every row they own into the archive tables, in one transaction.
+
+    `cattle_ids` must be closed under archive_candidates()'s family rule.
+    Returns {hot table: rows moved}.
+    """
+    cursor = db.cursor()
+    moved = {}
+    try:
+        owned = _stage_ids(cursor, cattle_ids)
+        now = utc_now()
+        for table, (archive, owner, columns) in ARCHIVES.items():
+            names = ', '.join(columns)
+            cursor.execute(f"""
+                INSERT INTO {archive} ({names}, archived_at)
+                SELECT {names}, %s FROM {table} WHERE {owner} {owned}
+            """, (now,))
+            moved[table] = cursor.rowcount
+        for table, column in DERIVED:
+            cursor.execute(f"DELETE FROM {table} WHERE {column} {owned}")
+        for table, (_, owner, _) in reversed(ARCHIVES.items()):
+            cursor.execute(f"DELETE FROM {table} WHERE {owner} {owned}")
+        cursor.execute(f"DROP TABLE IF EXISTS {ARCHIVE_IDS}")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return moved
+
+
+def archive_inactive(db, days, dry_run=False):
+    """Archive every animal inactive for more than `days`. Returns a summary dict."""
+    cutoff = date.today() - timedelta(days=days)
+    cattle_ids = archive_candidates(db.cursor(), cutoff)
+    summary = {'cutoff': cutoff.isoformat(), 'animals': len(cattle_ids), 'rows': {}}
+    if cattle_ids and not dry_run:
+        summary['rows'] = archive_animals(db, cattle_ids)
+    return summary
+
+
+def _archived(cursor, values):
+    """The ids among `values` that are in cattle_archive."""
+    marks = ', '.join(['%s'] * len(values))
+    cursor.execute(f"SELECT cattle_id FROM cattle_archive WHERE cattle_id IN ({marks})", sorted(values))
+    return {row['cattle_id'] for row in cursor.fetchall()}
+
+
+def restore_family(cursor, cattle_id):
+    """The archived animal plus what must come back with it: archived ancestors
+    (its dam/sire links point at them) and archived calves its calvings name."""
+    family, frontier = set(), {cattle_id}
+    while frontier:
+        family |= frontier
+        marks = ', '.join(['%s'] * len(frontier))
+        cursor.execute(f"""
+            SELECT dam_id AS related FROM cattle_archive WHERE cattle_id IN ({marks}) AND dam_id IS NOT NULL
+            UNION
+            SELECT sire_id FROM cattle_archive WHERE cattle_id IN ({marks}) AND sire_id IS NOT NULL
+            UNION
+            SELECT calf_id FROM calving_archive WHERE dam_id IN ({marks}) AND calf_id IS NOT NULL
+        """, sorted(frontier) * 3)
+        related = {row['related'] for row in cursor.fetchall()} - family
+        frontier = _archived(cursor, related) if related else set()
+    return family
+
+
+def restore_animal(db, cattle_id):
+    """Bring an archived animal (and the family restore_family() names) back to the hot tables.
+
+    Raises ValueError if the animal is not archived. The animals keep their
+    archived state (inactive) and get a 'restored' event. Returns
+    (restored cattle_ids, {hot table: rows restored}).
+    """
+    cursor = db.cursor()
+    if not _archived(cursor, {cattle_id}):
+        raise ValueError(f"animal {cattle_id} is not in the archive")
+    restored = {}
+    try:
+        family = restore_family(cursor, cattle_id)
+        owned = _stage_ids(cursor, family)
+        for table, (archive, owner, columns) in ARCHIVES.items():
+            names = ', '.join(columns)
+            cursor.execute(f"INSERT INTO {table} ({names}) SELECT {names} FROM {archive} WHERE {owner} {owned}")
+            restored[table] = cursor.rowcount
+            cursor.execute(f"DELETE FROM {archive} WHERE {owner} {owned}")
+
+        rebuild_lineage(cursor, family)
+        cursor.execute(f"SELECT MIN(date) AS first, MAX(date) AS last FROM milk_production WHERE cattle_id {owned}")
+        span = cursor.fetchone()
+        if span['first']:
+            refresh_milk_rollups(cursor, to_date(span['first']), to_date(span['last']), cattle_ids=sorted(family))
+        cursor.execute(f"DROP TABLE IF EXISTS {ARCHIVE_IDS}")
+        record_events(cursor, [{'cattle_id': cid, 'event_type': 'restored', 'details': {'with': cattle_id}}
+                               for cid in sorted(family)])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return sorted(family), restored
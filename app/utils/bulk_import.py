@@ -0,0 +1,354 @@
+import csv
+import io
+import time
+from datetime import date
+from sql_dialect import is_sqlite
+from app.utils.herd_history import record_events
+from app.utils.herd_records import calculate_steaming_date, calculate_expected_calving_date
+from app.utils.milk_rollups import refresh_milk_rollups
+from app.utils.status_engine import recompute_statuses, to_date
+
+BATCH_SIZE = 5000
+STAGING = 'import_staging'
+STATUS_FULL_RECOMPUTE_AFTER = 1000  # touched animals beyond which one whole-herd pass is cheaper
+
+# Spreadsheet headings accepted in place of the column names
+HEADER_ALIASES = {
+    'tag': 'tag_number', 'dam_tag': 'tag_number', 'dam_tag_number': 'tag_number',
+    'morning': 'morning_milk', 'mid_day': 'mid_day_milk', 'midday': 'mid_day_milk',
+    'evening': 'evening_milk',
+    'dob': 'birth_date', 'date_of_birth': 'birth_date', 'category': 'status_category',
+}
+
+REGISTRATION_FIELDS = ('name', 'breed', 'birth_date', 'sex', 'status_category', 'status', 'remark')
+SEXES = {'f': 'female', 'female': 'female', 'm': 'male', 'male': 'male'}
+
+
+class RowError(ValueError):
+    pass
+
+
+def parse_day(value, field):
+    value = (value or '').strip()
+    if not value:
+        raise RowError(f"{field} is required")
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    # Day-first spreadsheet dates: DD/MM/YYYY or DD-MM-YYYY
+    parts = value.replace('-', '/').split('/')
+    try:
+        if len(parts) == 3 and len(parts[2]) == 4:
+            return date(int(parts[2]), int(parts[1]), int(parts[0]))
+    except ValueError:
+        pass
+    raise RowError(f"{field} '{value}' is not a date (YYYY-MM-DD or DD/MM/YYYY)")
+
+
+def _optional_day(value, field):
+    return parse_day(value, field) if (value or '').strip() else None
+
+
+def _number(value, field, minimum=0):
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        raise RowError(f"{field} '{value}' is not a number")
+    if number < minimum:
+        raise RowError(f"{field} cannot be below {minimum}")
+    return number
+
+
+def _text(row, field, required=False):
+    value = (row.get(field) or '').strip()
+    if required and not value:
+        raise RowError(f"{field} is required")
+    return value or None
+
+
+def registration(row, today):
+    """A registration dict (see herd_records.register_cattle) from one CSV or form row."""
+    sex = SEXES.get((row.get('sex') or '').strip().lower())
+    if sex is None:
+        raise RowError("sex must be female or male")
+    birth_date = parse_day(row.get('birth_date'), 'birth_date')
+    if birth_date > today:
+        raise RowError("birth_date is in the future")
+    category = (_text(row, 'status_category') or '').lower().replace(' ', '_') or None
+    return {'name': _text(row, 'name'), 'breed': _text(row, 'breed'), 'birth_date': birth_date, 'sex': sex,
+            'status_category': category, 'status': _text(row, 'status'), 'remark': _text(row, 'remark')}
+
+
+def read_registrations(lines, today=None):
+    """Registrations from CSV lines with a header row: ([(line, registration)], [(line, error)])."""
+    today = today or date.today()
+    reader = csv.DictReader(lines)
+    reader.fieldnames = [_normalise_header(name) for name in reader.fieldnames or []]
+    animals, errors = [], []
+    for row in reader:
+        try:
+            animals.append((reader.line_num, registration(row, today)))
+        except RowError as e:
+            errors.append((reader.line_num, str(e)))
+    return animals, errors
+
+
+def _animal(row, herd):
+    tag = (row.get('tag_number') or '').strip()
+    if not tag:
+        raise RowError("tag_number is required")
+    animal = herd.get(tag.upper())
+    if animal is None:
+        raise RowError(f"unknown tag_number '{tag}'")
+    return animal
+
+
+def _milk(row, herd, today):
+    cattle_id, _, _ = _animal(row, herd)
+    day = parse_day(row.get('date'), 'date')
+    if day > today:
+        raise RowError("date is in the future")
+    quantities = [_number(row.get(field), field) for field in ('morning_milk', 'mid_day_milk', 'evening_milk')]
+    if all(q is None for q in quantities):
+        raise RowError("at least one of morning_milk, mid_day_milk, evening_milk is required")
+    return (cattle_id, day), (cattle_id, day, *quantities, _text(row, 'notes'))
+
+
+def _breeding(row, herd, today):
+    cattle_id, _, _ = _animal(row, herd)
+    breeding_date = parse_day(row.get('breeding_date'), 'breeding_date')
+    if breeding_date > today:
+        raise RowError("breeding_date is in the future")
+    attempt = _number(row.get('breeding_attempt_number') or '1', 'breeding_attempt_number', minimum=1)
+    steaming_date = calculate_steaming_date(breeding_date)
+    return (cattle_id, breeding_date), (
+        cattle_id, breeding_date, _text(row, 'method', required=True), _text(row, 'semen_type'),
+        _number(row.get('semen_price'), 'semen_price'), _text(row, 'semen_batch_number'),
+        _text(row, 'sire_name'), int(attempt), _text(row, 'notes'), steaming_date,
+        calculate_expected_calving_date(steaming_date),
+        _optional_day(row.get('pregnancy_check_date'), 'pregnancy_check_date'),
+        _text(row, 'pregnancy_test_result'), _text(row, 'breeding_outcome'),
+    )
+
+
+def _calving(row, herd, today):
+    dam_id, dam_tag, dam_name = _animal(row, herd)
+    birth_date = parse_day(row.get('birth_date'), 'birth_date')
+    if birth_date > today:
+        raise RowError("birth_date is in the future")
+    return (dam_id, birth_date), (
+        dam_id, dam_tag, dam_name, _text(row, 'calf_name', required=True),
+        _text(row, 'calf_sex', required=True), birth_date, _text(row, 'breed', required=True),
+        _text(row, 'calf_condition'), _text(row, 'notes'),
+    )
+
+
+# Per record type: CSV row validator, staging columns (SQL types), the match that
+# makes a staged row a duplicate of a stored one, and the INSERT ... SELECT that
+# moves staged rows into the table; its %s is the importer's id or username.
+IMPORTS = {
+    'milk': {
+        'validate': _milk,
+        'staging': [('cattle_id', 'INTEGER'), ('date', 'DATE'), ('morning_milk', 'NUMERIC(10, 2)'),
+                    ('mid_day_milk', 'NUMERIC(10, 2)'), ('evening_milk', 'NUMERIC(10, 2)'), ('notes', 'TEXT')],
+        # Stored duplicates are skipped by the (cattle_id, date) unique index and found
+        # from what RETURNING leaves out: a probe per staged row turns into a merge
+        # join over the whole index on large tables.
+        'existing': None,
+        'insert': """
+            INSERT INTO milk_production (cattle_id, date, morning_milk, mid_day_milk, evening_milk, notes, recorded_by)
+            SELECT s.cattle_id, s.date, s.morning_milk, s.mid_day_milk, s.evening_milk, s.notes, %s
+            FROM import_staging s WHERE TRUE
+            ON CONFLICT (cattle_id, date) DO NOTHING
+            RETURNING cattle_id, date
+        """,
+        'recorded_by': 'id',
+    },
+    'breeding': {
+        'validate': _breeding,
+        'staging': [('cattle_id', 'INTEGER'), ('breeding_date', 'DATE'), ('method', 'TEXT'),
+                    ('semen_type', 'TEXT'), ('semen_price', 'NUMERIC(10, 2)'), ('semen_batch_number', 'TEXT'),
+                    ('sire_name', 'TEXT'), ('breeding_attempt_number', 'INTEGER'), ('notes', 'TEXT'),
+                    ('steaming_date', 'DATE'), ('expected_calving_date', 'DATE'),
+                    ('pregnancy_check_date', 'DATE'), ('pregnancy_test_result', 'TEXT'),
+                    ('breeding_outcome', 'TEXT')],
+        'existing': """SELECT 1 FROM breeding_records t WHERE t.cattle_id = s.cattle_id
+                       AND t.breeding_date = s.breeding_date AND t.remark IS DISTINCT FROM 'deleted'""",
+        'insert': """
+            INSERT INTO breeding_records (
+                cattle_id, breeding_date, method, semen_type, semen_price, semen_batch_number, sire_name,
+                breeding_attempt_number, notes, steaming_date, expected_calving_date, pregnancy_check_date,
+                pregnancy_test_result, breeding_outcome, recorded_by, created_at
+            )
+            SELECT s.cattle_id, s.breeding_date, s.method, s.semen_type, s.semen_price, s.semen_batch_number,
+                   s.sire_name, s.breeding_attempt_number, s.notes, s.steaming_date, s.expected_calving_date,
+                   s.pregnancy_check_date, s.pregnancy_test_result, s.breeding_outcome, %s, NOW()
+            FROM import_staging s
+            RETURNING cattle_id, breeding_date, method, sire_name, breeding_attempt_number
+        """,
+        'recorded_by': 'id',
+    },
+    'calving': {
+        'validate': _calving,
+        'staging': [('dam_id', 'INTEGER'), ('dam_tag_number', 'TEXT'), ('dam_name', 'TEXT'),
+                    ('calf_name', 'TEXT'), ('calf_sex', 'TEXT'), ('birth_date', 'DATE'), ('breed', 'TEXT'),
+                    ('calf_condition', 'TEXT'), ('notes', 'TEXT')],
+        'existing': """SELECT 1 FROM calving t WHERE t.dam_id = s.dam_id
+                       AND t.birth_date = s.birth_date AND t.is_active = TRUE""",
+        'insert': """
+            INSERT INTO calving (
+                dam_id, dam_tag_number, dam_name, calf_name, calf_sex, birth_date, breed,
+                calf_condition, notes, recorded_by
+            )
+            SELECT s.dam_id, s.dam_tag_number, s.dam_name, s.calf_name, s.calf_sex, s.birth_date, s.breed,
+                   s.calf_condition, s.notes, %s
+            FROM import_staging s
+            RETURNING calving_id, dam_id, birth_date, calf_name
+        """,
+        'recorded_by': 'username',
+    },
+}
+
+
+def _events(kind, inserted):
+    if kind == 'breeding':
+        return [{'cattle_id': row['cattle_id'], 'event_type': 'breeding', 'event_date': row['breeding_date'],
+                 'details': {'method': row['method'], 'sire_name': row['sire_name'],
+                             'attempt': row['breeding_attempt_number'], 'imported': True}}
+                for row in inserted]
+    if kind == 'calving':
+        return [{'cattle_id': row['dam_id'], 'event_type': 'calving', 'event_date': row['birth_date'],
+                 'details': {'calving_id': row['calving_id'], 'calf_name': row['calf_name'], 'imported': True}}
+                for row in inserted]
+    return []
+
+
+def _normalise_header(name):
+    name = (name or '').strip().lower().replace(' ', '_')
+    return HEADER_ALIASES.get(name, name)
+
+
+def _load_staging(cursor, columns, rows):
+    """Postgres: one COPY per batch. SQLite: executemany inside the open transaction."""
+    names = ', '.join(['line'] + columns)
+    if is_sqlite(cursor):
+        cursor.executemany(f"INSERT INTO {STAGING} ({names}) VALUES ({', '.join(['%s'] * (len(columns) + 1))})", rows)
+        return
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)  # None -> empty field -> NULL; dates print as ISO
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {STAGING} ({names}) FROM STDIN WITH (FORMAT csv)", buffer)
+    cursor.execute(f"ANALYZE {STAGING}")  # temp tables have no statistics; without them the duplicate check hash-joins the whole target
+
+
+def import_records(db, kind, lines, user, rejects=None, progress=None, batch_size=BATCH_SIZE):
+    """Validate and load a CSV of `kind` records (milk, breeding or calving) in one transaction.
+
+    `lines` is any iterable of CSV text lines with a header row; rows are validated
+    as they stream past (tag lookup, dates, numbers, duplicates within the file and
+    against stored records) and valid ones are staged in batches, then moved into
+    the real table with one INSERT ... SELECT per batch. `user` is a dict with the
+    importer's id and username. Rejected rows go to `rejects(line, error, row)`;
+    `progress(summary)` is called after every batch. Calving imports record the
+    calving history only; calves are not registered as animals.
+    Returns a summary dict.
+    """
+    spec = IMPORTS[kind]
+    columns = [name for name, _ in spec['staging']]
+    today = date.today()
+    started = time.perf_counter()
+    summary = {'kind': kind, 'read': 0, 'loaded': 0, 'rejected': 0, 'seconds': 0.0}
+    touched, first_day, last_day = set(), None, None
+
+    def reject(line, error, row):
+        summary['rejected'] += 1
+        if rejects:
+            rejects(line, error, row)
+
+    cursor = db.cursor()
+    cursor.execute("SELECT cattle_id, tag_number, name FROM cattle WHERE tag_number IS NOT NULL")
+    herd = {row['tag_number'].strip().upper(): (row['cattle_id'], row['tag_number'], row['name'])
+            for row in cursor.fetchall()}
+
+    cursor.execute(f"DROP TABLE IF EXISTS {STAGING}")
+    cursor.execute(f"CREATE TEMP TABLE {STAGING} (line INTEGER PRIMARY KEY, "
+                   + ', '.join(f"{name} {sql_type}" for name, sql_type in spec['staging']) + ")")
+
+    def flush(batch, rows_by_line):
+        _load_staging(cursor, columns, batch)
+        if spec['existing']:
+            cursor.execute(f"DELETE FROM {STAGING} AS s WHERE EXISTS ({spec['existing']}) RETURNING line")
+            for row in cursor.fetchall():
+                reject(row['line'], 'already recorded', rows_by_line[row['line']])
+        cursor.execute(spec['insert'], (user[spec['recorded_by']],))
+        inserted = cursor.fetchall()
+        if not spec['existing']:
+            stored = {(row['cattle_id'], to_date(row['date'])) for row in inserted}
+            for line, cattle_id, day, *_ in batch:
+                if (cattle_id, day) not in stored:
+                    reject(line, 'already recorded', rows_by_line[line])
+        record_events(cursor, _events(kind, inserted))
+        summary['loaded'] += len(inserted)
+        touched.update(row.get('cattle_id') or row.get('dam_id') for row in inserted)
+        cursor.execute(f"DELETE FROM {STAGING}")
+        summary['seconds'] = round(time.perf_counter() - started, 3)
+        if progress:
+            progress(dict(summary))
+
+    try:
+        reader = csv.DictReader(lines)
+        reader.fieldnames = [_normalise_header(name) for name in reader.fieldnames or []]
+        seen, batch, rows_by_line = {}, [], {}
+        for row in reader:
+            summary['read'] += 1
+            line = reader.line_num
+            try:
+                key, values = spec['validate'](row, herd, today)
+            except RowError as e:
+                reject(line, str(e), row)
+                continue
+            if key in seen:
+                reject(line, f"duplicate of line {seen[key]}", row)
+                continue
+            seen[key] = line
+            day = key[1]
+            first_day = min(first_day or day, day)
+            last_day = max(last_day or day, day)
+            batch.append((line, *values))
+            rows_by_line[line] = row
+            if len(batch) >= batch_size:
+                flush(batch, rows_by_line)
+                batch, rows_by_line = [], {}
+        if batch:
+            flush(batch, rows_by_line)
+
+        cursor.execute(f"DROP TABLE IF EXISTS {STAGING}")
+        if kind == 'milk' and summary['loaded']:
+            refresh_milk_rollups(cursor, first_day, last_day)
+        elif touched:
+            ids = None if len(touched) > STATUS_FULL_RECOMPUTE_AFTER else touched
+            recompute_statuses(db, cattle_ids=ids, commit=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def reject_writer(handle):
+    """rejects callback writing line, error and the original columns as CSV to `handle`."""
+    writer = None
+
+    def write(line, error, row):
+        nonlocal writer
+        if writer is None:
+            writer = csv.DictWriter(handle, fieldnames=['line', 'error'] + [k for k in row if k], extrasaction='ignore')
+            writer.writeheader()
+        writer.writerow(dict(row, line=line, error=error))
+    return write
@@ -0,0 +1,43 @@
+import csv
+import io
+import zlib
+
+CHUNK_BYTES = 64 * 1024
+
+
+def csv_chunks(columns, rows, compress=False):
+    """Yield CSV bytes in ~64 KB chunks: a header of `columns`, then one line per row tuple.
+
+    `rows` should be lazy (a generator over a streaming cursor) so memory stays
+    flat however many rows there are. The header goes out before the first row
+    is read. With `compress` the output is a gzip stream, flushed at every chunk
+    so the client receives data as it is produced.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    gzipper = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+
+    def drain():
+        data = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        return gzipper.compress(data) + gzipper.flush(zlib.Z_SYNC_FLUSH) if gzipper else data
+
+    writer.writerow(columns)
+    yield drain()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_BYTES:
+            yield drain()
+    tail = drain()
+    if gzipper:
+        tail += gzipper.flush()
+    if tail:
+        yield tail
+
+
+def stream_rows(cursor, query, params):
+    """Run `query` only when iteration starts, then yield its rows as the cursor fetches them."""
+    cursor.execute(query, params)
+    yield from cursor
+    cursor.close()
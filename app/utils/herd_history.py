@@ -0,0 +1,120 @@
+import json
+from collections import Counter
+from datetime import date, timedelta
+from sql_dialect import bulk_insert
+
+
+EVENT_COLUMNS = ['cattle_id', 'event_type', 'event_date', 'status_category', 'status', 'is_active', 'details']
+
+
+def _event_values(cattle_id, event_type, event_date=None, status_category=None, status=None,
+                  is_active=None, details=None):
+    return (
+        cattle_id, event_type, event_date or date.today(), status_category, status, is_active,
+        json.dumps(details, default=str) if details else None,
+    )
+
+
+def record_event(cursor, cattle_id, event_type, **fields):
+    """Append one event in the caller's transaction.
+
+    Pass status_category/status/is_active only when the event changes the
+    animal's state; breeding and calving events are recorded for history only.
+    """
+    cursor.execute(
+        f"INSERT INTO herd_events ({', '.join(EVENT_COLUMNS)}) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        _event_values(cattle_id, event_type, **fields)
+    )
+
+
+def record_events(cursor, events):
+    """Append many events with one statement. `events` is a list of record_event kwargs dicts."""
+    if not events:
+        return
+    bulk_insert(cursor, 'herd_events', EVENT_COLUMNS, [_event_values(**event) for event in events])
+
+
+def _apply(state, event):
+    current = state.get(event['cattle_id'], [None, None, True])
+    if event['status'] is not None or event['status_category'] is not None:
+        current = [event['status_category'], event['status'], current[2]]
+    if event['is_active'] is not None:
+        current = [current[0], current[1], bool(event['is_active'])]
+    state[event['cattle_id']] = current
+
+
+def herd_state_as_of(db, as_of):
+    """Rebuild {cattle_id: [status_category, status, is_active]} at the end of `as_of`.
+
+    Starts from the nearest snapshot on or before `as_of` and replays only the
+    events after it, archived animals' included. Returns (state, last_event_id).
+    """
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT as_of, last_event_id, state FROM herd_snapshots
+        WHERE as_of <= %s
+        ORDER BY as_of DESC
+        LIMIT 1
+    """, (as_of,))
+    snapshot = cursor.fetchone()
+
+    if snapshot:
+        state = {int(cid): value for cid, value in json.loads(snapshot['state']).items()}
+        last_event_id = snapshot['last_event_id']
+        # Events logged after the snapshot, plus any dated after it that it left out
+        cursor.execute("""
+            SELECT event_id, cattle_id, status_category, status, is_active
+            FROM herd_events_all
+            WHERE event_date <= %s AND (event_id > %s OR event_date > %s)
+            ORDER BY event_date, event_id
+        """, (as_of, last_event_id, snapshot['as_of']))
+    else:
+        state, last_event_id = {}, 0
+        cursor.execute("""
+            SELECT event_id, cattle_id, status_category, status, is_active
+            FROM herd_events_all
+            WHERE event_date <= %s
+            ORDER BY event_date, event_id
+        """, (as_of,))
+
+    for event in cursor.fetchall():
+        _apply(state, event)
+        last_event_id = max(last_event_id, event['event_id'])
+    return state, last_event_id
+
+
+def herd_composition_as_of(db, as_of):
+    """Count active animals per (status_category, status) on a given date."""
+    state, _ = herd_state_as_of(db, as_of)
+    counts = Counter((category, status) for category, status, active in state.values() if active)
+    return {
+        'as_of': as_of.isoformat(),
+        'total': sum(counts.values()),
+        'by_status': [
+            {'status_category': category, 'status': status, 'count': count}
+            for (category, status), count in sorted(counts.items(), key=lambda item: -item[1])
+        ],
+    }
+
+
+def write_snapshot(db, as_of=None, min_interval_days=7):
+    """Checkpoint herd state for `as_of` (default today) unless a recent snapshot exists.
+
+    Returns the number of animals in the snapshot, or 0 when skipped.
+    """
+    as_of = as_of or date.today()
+    cursor = db.cursor()
+    cursor.execute(
+        "SELECT 1 FROM herd_snapshots WHERE as_of > %s AND as_of <= %s LIMIT 1",
+        (as_of - timedelta(days=min_interval_days), as_of)
+    )
+    if cursor.fetchone():
+        return 0
+
+    state, last_event_id = herd_state_as_of(db, as_of)
+    cursor.execute("""
+        INSERT INTO herd_snapshots (as_of, last_event_id, animal_count, state)
+        VALUES (%s, %s, %s, %s)
+    """, (as_of, last_event_id, len(state), json.dumps(state, separators=(',', ':'))))
+    db.commit()
+    return len(state)
@@ -0,0 +1,110 @@
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import date
+
+TYPEAHEAD_LIMIT = 10
+TYPEAHEAD_MAX = 50
+
+MILKING_STATUSES = ('lactating', 'lactating in_calf')
+BREEDABLE_STATUSES = ('lactating', 'bullying heifer')
+
+# One compact record per active animal; `eligible_dam` means past the steaming
+# date of at least one breeding, the rule eligible_dam() enforces on writes.
+HerdAnimal = namedtuple('HerdAnimal', 'cattle_id tag_number name sex status status_category breedable eligible_dam')
+
+_cache = {'version': None, 'index': None}
+_cache_lock = threading.Lock()
+
+
+class HerdIndex:
+    """The active herd held in memory, with the orderings the picklists need."""
+
+    def __init__(self, animals):
+        self.animals = {animal.cattle_id: animal for animal in animals}
+        self.by_name = sorted(animals, key=lambda a: ((a.name or '').lower(), a.cattle_id))
+        self.by_tag = sorted(animals, key=lambda a: (a.tag_number.lower(), a.cattle_id))
+        self._name_keys = [(a.name or '').lower() for a in self.by_name]
+        self._tag_keys = [a.tag_number.lower() for a in self.by_tag]
+        self._by_status = {}
+        for animal in self.by_name:
+            self._by_status.setdefault(animal.status, []).append(animal)
+
+    def __len__(self):
+        return len(self.animals)
+
+    def get(self, cattle_id):
+        return self.animals.get(cattle_id)
+
+    def with_status(self, *statuses):
+        """Animals in any of `statuses`, by name."""
+        if len(statuses) == 1:
+            return list(self._by_status.get(statuses[0], []))
+        wanted = set(statuses)
+        return [animal for animal in self.by_name if animal.status in wanted]
+
+    def eligible_dams(self):
+        """Dams a calving can be recorded against, by tag."""
+        return [animal for animal in self.by_tag if animal.eligible_dam]
+
+    def breedable(self):
+        """Cows and heifers a breeding can be recorded for, by tag."""
+        return [animal for animal in self.by_tag if animal.breedable]
+
+    def prefix(self, text, limit=TYPEAHEAD_LIMIT):
+        """Up to `limit` animals whose tag number or name starts with `text` (tags first).
+
+        Binary search into the sorted keys, then a walk of at most `limit`
+        entries per ordering.
+        """
+        text = text.lower()
+        seen, matches = set(), []
+        for keys, animals in ((self._tag_keys, self.by_tag), (self._name_keys, self.by_name)):
+            i = bisect_left(keys, text)
+            while i < len(keys) and keys[i].startswith(text) and len(matches) < limit:
+                if animals[i].cattle_id not in seen:
+                    seen.add(animals[i].cattle_id)
+                    matches.append(animals[i])
+                i += 1
+        return matches
+
+
+def data_version(db, today):
+    """Every write to an animal (registration, edit, archive, breeding, calving,
+    status change) appends to herd_events, so the newest event_id, read off its
+    primary key, changes whenever the index could. The date covers breedings
+    passing their steaming date overnight."""
+    cursor = db.cursor()
+    cursor.execute("SELECT MAX(event_id) AS last_event FROM herd_events")
+    return (today, cursor.fetchone()['last_event'])
+
+
+def _load(db, today):
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT DISTINCT cattle_id FROM breeding_records WHERE steaming_date <= %s
+    """, (today,))
+    dams = {row['cattle_id'] for row in cursor.fetchall()}
+    cursor.execute("""
+        SELECT cattle_id, tag_number, name, sex, status, status_category
+        FROM cattle WHERE is_active = TRUE
+    """)
+    return HerdIndex([
+        HerdAnimal(row['cattle_id'], row['tag_number'], row['name'], row['sex'], row['status'],
+                   row['status_category'], row['status'] in BREEDABLE_STATUSES, row['cattle_id'] in dams)
+        for row in cursor.fetchall()
+    ])
+
+
+def herd_index(db, today=None):
+    """This process's HerdIndex, rebuilt only when data_version() moves."""
+    today = today or date.today()
+    version = data_version(db, today)
+    with _cache_lock:
+        if _cache['version'] == version:
+            return _cache['index']
+
+    index = _load(db, today)
+    with _cache_lock:
+        _cache.update(version=version, index=index)
+    return index
@@ -0,0 +1,149 @@
+from datetime import date, datetime, timedelta
+from sql_dialect import bulk_insert
+from app.utils.herd_history import record_event, record_events
+from app.utils.status_logic import initial_statuses
+from app.utils.tag_allocator import calf_tags, cattle_tags
+from app.utils.pedigree import resolve_sire, add_calf_lineage
+
+
+def parse_date(value):
+    """YYYY-MM-DD string (or date) to a date; raises ValueError otherwise."""
+    if hasattr(value, 'year'):
+        return value
+    return datetime.strptime(str(value), "%Y-%m-%d").date()
+
+
+def calculate_steaming_date(breeding_date):
+    return breeding_date + timedelta(days=213)  # 7 months
+
+
+def calculate_expected_calving_date(steaming_date):
+    return steaming_date + timedelta(days=60)  # 2 months after steaming
+
+
+def insert_breeding(cursor, data, recorded_by):
+    """Insert one breeding record plus its history event; returns the cattle_id.
+
+    `data` holds the add-breeding form fields. Raises ValueError for a bad breeding date.
+    The caller marks the cow's status dirty and commits.
+    """
+    breeding_date = parse_date(data['breeding_date'])
+    steaming_date = calculate_steaming_date(breeding_date)
+    expected_calving_date = calculate_expected_calving_date(steaming_date)
+    cattle_id = data['cattle_id']
+
+    cursor.execute("""
+        INSERT INTO breeding_records (
+            cattle_id, recorded_by, method, semen_type, semen_price, semen_batch_number,
+            sire_name, breeding_date, breeding_attempt_number, notes, steaming_date,
+            pregnancy_check_date, pregnancy_test_result, created_at, breeding_outcome, remark,
+            expected_calving_date
+        )
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), %s, %s, %s)
+    """, (
+        cattle_id, recorded_by, data['method'], data.get('semen_type') or None,
+        data.get('semen_price') or None, data.get('semen_batch_number') or None,
+        data.get('sire_name') or None, breeding_date, data['breeding_attempt_number'],
+        data.get('notes') or None, steaming_date, data.get('pregnancy_check_date') or None,
+        data.get('pregnancy_test_result') or None, data.get('breeding_outcome') or None,
+        data.get('remark') or None, expected_calving_date
+    ))
+    record_event(cursor, cattle_id, 'breeding', event_date=breeding_date,
+                 details={'method': data['method'], 'sire_name': data.get('sire_name') or None,
+                          'attempt': data['breeding_attempt_number']})
+    return cattle_id
+
+
+ELIGIBLE_DAM_QUERY = """
+    SELECT ca.tag_number, ca.name
+    FROM cattle ca
+    JOIN breeding_records b ON ca.cattle_id = b.cattle_id
+    WHERE ca.cattle_id = %s AND b.steaming_date IS NOT NULL
+      AND b.steaming_date <= CURRENT_DATE
+      AND ca.is_active = TRUE
+    ORDER BY b.breeding_date DESC
+    LIMIT 1
+"""
+
+
+def eligible_dam(cursor, dam_id):
+    """The dam's tag and name if she has a breeding past its steaming date, else None."""
+    cursor.execute(ELIGIBLE_DAM_QUERY, (dam_id,))
+    return cursor.fetchone()
+
+
+def insert_calving(cursor, data, dam, recorded_by):
+    """Insert a calving, register the calf with its dam and sire, and log both events.
+
+    `dam` is the row from eligible_dam(). The sire is the one named on the
+    dam's latest breeding. Returns (calving_id, calf_id, calf_tag). The caller
+    marks dam and calf dirty and commits.
+    """
+    dam_id = data['dam_id']
+    birth_date = data['birth_date']
+    cursor.execute("""
+        INSERT INTO calving (
+            dam_id, dam_tag_number, dam_name, calf_name, calf_sex,
+            birth_date, breed, calf_condition, notes, recorded_by
+        )
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        RETURNING calving_id
+    """, (dam_id, dam['tag_number'], dam['name'], data['calf_name'], data['calf_sex'], birth_date,
+          data['breed'], data.get('calf_condition'), data.get('notes'), recorded_by))
+    calving_id = cursor.fetchone()['calving_id']
+
+    calf_tag = calf_tags(cursor)[0]
+    sire_id, sire_name = resolve_sire(cursor, dam_id, birth_date)
+    cursor.execute("""
+        INSERT INTO cattle (
+            tag_number, name, sex, birth_date, breed,
+            status_category, status, is_active, remark, recorded_by, dam_id, sire_id, sire_name
+        )
+        VALUES (%s, %s, %s, %s, %s,
+                'young stock', 'newborn calf', TRUE, 'active', %s, %s, %s, %s)
+        RETURNING cattle_id
+    """, (calf_tag, data['calf_name'], data['calf_sex'], birth_date, data['breed'], recorded_by,
+          dam_id, sire_id, sire_name))
+    calf_id = cursor.fetchone()['cattle_id']
+    cursor.execute("UPDATE calving SET calf_id = %s WHERE calving_id = %s", (calf_id, calving_id))
+    add_calf_lineage(cursor, calf_id, dam_id, sire_id)
+
+    record_event(cursor, dam_id, 'calving', event_date=birth_date,
+                 details={'calving_id': calving_id, 'calf_tag_number': calf_tag})
+    record_event(cursor, calf_id, 'registered', event_date=birth_date,
+                 status_category='young stock', status='newborn calf', is_active=True,
+                 details={'tag_number': calf_tag, 'dam_id': dam_id})
+    return calving_id, calf_id, calf_tag
+
+
+def register_cattle(cursor, animals, recorded_by, today=None):
+    """Register a batch of animals: one block of TNF tags, one status pass, one multi-row insert.
+
+    `animals` are dicts with name, breed, birth_date (a date), sex, remark and,
+    for females over 10 months, the status_category/status chosen for them.
+    Returns ([(cattle_id, tag_number)] in batch order, [(index, error)]);
+    nothing is written unless every animal is valid. The caller marks the new
+    ids dirty and commits (a rollback also hands the tags back).
+    """
+    today = today or date.today()
+    statuses, errors = initial_statuses(animals, today)
+    if errors or not animals:
+        return [], errors
+
+    tags = cattle_tags(cursor, len(animals), on=today)
+    rows = [
+        (animal.get('name'), tag, animal.get('breed'), animal['birth_date'], animal['sex'].upper(),
+         status_category, status, recorded_by, True, animal.get('remark'))
+        for animal, tag, (status_category, status) in zip(animals, tags, statuses)
+    ]
+    inserted = bulk_insert(cursor, 'cattle',
+                           ['name', 'tag_number', 'breed', 'birth_date', 'sex',
+                            'status_category', 'status', 'recorded_by', 'is_active', 'remark'],
+                           rows, returning='cattle_id, tag_number')
+    ids = {row['tag_number']: row['cattle_id'] for row in inserted}
+    record_events(cursor, [
+        {'cattle_id': ids[tag], 'event_type': 'registered', 'status_category': status_category,
+         'status': status, 'is_active': True, 'details': {'tag_number': tag}}
+        for tag, (status_category, status) in zip(tags, statuses)
+    ])
+    return [(ids[tag], tag) for tag in tags], []
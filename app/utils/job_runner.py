@@ -0,0 +1,139 @@
+import os
+import socket
+import tempfile
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime
+from flask import current_app
+from database import get_db, is_postgres
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: lock files become advisory no-ops
+    fcntl = None
+
+
+# name -> function(db) returning the number of rows it touched
+JOBS = {}
+
+
+def job(name):
+    """Register a function as a runnable job under `name`."""
+    def decorator(func):
+        JOBS[name] = func
+        return func
+    return decorator
+
+
+@contextmanager
+def job_lock(db, name):
+    """Hold a cross-process lock for `name`; yields False if another process has it.
+
+    Postgres uses a session advisory lock, SQLite a lock file next to the
+    other workers (JOB_LOCK_DIR, defaults to the system temp dir).
+    """
+    if is_postgres():
+        cursor = db.cursor()
+        cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s)) AS locked", (f"job:{name}",))
+        locked = cursor.fetchone()['locked']
+        try:
+            yield locked
+        finally:
+            if locked:
+                cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", (f"job:{name}",))
+                db.commit()
+        return
+
+    lock_dir = current_app.config.get('JOB_LOCK_DIR') or tempfile.gettempdir()
+    with open(os.path.join(lock_dir, f"nyanyakwa-job-{name}.lock"), 'w') as lock_file:
+        locked = True
+        if fcntl:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                locked = False
+        try:
+            yield locked
+        finally:
+            if locked and fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _start_run(db, name):
+    cursor = db.cursor()
+    cursor.execute("""
+        INSERT INTO job_runs (job_name, status, started_at, host)
+        VALUES (%s, 'running', %s, %s)
+        RETURNING id
+    """, (name, datetime.now(), f"{socket.gethostname()}:{os.getpid()}"))
+    run_id = cursor.fetchone()['id']
+    db.commit()
+    return run_id
+
+
+def _finish_run(db, run_id, status, duration_ms, rows_touched=None, error=None):
+    cursor = db.cursor()
+    cursor.execute("""
+        UPDATE job_runs
+        SET status = %s, finished_at = %s, duration_ms = %s, rows_touched = %s, error = %s
+        WHERE id = %s
+    """, (status, datetime.now(), duration_ms, rows_touched, error, run_id))
+    db.commit()
+
+
+def _succeeded_since(db, name, since):
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT 1 FROM job_runs
+        WHERE job_name = %s AND status = 'success' AND started_at >= %s
+        LIMIT 1
+    """, (name, since))
+    return cursor.fetchone() is not None
+
+
+def run_job(name, since=None):
+    """Run a registered job under its lock and record it in job_runs.
+
+    With `since`, the job is skipped when it already succeeded at or after
+    that time, so schedulers in several processes still run it once per period.
+    Must be called inside an app context. Returns the job_runs row id, or
+    None when the job was skipped.
+    """
+    func = JOBS[name]
+    db = get_db()
+
+    with job_lock(db, name) as locked:
+        if not locked:
+            print(f"[JOB] ⏭️ {name} is already running elsewhere, skipping")
+            return None
+        if since is not None and _succeeded_since(db, name, since):
+            print(f"[JOB] ⏭️ {name} already ran since {since:%Y-%m-%d %H:%M}, skipping")
+            return None
+
+        run_id = _start_run(db, name)
+        started = time.perf_counter()
+        try:
+            rows_touched = func(db)
+        except Exception:
+            db.rollback()
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            _finish_run(db, run_id, 'failed', duration_ms, error=traceback.format_exc())
+            print(f"[JOB] ❌ {name} failed after {duration_ms} ms")
+            raise
+
+        duration_ms = int((time.perf_counter() - started) * 1000)
+        _finish_run(db, run_id, 'success', duration_ms, rows_touched=rows_touched)
+        print(f"[JOB] ✅ {name} touched {rows_touched} rows in {duration_ms} ms")
+        return run_id
+
+
+def recent_runs(db, limit=20):
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT id, job_name, status, started_at, duration_ms, rows_touched, host
+        FROM job_runs
+        ORDER BY started_at DESC
+        LIMIT %s
+    """, (limit,))
+    return cursor.fetchall()
@@ -0,0 +1,169 @@
+import threading
+from datetime import date
+import numpy as np
+from app.utils.milk_rollups import DAY_TOTAL
+from app.utils.status_engine import to_date
+
+LACTATION_DAYS = 305
+MIN_FIT_RECORDS = 10
+
+# Current lactation of every active cow: her records since her latest calving
+LACTATION_QUERY = f"""
+    SELECT mp.cattle_id, mp.date, {DAY_TOTAL} AS litres, lc.calved
+    FROM milk_production mp
+    JOIN (
+        SELECT dam_id, MAX(birth_date) AS calved
+        FROM calving WHERE is_active = TRUE
+        GROUP BY dam_id
+    ) lc ON lc.dam_id = mp.cattle_id
+    JOIN cattle c ON c.cattle_id = mp.cattle_id AND c.is_active = TRUE
+    WHERE mp.date >= lc.calved
+"""
+
+_cache = {'version': None, 'result': None}
+_cache_lock = threading.Lock()
+
+
+def analyse_lactations(cow_ids, calved, record_cow, record_day, record_litres, today):
+    """Lactation metrics for a whole herd in one batched pass.
+
+    cow_ids/calved: one entry per cow (calving date as a day ordinal).
+    record_cow/record_day/record_litres: one entry per milk record, with
+    record_cow indexing into cow_ids and record_day a day ordinal.
+    Records before a cow's calving are ignored.
+
+    Wood's curve y = a * t^b * e^(-ct) is fitted per cow by least squares on
+    ln y = ln a + b ln t - c t. Every cow's 3x3 normal equations are
+    accumulated with bincount and solved as one stacked linalg call.
+    Returns a dict of arrays aligned with cow_ids.
+    """
+    n = len(cow_ids)
+    calved = np.asarray(calved, dtype=np.int64)
+    record_cow = np.asarray(record_cow, dtype=np.int64)
+    t = np.asarray(record_day, dtype=np.int64) - calved[record_cow]
+    y = np.asarray(record_litres, dtype=np.float64)
+    keep = t >= 0
+    record_cow, t, y = record_cow[keep], t[keep], y[keep]
+
+    days_in_milk = today.toordinal() - calved
+    records = np.bincount(record_cow, minlength=n)
+    to_date_305 = np.bincount(record_cow, weights=np.where(t <= LACTATION_DAYS, y, 0.0), minlength=n)
+    last_day = np.full(n, -1, dtype=np.int64)
+    np.maximum.at(last_day, record_cow, t)
+
+    # Observed peak: highest daily yield and the first day it was reached
+    peak_yield = np.full(n, -np.inf)
+    np.maximum.at(peak_yield, record_cow, y)
+    at_peak = y == peak_yield[record_cow]
+    peak_day = np.full(n, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(peak_day, record_cow[at_peak], t[at_peak])
+    peak_yield[records == 0] = np.nan
+    peak_day[records == 0] = -1
+
+    # Wood's model on positive yields from day 1
+    fit = (t >= 1) & (y > 0)
+    fc, ft, fy = record_cow[fit], t[fit].astype(np.float64), np.log(y[fit])
+    lt = np.log(ft)
+    columns = [np.ones_like(ft), lt, -ft]
+
+    def per_cow(weights):
+        return np.bincount(fc, weights=weights, minlength=n)
+
+    xtx = np.empty((n, 3, 3))
+    xty = np.empty((n, 3))
+    for i in range(3):
+        xty[:, i] = per_cow(columns[i] * fy)
+        for j in range(i, 3):
+            xtx[:, i, j] = xtx[:, j, i] = per_cow(columns[i] * columns[j])
+
+    fittable = (per_cow(np.ones_like(ft)) >= MIN_FIT_RECORDS) & (np.abs(np.linalg.det(xtx)) > 1e-9)
+    params = np.full((n, 3), np.nan)
+    if fittable.any():
+        params[fittable] = np.linalg.solve(xtx[fittable], xty[fittable][..., None])[..., 0]
+    a, b, c = np.exp(params[:, 0]), params[:, 1], params[:, 2]
+
+    # Fitted curve on days 1..305 for every cow at once
+    days = np.arange(1, LACTATION_DAYS + 1, dtype=np.float64)
+    with np.errstate(over='ignore', invalid='ignore'):
+        curve = a[:, None] * days[None, :] ** b[:, None] * np.exp(-c[:, None] * days[None, :])
+        shaped = fittable & (b > 0) & (c > 0)
+        fitted_peak_day = np.where(shaped, b / c, np.nan)
+        fitted_peak = np.where(shaped, a * fitted_peak_day ** b * np.exp(-b), np.nan)
+        persistency = np.where(shaped, -(b + 1) * np.log(c), np.nan)
+
+    # 305-day projection: recorded litres so far plus the fitted curve for the days still to come
+    remaining = days[None, :] > last_day[:, None]
+    projected = to_date_305 + np.where(remaining, np.nan_to_num(curve), 0.0).sum(axis=1)
+    projected = np.where(shaped, projected, np.nan)
+
+    return {
+        'cattle_id': np.asarray(cow_ids),
+        'days_in_milk': days_in_milk,
+        'records': records,
+        'peak_yield': peak_yield,
+        'peak_day': peak_day,
+        'fitted_peak_yield': fitted_peak,
+        'fitted_peak_day': fitted_peak_day,
+        'persistency': persistency,
+        'wood_a': a,
+        'wood_b': b,
+        'wood_c': c,
+        'yield_to_date': to_date_305,
+        'projected_305': projected,
+    }
+
+
+def _load(db, today):
+    cursor = db.cursor()
+    cursor.execute(LACTATION_QUERY)
+    rows = cursor.fetchall()
+
+    index, cow_ids, calved = {}, [], []
+    record_cow = np.empty(len(rows), dtype=np.int64)
+    record_day = np.empty(len(rows), dtype=np.int64)
+    record_litres = np.empty(len(rows), dtype=np.float64)
+    for i, row in enumerate(rows):
+        cid = row['cattle_id']
+        if cid not in index:
+            index[cid] = len(cow_ids)
+            cow_ids.append(cid)
+            calved.append(to_date(row['calved']).toordinal())
+        record_cow[i] = index[cid]
+        record_day[i] = to_date(row['date']).toordinal()
+        record_litres[i] = float(row['litres'] or 0)
+    return analyse_lactations(cow_ids, calved, record_cow, record_day, record_litres, today)
+
+
+def data_version(db, today):
+    """Changes whenever milk is written (rollup markers) or calvings change."""
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT (SELECT MAX(updated_at) FROM milk_rollup_daily) AS milk,
+               (SELECT COUNT(*) FROM calving WHERE is_active = TRUE) AS calvings,
+               (SELECT MAX(calving_id) FROM calving) AS last_calving
+    """)
+    row = cursor.fetchone()
+    return (today, str(row['milk']), row['calvings'], row['last_calving'])
+
+
+def herd_lactations(db, today=None):
+    """Per-cow lactation metrics as a list of dicts, cached until milk or calving data changes."""
+    today = today or date.today()
+    version = data_version(db, today)
+    with _cache_lock:
+        if _cache['version'] == version:
+            return _cache['result']
+
+    metrics = _load(db, today)
+    result = []
+    for i in np.argsort(metrics['cattle_id']):
+        cow = {}
+        for key, values in metrics.items():
+            value = values[i].item()
+            cow[key] = None if isinstance(value, float) and np.isnan(value) else (
+                round(value, 4) if isinstance(value, float) else value)
+        result.append(cow)
+
+    with _cache_lock:
+        _cache.update(version=version, result=result)
+    return result
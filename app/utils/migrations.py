@@ -0,0 +1,137 @@
+import os
+import re
+from datetime import datetime
+from sql_dialect import is_sqlite
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'migrations')
+
+# 0004_hot_path_indexes.sql, with an optional 0004_hot_path_indexes.sqlite.sql override
+_FILENAME = re.compile(r"^(?P<version>\d{4})_(?P<name>\w+?)(?P<sqlite>\.sqlite)?\.sql$")
+_ADD_COLUMN_IF_NOT_EXISTS = re.compile(
+    r"^\s*ALTER\s+TABLE\s+(?P<table>\w+)\s+ADD\s+COLUMN\s+IF\s+NOT\s+EXISTS\s+(?P<column>\w+)",
+    re.IGNORECASE
+)
+
+
+def discover(sqlite=False):
+    """Return [(version, name, path)] in order, picking SQLite overrides when asked."""
+    found = {}
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        version = match.group('version')
+        is_override = bool(match.group('sqlite'))
+        if is_override and not sqlite:
+            continue
+        if version in found and not is_override:
+            continue
+        found[version] = (version, match.group('name'), os.path.join(MIGRATIONS_DIR, filename))
+    return [found[version] for version in sorted(found)]
+
+
+_TRIGGER = re.compile(r"^\s*CREATE\s+TRIGGER\b", re.IGNORECASE)
+_TRIGGER_END = re.compile(r"\bEND\s*$", re.IGNORECASE)
+
+
+def _inside_trigger(current):
+    """True while `current` is a CREATE TRIGGER whose BEGIN ... END body is still open."""
+    text = ''.join(current)
+    return bool(_TRIGGER.match(text)) and not _TRIGGER_END.search(text)
+
+
+def split_statements(sql):
+    """Split a migration file on top-level semicolons, dropping -- comments.
+
+    Semicolons inside quotes, $$-quoted bodies (PostgreSQL DO blocks) and
+    CREATE TRIGGER ... BEGIN ... END bodies (SQLite) do not end a statement.
+    """
+    statements, current, in_string, in_dollars = [], [], False, False
+    for line in sql.splitlines():
+        if not in_string and not in_dollars and line.strip().startswith('--'):
+            continue
+        for index, char in enumerate(line):
+            if char == "'" and not in_dollars:
+                in_string = not in_string
+            if char == '$' and not in_string and line[index:index + 2] == '$$':
+                in_dollars = not in_dollars
+            if char == ';' and not in_string and not in_dollars and not _inside_trigger(current):
+                statement = ''.join(current).strip()
+                if statement:
+                    statements.append(statement)
+                current = []
+            else:
+                current.append(char)
+        current.append('\n')
+    tail = ''.join(current).strip()
+    if tail:
+        statements.append(tail)
+    return statements
+
+
+def _ensure_table(db):
+    cursor = db.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+    """)
+    db.commit()
+
+
+def applied_versions(db):
+    _ensure_table(db)
+    cursor = db.cursor()
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row['version'] for row in cursor.fetchall()}
+
+
+def _sqlite_has_column(cursor, table, column):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return any(row['name'] == column for row in cursor.fetchall())
+
+
+def _execute(cursor, statement, sqlite):
+    if sqlite:
+        match = _ADD_COLUMN_IF_NOT_EXISTS.match(statement)
+        if match:
+            if _sqlite_has_column(cursor, match.group('table'), match.group('column')):
+                return
+            statement = re.sub(r"\s+IF\s+NOT\s+EXISTS", "", statement, count=1, flags=re.IGNORECASE)
+    cursor.execute(statement)
+
+
+def pending(db):
+    done = applied_versions(db)
+    return [m for m in discover(sqlite=is_sqlite(db)) if m[0] not in done]
+
+
+def upgrade(db, log=print):
+    """Apply every pending migration, each in its own transaction. Returns the versions applied."""
+    sqlite = is_sqlite(db)
+    applied = []
+    for version, name, path in pending(db):
+        with open(path) as f:
+            statements = split_statements(f.read())
+
+        cursor = db.cursor()
+        try:
+            if sqlite:
+                db.commit()
+                cursor.execute("BEGIN")  # make DDL transactional too
+            for statement in statements:
+                _execute(cursor, statement, sqlite)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (%s, %s, %s)",
+                (version, name, datetime.now())
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            log(f"[MIGRATE] ❌ {version}_{name} failed, rolled back")
+            raise
+        log(f"[MIGRATE] ✅ {version}_{name}")
+        applied.append(version)
+    return applied
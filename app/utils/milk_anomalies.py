@@ -0,0 +1,173 @@
+import math
+from datetime import timedelta
+from flask import current_app
+from database import get_stream_cursor
+from sql_dialect import bulk_insert
+from app.utils.milk_rollups import utc_now
+from app.utils.status_engine import to_date
+
+ALPHA = 0.1          # EWMA weight of the newest milking (~ the last 10-20 sessions dominate)
+WARMUP = 7           # sessions seen before a cow can be flagged
+MIN_STD = 0.5        # litres; keeps very steady cows from flagging on small wobbles
+SESSIONS = ('morning', 'mid_day', 'evening')  # milk_production's session columns, in order
+
+STATE_COLUMNS = ['cattle_id', 'session', 'mean', 'variance', 'samples', 'prev_mean', 'prev_variance',
+                 'last_date', 'last_value', 'last_z', 'flagged', 'flagged_on', 'updated_at']
+
+
+def observe(state, value, day, threshold):
+    """Fold one session yield into a cow's rolling state and return the new state dict.
+
+    `state` is the stored row (or None for a cow's first session). The value is
+    scored against the mean and variance *before* it is added, then the EWMA
+    mean and variance are updated incrementally. Re-observing the latest day
+    first rolls back to prev_mean/prev_variance so a corrected session replaces
+    the earlier figure. Days older than the latest are ignored (a backfill
+    handles late history).
+    """
+    if state is None:
+        return {'mean': value, 'variance': 0.0, 'samples': 1, 'prev_mean': None, 'prev_variance': None,
+                'last_date': day, 'last_value': value, 'last_z': None, 'flagged': False, 'flagged_on': None}
+
+    state = dict(state)
+    last_date = to_date(state['last_date'])
+    if day < last_date:
+        return None
+    if day == last_date and state['prev_mean'] is not None:
+        state.update(mean=state['prev_mean'], variance=state['prev_variance'], samples=state['samples'] - 1)
+    elif day == last_date:  # correcting a cow's very first session
+        return observe(None, value, day, threshold)
+
+    mean, variance = float(state['mean']), float(state['variance'])
+    z = (value - mean) / max(math.sqrt(variance), MIN_STD)
+    flagged = state['samples'] >= WARMUP and abs(z) >= threshold
+
+    delta = value - mean
+    increment = ALPHA * delta
+    return {
+        'mean': mean + increment,
+        'variance': (1 - ALPHA) * (variance + delta * increment),
+        'samples': state['samples'] + 1,
+        'prev_mean': mean,
+        'prev_variance': variance,
+        'last_date': day,
+        'last_value': value,
+        'last_z': round(z, 3),
+        'flagged': flagged,
+        'flagged_on': day if flagged else None,
+    }
+
+
+def _row(cattle_id, session_type, state, now):
+    return (cattle_id, session_type, state['mean'], state['variance'], state['samples'], state['prev_mean'],
+            state['prev_variance'], state['last_date'], state['last_value'], state['last_z'],
+            state['flagged'], state['flagged_on'], now)
+
+
+def _save(cursor, rows):
+    updates = ', '.join(f"{col} = EXCLUDED.{col}" for col in STATE_COLUMNS[2:])
+    bulk_insert(cursor, 'milk_yield_stats', STATE_COLUMNS, rows,
+                on_conflict=f"(cattle_id, session) DO UPDATE SET {updates}")
+
+
+def update_yield_stats(cursor, day, session_type, yields):
+    """Update rolling state for one session's [(cattle_id, litres)] with one read and one upsert.
+
+    Zero or missing yields (cow not milked, blank sheet cell) are skipped.
+    Returns the cattle_ids flagged by this session.
+    """
+    yields = {int(cid): float(litres) for cid, litres in yields if litres and float(litres) > 0}
+    if not yields:
+        return []
+    ids = sorted(yields)
+    marks = ', '.join(['%s'] * len(ids))
+    cursor.execute(f"""
+        SELECT * FROM milk_yield_stats WHERE session = %s AND cattle_id IN ({marks})
+    """, [session_type] + ids)
+    states = {row['cattle_id']: row for row in cursor.fetchall()}
+
+    threshold = current_app.config['MILK_ANOMALY_Z']
+    now = utc_now()
+    rows, flagged = [], []
+    for cattle_id in ids:
+        state = observe(states.get(cattle_id), yields[cattle_id], day, threshold)
+        if state is None:
+            continue
+        rows.append(_row(cattle_id, session_type, state, now))
+        if state['flagged']:
+            flagged.append(cattle_id)
+    _save(cursor, rows)
+    return flagged
+
+
+def forget_yields(cursor, day, session_types, cattle_ids):
+    """Undo `day`'s sessions for cows whose record was deleted or zeroed.
+
+    Where `day` is the state's last_date, the prev_mean/prev_variance snapshot
+    is restored, the sample is dropped and any flag is cleared; a cow's only
+    session removes the row. last_date moves back a day so a re-entered
+    figure counts as a new sample. Older days are left to a rebuild.
+    """
+    ids = sorted({int(cid) for cid in cattle_ids})
+    if not ids or not session_types:
+        return
+    id_marks = ', '.join(['%s'] * len(ids))
+    session_marks = ', '.join(['%s'] * len(session_types))
+    scope = f"cattle_id IN ({id_marks}) AND session IN ({session_marks}) AND last_date = %s"
+    params = ids + list(session_types) + [day]
+    cursor.execute(f"DELETE FROM milk_yield_stats WHERE {scope} AND prev_mean IS NULL", params)
+    cursor.execute(f"""
+        UPDATE milk_yield_stats
+        SET mean = prev_mean, variance = prev_variance, samples = samples - 1,
+            prev_mean = NULL, prev_variance = NULL, last_date = %s, last_value = NULL, last_z = NULL,
+            flagged = FALSE, flagged_on = NULL, updated_at = %s
+        WHERE {scope}
+    """, [day - timedelta(days=1), utc_now()] + params)
+
+
+def rebuild_yield_stats(db):
+    """Backfill: replay every cow's milk history in date order into fresh state rows.
+
+    Streams milk_production through a server-side cursor in (cattle_id, date)
+    index order, holding one small state per cow and session. Returns the
+    number of state rows written.
+    """
+    threshold = current_app.config['MILK_ANOMALY_Z']
+    states = {}
+    reader = get_stream_cursor('milk_anomaly_backfill', itersize=10000)
+    reader.execute("""
+        SELECT cattle_id, date, morning_milk, mid_day_milk, evening_milk
+        FROM milk_production
+        ORDER BY cattle_id, date
+    """)
+    for cattle_id, day, *values in reader:
+        day = to_date(day)
+        for session_type, value in zip(SESSIONS, values):
+            if value is not None and float(value) > 0:
+                key = (cattle_id, session_type)
+                state = observe(states.get(key), float(value), day, threshold)
+                if state is not None:
+                    states[key] = state
+    reader.close()
+
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM milk_yield_stats")
+    now = utc_now()
+    _save(cursor, [_row(cattle_id, session_type, state, now)
+                   for (cattle_id, session_type), state in sorted(states.items())])
+    db.commit()
+    return len(states)
+
+
+def flagged_cows(cursor, today, days=None):
+    """Active cows flagged within the last MILK_ANOMALY_DAYS, worst deviation first."""
+    days = days if days is not None else current_app.config['MILK_ANOMALY_DAYS']
+    cursor.execute("""
+        SELECT s.cattle_id, c.tag_number, c.name, s.session, s.last_value, s.prev_mean AS expected,
+               s.last_z, s.flagged_on
+        FROM milk_yield_stats s
+        JOIN cattle c ON c.cattle_id = s.cattle_id AND c.is_active = TRUE
+        WHERE s.flagged = TRUE AND s.flagged_on >= %s
+        ORDER BY s.flagged_on DESC, ABS(s.last_z) DESC
+    """, (today - timedelta(days=days),))
+    return cursor.fetchall()
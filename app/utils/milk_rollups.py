@@ -0,0 +1,142 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from sql_dialect import bulk_insert
+from app.utils.status_engine import to_date
+
+DAY_TOTAL = "COALESCE(morning_milk, 0) + COALESCE(mid_day_milk, 0) + COALESCE(evening_milk, 0)"
+
+
+def utc_now():
+    """Naive UTC timestamp for the rollups' updated_at (sent as Last-Modified)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _months(start, end):
+    month = month_start(start)
+    while month <= end:
+        yield month
+        month = next_month(month)
+
+
+def _upsert(cursor, table, key, rows, stamped=False):
+    columns = [key, 'total_litres', 'records']
+    updates = "total_litres = EXCLUDED.total_litres, records = EXCLUDED.records"
+    if stamped:
+        now = utc_now()
+        columns.append('updated_at')
+        rows = [row + (now,) for row in rows]
+        updates += ", updated_at = EXCLUDED.updated_at"
+    bulk_insert(cursor, table, columns, rows, on_conflict=f"({key}) DO UPDATE SET {updates}")
+
+
+def refresh_milk_rollups(cursor, start, end, cattle_ids=None):
+    """Recompute every rollup bucket touching the days start..end from milk_production.
+
+    Call in the same transaction as the milk write. Whole buckets are re-summed
+    (not adjusted by deltas), so the result is exact however the rows changed.
+    Herd totals include archived cows' milk; the per-cow rollup covers the hot
+    table only. Pass `cattle_ids` to limit the per-cow rollup to the animals written.
+    """
+    start, end = to_date(start), to_date(end)
+    low = min(month_start(start), week_start(start))
+    high = max(next_month(end), week_start(end) + timedelta(days=7))
+
+    cursor.execute(f"""
+        SELECT date, SUM({DAY_TOTAL}) AS litres, COUNT(*) AS records
+        FROM milk_production_all
+        WHERE date >= %s AND date < %s
+        GROUP BY date
+    """, (low, high))
+    days = {to_date(row['date']): (row['litres'], row['records']) for row in cursor.fetchall()}
+
+    daily, weekly, monthly = {}, defaultdict(lambda: [0, 0]), defaultdict(lambda: [0, 0])
+    day = start
+    while day <= end:
+        daily[day] = days.get(day, (0, 0))
+        day += timedelta(days=1)
+    for day, (litres, records) in days.items():
+        for bucket, key in ((weekly, week_start(day)), (monthly, month_start(day))):
+            bucket[key][0] += litres
+            bucket[key][1] += records
+
+    weeks = [week_start(start) + timedelta(days=7 * i)
+             for i in range((week_start(end) - week_start(start)).days // 7 + 1)]
+    months = list(_months(start, end))
+    _upsert(cursor, 'milk_rollup_daily', 'date', [(d, *v) for d, v in sorted(daily.items())], stamped=True)
+    _upsert(cursor, 'milk_rollup_weekly', 'week_start', [(w, *weekly[w]) for w in weeks])
+    _upsert(cursor, 'milk_rollup_monthly', 'month_start', [(m, *monthly[m]) for m in months])
+
+    for month in months:
+        params = [month, next_month(month)]
+        cow_filter = ""
+        if cattle_ids:
+            cow_filter = f"AND cattle_id IN ({', '.join(['%s'] * len(cattle_ids))})"
+            params += list(cattle_ids)
+        cursor.execute(f"""
+            SELECT cattle_id, SUM({DAY_TOTAL}) AS litres, COUNT(*) AS days
+            FROM milk_production
+            WHERE date >= %s AND date < %s {cow_filter}
+            GROUP BY cattle_id
+        """, params)
+        cows = {row['cattle_id']: (row['litres'], row['days']) for row in cursor.fetchall()}
+
+        # Cows whose last record in the month was deleted drop out of the rollup
+        stale_params = [month] + list(cows)
+        keep = f"AND cattle_id NOT IN ({', '.join(['%s'] * len(cows))})" if cows else ""
+        if cattle_ids:
+            keep += f" AND cattle_id IN ({', '.join(['%s'] * len(cattle_ids))})"
+            stale_params += list(cattle_ids)
+        cursor.execute(f"DELETE FROM milk_rollup_cow_monthly WHERE month_start = %s {keep}", stale_params)
+
+        now = utc_now()
+        bulk_insert(
+            cursor, 'milk_rollup_cow_monthly', ['cattle_id', 'month_start', 'total_litres', 'days', 'updated_at'],
+            [(cid, month, litres, n, now) for cid, (litres, n) in sorted(cows.items())],
+            on_conflict="(cattle_id, month_start) DO UPDATE SET total_litres = EXCLUDED.total_litres, "
+                        "days = EXCLUDED.days, updated_at = EXCLUDED.updated_at"
+        )
+    return len(daily)
+
+
+def rebuild_milk_rollups(db, since=None):
+    """Regenerate the rollups from raw milk records (after imports). Returns days covered."""
+    cursor = db.cursor()
+    cursor.execute("SELECT MIN(date) AS first, MAX(date) AS last FROM milk_production_all")
+    row = cursor.fetchone()
+    if not row['first']:
+        return 0
+    if since:
+        start = max(to_date(row['first']), to_date(since))
+    else:
+        start = to_date(row['first'])
+        for table in ('milk_rollup_daily', 'milk_rollup_weekly', 'milk_rollup_monthly', 'milk_rollup_cow_monthly'):
+            cursor.execute(f"DELETE FROM {table}")
+    days = refresh_milk_rollups(cursor, start, to_date(row['last']))
+    db.commit()
+    return days
+
+
+def recent_totals(cursor, weeks=4, months=6):
+    """Latest weekly and monthly herd totals for the milk summaries."""
+    cursor.execute(
+        "SELECT week_start, total_litres AS total_milk FROM milk_rollup_weekly "
+        "WHERE records > 0 ORDER BY week_start DESC LIMIT %s", (weeks,)
+    )
+    weekly = cursor.fetchall()
+    cursor.execute(
+        "SELECT month_start AS month, total_litres AS total_milk FROM milk_rollup_monthly "
+        "WHERE records > 0 ORDER BY month_start DESC LIMIT %s", (months,)
+    )
+    return weekly, cursor.fetchall()
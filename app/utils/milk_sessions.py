@@ -0,0 +1,61 @@
+import math
+from sql_dialect import bulk_insert
+from app.utils.milk_rollups import refresh_milk_rollups
+from app.utils.milk_anomalies import update_yield_stats, forget_yields
+
+SESSION_FIELDS = {
+    'morning': 'morning_milk',
+    'mid_day': 'mid_day_milk',
+    'evening': 'evening_milk',
+}
+
+
+def parse_quantity(value):
+    """Sheet quantities: blank or unreadable (including NaN/inf) counts as 0, like the original form handling."""
+    try:
+        quantity = float(value or 0)
+    except (ValueError, TypeError):
+        return 0.0
+    return quantity if math.isfinite(quantity) else 0.0
+
+
+def upsert_session(cursor, day, session_type, entries, recorded_by):
+    """Write one milking session for many cows in a single statement.
+
+    `entries` is [(cattle_id, quantity, notes)]; a cow listed twice keeps its
+    last entry. Only the session's own column is touched on existing rows, and
+    the day's milk rollups and the cows' rolling yield statistics are updated
+    in the same transaction; a cow re-entered as 0 drops that session's yield
+    from her statistics.
+    Returns the number of cows written.
+    """
+    field = SESSION_FIELDS[session_type]
+    latest = {}
+    for cattle_id, quantity, notes in entries:
+        latest[int(cattle_id)] = (quantity, notes)
+
+    rows = [(cid, day, recorded_by, notes, quantity) for cid, (quantity, notes) in latest.items()]
+    bulk_insert(
+        cursor, 'milk_production', ['cattle_id', 'date', 'recorded_by', 'notes', field], rows,
+        on_conflict=f"""(cattle_id, date) DO UPDATE SET
+            {field} = EXCLUDED.{field},
+            notes = EXCLUDED.notes,
+            recorded_by = EXCLUDED.recorded_by"""
+    )
+    if rows:
+        refresh_milk_rollups(cursor, day, day, cattle_ids=sorted(latest))
+        update_yield_stats(cursor, day, session_type, [(cid, quantity) for cid, (quantity, _) in latest.items()])
+        forget_yields(cursor, day, [session_type], [cid for cid, (quantity, _) in latest.items() if not quantity])
+    return len(rows)
+
+
+ACTIVE_CATTLE_QUERY = "SELECT cattle_id FROM cattle WHERE is_active = TRUE AND cattle_id IN ({marks})"
+
+
+def active_cattle_ids(cursor, cattle_ids):
+    """Subset of `cattle_ids` that exist and are active."""
+    ids = sorted({int(cid) for cid in cattle_ids})
+    if not ids:
+        return set()
+    cursor.execute(ACTIVE_CATTLE_QUERY.format(marks=', '.join(['%s'] * len(ids))), ids)
+    return {row['cattle_id'] for row in cursor.fetchall()}
@@ -0,0 +1,106 @@
+import base64
+import json
+import threading
+import time
+from datetime import date, datetime
+
+COUNT_CACHE_SECONDS = 60
+
+_count_cache = {}
+_count_lock = threading.Lock()
+
+
+def encode_cursor(values):
+    """Opaque, URL-safe token for a row's sort key."""
+    plain = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(plain, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, size):
+    """Sort key from a token, or None when it is missing or malformed."""
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except ValueError:
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+class Page:
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+
+def keyset_sql(query, keys, seek=None):
+    """The page statement keyset_page() runs: the first page, or with `seek`
+    'after'/'before' the one past a cursor. Params are the query's, then the
+    seek key's, then the page size."""
+    expressions = ', '.join(expr for expr, _ in keys)
+    marks = ', '.join(['%s'] * len(keys))
+    if seek == 'before':
+        return f"{query} AND ({expressions}) > ({marks}) ORDER BY " + ', '.join(f"{expr} ASC" for expr, _ in keys) + " LIMIT %s"
+    if seek == 'after':
+        return f"{query} AND ({expressions}) < ({marks}) ORDER BY " + ', '.join(f"{expr} DESC" for expr, _ in keys) + " LIMIT %s"
+    return f"{query} ORDER BY " + ', '.join(f"{expr} DESC" for expr, _ in keys) + " LIMIT %s"
+
+
+def keyset_page(cursor, query, params, keys, per_page=10, after=None, before=None):
+    """Fetch one page of `query` ordered by `keys` descending, seeking past a cursor.
+
+    `query` must already contain a WHERE clause and no ORDER BY/LIMIT. `keys`
+    maps SQL expressions to the result columns holding them, e.g.
+    [('mp.date', 'date'), ('mp.id', 'id')]; the last key must be unique.
+    Every page costs one index seek, however deep it is.
+    """
+    after_key = decode_cursor(after, len(keys))
+    before_key = decode_cursor(before, len(keys)) if after_key is None else None
+
+    if before_key is not None:
+        sql, seek = keyset_sql(query, keys, 'before'), before_key
+    elif after_key is not None:
+        sql, seek = keyset_sql(query, keys, 'after'), after_key
+    else:
+        sql, seek = keyset_sql(query, keys), []
+
+    cursor.execute(sql, list(params) + list(seek) + [per_page + 1])
+    rows = cursor.fetchall()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if before_key is not None:
+        rows.reverse()
+
+    def key_of(row):
+        return encode_cursor([row[column] for _, column in keys])
+
+    if not rows:
+        return Page(rows)
+    # Moving backwards, "more" means more rows before this page; a next page always exists
+    if before_key is not None:
+        return Page(rows, next_cursor=key_of(rows[-1]), prev_cursor=key_of(rows[0]) if has_more else None)
+    return Page(rows, next_cursor=key_of(rows[-1]) if has_more else None,
+                prev_cursor=key_of(rows[0]) if after_key is not None else None)
+
+
+def cached_count(cursor, query, params, ttl=COUNT_CACHE_SECONDS):
+    """COUNT(*) of `query`, cached per statement and parameters for `ttl` seconds."""
+    cache_key = (query, tuple(params))
+    now = time.monotonic()
+    with _count_lock:
+        hit = _count_cache.get(cache_key)
+    if hit and now - hit[0] < ttl:
+        return hit[1]
+
+    cursor.execute(f"SELECT COUNT(*) AS total FROM ({query}) AS counted", params)
+    total = cursor.fetchone()['total']
+    with _count_lock:
+        if len(_count_cache) > 256:
+            _count_cache.clear()
+        _count_cache[cache_key] = (now, total)
+    return total
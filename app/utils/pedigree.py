@@ -0,0 +1,251 @@
+import threading
+from datetime import date, timedelta
+from app.utils.herd_history import record_event
+from app.utils.herd_index import data_version
+
+MAX_DEPTH = 64  # generations followed when rebuilding; guards against a bad link forming a loop
+
+# Whole-table rebuild of cattle_ancestry from the dam/sire links (as in migration 0013)
+ANCESTRY_QUERY = f"""
+    WITH RECURSIVE parent_links (child, parent) AS (
+        SELECT cattle_id, dam_id FROM cattle WHERE dam_id IS NOT NULL
+        UNION ALL
+        SELECT cattle_id, sire_id FROM cattle WHERE sire_id IS NOT NULL
+    ), lineage (descendant_id, ancestor_id, depth) AS (
+        SELECT child, parent, 1 FROM parent_links
+        UNION ALL
+        SELECT l.descendant_id, p.parent, l.depth + 1
+        FROM lineage l JOIN parent_links p ON p.child = l.ancestor_id
+        WHERE l.depth < {MAX_DEPTH}
+    )
+    SELECT ancestor_id, descendant_id, MIN(depth) FROM lineage
+    GROUP BY ancestor_id, descendant_id
+"""
+
+_cache = {'version': None, 'pedigree': None}
+_cache_lock = threading.Lock()
+
+
+def sire_key(sire_id, sire_name):
+    """Graph node for a sire: the herd animal's id, else the normalised name of outside semen/bull."""
+    if sire_id:
+        return sire_id
+    return f"sire:{sire_name.strip().upper()}" if sire_name and sire_name.strip() else None
+
+
+def resolve_sire(cursor, dam_id, birth_date):
+    """(sire_id, sire_name) named by the dam's latest breeding on or before `birth_date`.
+
+    sire_id is set when the name is the tag number of an animal in the herd.
+    """
+    cursor.execute("""
+        SELECT b.sire_name, s.cattle_id AS sire_id
+        FROM breeding_records b
+        LEFT JOIN cattle s ON s.tag_number = b.sire_name
+        WHERE b.cattle_id = %s AND b.breeding_date <= %s AND b.remark IS DISTINCT FROM 'deleted'
+        ORDER BY b.breeding_date DESC
+        LIMIT 1
+    """, (dam_id, birth_date))
+    row = cursor.fetchone()
+    return (row['sire_id'], row['sire_name']) if row else (None, None)
+
+
+def _add_lineage(cursor, cattle_id, parents):
+    """Closure rows for one animal: its parents at depth 1 plus the parents' ancestors."""
+    parents = sorted({p for p in parents if p})
+    if not parents:
+        return
+    marks = ', '.join(['%s'] * len(parents))
+    cursor.execute(f"""
+        INSERT INTO cattle_ancestry (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, %s, MIN(depth) FROM (
+            SELECT ancestor_id, depth + 1 AS depth FROM cattle_ancestry WHERE descendant_id IN ({marks})
+            UNION ALL
+            SELECT cattle_id, 1 FROM cattle WHERE cattle_id IN ({marks})
+        ) AS up
+        GROUP BY ancestor_id
+    """, [cattle_id] + parents + parents)
+
+
+def add_calf_lineage(cursor, calf_id, dam_id, sire_id):
+    """Closure rows for a newborn (no descendants yet, so nothing else moves)."""
+    _add_lineage(cursor, calf_id, (dam_id, sire_id))
+
+
+def descendant_ids(cursor, cattle_id):
+    cursor.execute("SELECT descendant_id FROM cattle_ancestry WHERE ancestor_id = %s", (cattle_id,))
+    return {row['descendant_id'] for row in cursor.fetchall()}
+
+
+def set_parents(cursor, cattle_id, dam_id=None, sire_id=None, sire_name=None):
+    """Record (or correct) an animal's dam and sire and re-derive the lineage below it.
+
+    Raises ValueError if a parent is the animal itself or one of its
+    descendants. The animal's own closure rows and those of its whole
+    descendant subtree are rebuilt parents-first, in the caller's transaction.
+    """
+    subtree = descendant_ids(cursor, cattle_id) | {cattle_id}
+    if {dam_id, sire_id} & subtree:
+        raise ValueError("a parent cannot be the animal itself or one of its descendants")
+    if sire_id and not sire_name:
+        cursor.execute("SELECT tag_number FROM cattle WHERE cattle_id = %s", (sire_id,))
+        row = cursor.fetchone()
+        sire_name = row['tag_number'] if row else None
+
+    cursor.execute("""
+        UPDATE cattle SET dam_id = %s, sire_id = %s, sire_name = %s WHERE cattle_id = %s
+    """, (dam_id, sire_id, sire_name, cattle_id))
+    record_event(cursor, cattle_id, 'pedigree',
+                 details={'dam_id': dam_id, 'sire_id': sire_id, 'sire_name': sire_name})
+
+    rebuild_lineage(cursor, subtree)
+
+
+def rebuild_lineage(cursor, cattle_ids):
+    """Re-derive the closure rows of `cattle_ids` from their dam/sire links, parents first.
+
+    Ancestors outside the set must already have correct rows.
+    """
+    ids = sorted(cattle_ids)
+    marks = ', '.join(['%s'] * len(ids))
+    cursor.execute(f"DELETE FROM cattle_ancestry WHERE descendant_id IN ({marks})", ids)
+    cursor.execute(f"SELECT cattle_id, dam_id, sire_id FROM cattle WHERE cattle_id IN ({marks})", ids)
+    parents = {row['cattle_id']: {row['dam_id'], row['sire_id']} - {None} for row in cursor.fetchall()}
+    pending = set(parents)
+    while pending:
+        ready = sorted(cid for cid in pending if not parents[cid] & pending)
+        for cid in ready:
+            _add_lineage(cursor, cid, parents[cid])
+        pending.difference_update(ready)
+
+
+def rebuild_ancestry(db):
+    """Recompute cattle_ancestry from scratch; returns the number of rows written."""
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM cattle_ancestry")
+    cursor.execute(f"INSERT INTO cattle_ancestry (ancestor_id, descendant_id, depth) {ANCESTRY_QUERY}")
+    cursor.execute("SELECT COUNT(*) AS n FROM cattle_ancestry")
+    count = cursor.fetchone()['n']
+    db.commit()
+    return count
+
+
+def lineage(cursor, cattle_id, ancestors=True, max_depth=None):
+    """Ancestors (or descendants) of one animal with tag, name and depth, nearest first."""
+    mine, theirs = ('descendant_id', 'ancestor_id') if ancestors else ('ancestor_id', 'descendant_id')
+    query = f"""
+        SELECT c.cattle_id, c.tag_number, c.name, c.sex, c.is_active, a.depth
+        FROM cattle_ancestry a
+        JOIN cattle c ON c.cattle_id = a.{theirs}
+        WHERE a.{mine} = %s
+    """
+    params = [cattle_id]
+    if max_depth:
+        query += " AND a.depth <= %s"
+        params.append(max_depth)
+    cursor.execute(query + " ORDER BY a.depth, c.cattle_id", params)
+    return cursor.fetchall()
+
+
+class Pedigree:
+    """The herd's parent graph with memoized kinship and inbreeding coefficients.
+
+    Nodes are cattle_ids, plus "sire:NAME" strings for sires known only by
+    name, so two calves by the same AI bull count as half-siblings.
+    """
+
+    def __init__(self, parents):
+        self.parents = parents          # {node: (dam, sire)}
+        self._generation = {}
+        self._kinship = {}
+
+    def generation(self, node):
+        """0 for founders, else one more than the deeper parent; an ancestor always ranks below."""
+        if node not in self._generation:
+            dam, sire = self.parents.get(node, (None, None))
+            self._generation[node] = 1 + max(self.generation(dam) if dam else -1,
+                                             self.generation(sire) if sire else -1)
+        return self._generation[node]
+
+    def inbreeding(self, node):
+        """Wright's F: the kinship of the animal's parents (0 if either is unknown)."""
+        dam, sire = self.parents.get(node, (None, None))
+        return self.kinship(dam, sire)
+
+    def kinship(self, a, b):
+        """Probability that alleles drawn at random from a and b are identical by descent.
+
+        Recursive (tabular-method) definition: f(a, a) = (1 + F_a) / 2, and
+        otherwise the younger animal is replaced by the mean over its parents.
+        Expanding the higher generation first means the one expanded is never
+        an ancestor of the other. Every pair is computed once.
+        """
+        if a is None or b is None:
+            return 0.0
+        if a == b:
+            return 0.5 * (1 + self.inbreeding(a))
+        if (self.generation(a), str(a)) > (self.generation(b), str(b)):
+            a, b = b, a
+        key = (a, b)
+        if key not in self._kinship:
+            dam, sire = self.parents.get(b, (None, None))
+            self._kinship[key] = 0.5 * (self.kinship(a, dam) + self.kinship(a, sire))
+        return self._kinship[key]
+
+
+def _load(db):
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT cattle_id, dam_id, sire_id, sire_name FROM cattle
+        WHERE dam_id IS NOT NULL OR sire_id IS NOT NULL OR sire_name IS NOT NULL
+    """)
+    return Pedigree({row['cattle_id']: (row['dam_id'], sire_key(row['sire_id'], row['sire_name']))
+                     for row in cursor.fetchall()})
+
+
+def herd_pedigree(db):
+    """This process's Pedigree, reloaded when herd_events moves (pedigree edits and calvings log events)."""
+    version = data_version(db, date.today())
+    with _cache_lock:
+        if _cache['version'] == version:
+            return _cache['pedigree']
+
+    pedigree = _load(db)
+    with _cache_lock:
+        _cache.update(version=version, pedigree=pedigree)
+    return pedigree
+
+
+def candidate_sires(cursor, semen_days=3 * 365):
+    """Active herd bulls plus outside sires named on breedings in the last `semen_days`."""
+    cursor.execute("""
+        SELECT cattle_id, tag_number, name FROM cattle
+        WHERE is_active = TRUE AND UPPER(sex) IN ('M', 'MALE')
+        ORDER BY tag_number
+    """)
+    bulls = [{'sire_id': row['cattle_id'], 'sire_name': row['tag_number'], 'name': row['name'], 'source': 'herd'}
+             for row in cursor.fetchall()]
+    herd_tags = {bull['sire_name'] for bull in bulls}
+    cursor.execute("""
+        SELECT DISTINCT sire_name FROM breeding_records
+        WHERE sire_name IS NOT NULL AND sire_name <> '' AND breeding_date >= %s
+    """, (date.today() - timedelta(days=semen_days),))
+    outside = {}
+    for row in cursor.fetchall():
+        key = sire_key(None, row['sire_name'])
+        if key and row['sire_name'] not in herd_tags:
+            outside.setdefault(key, row['sire_name'].strip())
+    return bulls + [{'sire_id': None, 'sire_name': name, 'name': None, 'source': 'semen'}
+                    for _, name in sorted(outside.items())]
+
+
+def score_mates(pedigree, cow_id, candidates, max_inbreeding):
+    """Candidates ranked by the inbreeding a calf of theirs with `cow_id` would have (lowest first)."""
+    scored = []
+    for sire in candidates:
+        if sire['sire_id'] == cow_id:
+            continue
+        f = pedigree.kinship(cow_id, sire_key(sire['sire_id'], sire['sire_name']))
+        scored.append(dict(sire, offspring_inbreeding=round(f, 5), acceptable=f <= max_inbreeding))
+    scored.sort(key=lambda sire: (sire['offspring_inbreeding'], sire['sire_name']))
+    return scored
@@ -0,0 +1,172 @@
+import re
+import threading
+import time
+from collections import Counter
+from flask import g, request, has_request_context
+from database import on_query, pool_stats
+
+# Prometheus-style cumulative buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 500)
+SLOWEST_KEPT = 3
+
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES\s*\([^()]*\)(?:\s*,\s*\([^()]*\))*", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+_lock = threading.Lock()
+_routes = {}             # endpoint -> {'duration', 'db_time', 'queries'} histograms
+_n_plus_one = Counter()  # (endpoint, shape) -> requests flagged
+
+
+def statement_shape(sql):
+    """Collapse literals, IN lists and VALUES rows so repeated statements compare equal."""
+    if isinstance(sql, bytes):
+        sql = sql.decode(errors='replace')
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _VALUES_LIST.sub('VALUES (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+def _route_metrics(endpoint):
+    metrics = _routes.get(endpoint)
+    if metrics is None:
+        metrics = _routes[endpoint] = {
+            'duration': Histogram(DURATION_BUCKETS),
+            'db_time': Histogram(DURATION_BUCKETS),
+            'queries': Histogram(QUERY_COUNT_BUCKETS),
+        }
+    return metrics
+
+
+def _record_query(sql, elapsed):
+    if not has_request_context() or 'query_stats' not in g:
+        return  # CLI commands, jobs and the scheduler are not request-scoped
+    stats = g.query_stats
+    stats['count'] += 1
+    stats['db_time'] += elapsed
+    stats['shapes'][statement_shape(sql)] += 1
+    slowest = stats['slowest']
+    if len(slowest) < SLOWEST_KEPT or elapsed > slowest[-1][0]:
+        slowest.append((elapsed, sql))
+        slowest.sort(key=lambda item: -item[0])
+        del slowest[SLOWEST_KEPT:]
+
+
+def request_query_stats():
+    """This request's query count, DB time and slowest statements so far."""
+    return g.get('query_stats')
+
+
+def init_query_metrics(app):
+    """Count queries per request, flag likely N+1 patterns and keep per-route histograms."""
+    threshold = app.config.get('QUERY_N_PLUS_ONE_THRESHOLD', 10)
+    slow_ms = app.config.get('SLOW_REQUEST_MS', 500)
+
+    on_query(_record_query)
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats = {
+            'started': time.perf_counter(),
+            'count': 0,
+            'db_time': 0.0,
+            'shapes': Counter(),
+            'slowest': [],
+        }
+
+    @app.after_request
+    def finish_query_stats(response):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+        duration = time.perf_counter() - stats['started']
+        endpoint = request.endpoint or 'unmatched'
+
+        repeated = [(shape, n) for shape, n in stats['shapes'].items() if n >= threshold]
+        with _lock:
+            metrics = _route_metrics(endpoint)
+            metrics['duration'].observe(duration)
+            metrics['db_time'].observe(stats['db_time'])
+            metrics['queries'].observe(stats['count'])
+            for shape, _ in repeated:
+                _n_plus_one[(endpoint, shape)] += 1
+
+        for shape, n in repeated:
+            print(f"[QUERIES] ⚠️ {endpoint}: likely N+1, {n}× {shape[:160]}")
+        if duration * 1000 >= slow_ms:
+            print(f"[QUERIES] 🐢 {endpoint} took {duration * 1000:.0f} ms "
+                  f"({stats['count']} queries, {stats['db_time'] * 1000:.0f} ms in DB)")
+            for elapsed, sql in stats['slowest']:
+                print(f"    {elapsed * 1000:.1f} ms  {statement_shape(sql)[:160]}")
+
+        response.headers['Server-Timing'] = (
+            f'db;dur={stats["db_time"] * 1000:.1f};desc="{stats["count"]} queries", '
+            f'total;dur={duration * 1000:.1f}'
+        )
+        return response
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def _histogram_lines(name, endpoint, histogram):
+    lines = []
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+    lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="+Inf"}} {histogram.total}')
+    lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {histogram.sum:.6f}')
+    lines.append(f'{name}_count{{endpoint="{endpoint}"}} {histogram.total}')
+    return lines
+
+
+def render_metrics():
+    """This worker's metrics in the Prometheus text exposition format."""
+    families = [
+        ('farm_request_duration_seconds', 'duration', 'Request latency by endpoint.'),
+        ('farm_request_db_seconds', 'db_time', 'Time spent in database calls per request.'),
+        ('farm_request_queries', 'queries', 'SQL statements executed per request.'),
+    ]
+    with _lock:
+        lines = []
+        for name, key, help_text in families:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+            for endpoint in sorted(_routes):
+                lines += _histogram_lines(name, _label(endpoint), _routes[endpoint][key])
+
+        lines += ['# HELP farm_n_plus_one_total Requests that repeated one statement shape past the threshold.',
+                  '# TYPE farm_n_plus_one_total counter']
+        for (endpoint, shape), count in sorted(_n_plus_one.items()):
+            lines.append(f'farm_n_plus_one_total{{endpoint="{_label(endpoint)}",shape="{_label(shape[:200])}"}} {count}')
+
+    pool = pool_stats()['pool']
+    if pool:
+        lines += ['# HELP farm_db_pool Connection pool state for this worker.', '# TYPE farm_db_pool gauge']
+        for key in ('in_use', 'idle', 'waiting', 'max'):
+            lines.append(f'farm_db_pool{{state="{key}"}} {pool[key]}')
+        lines += ['# TYPE farm_db_pool_checkouts_total counter',
+                  f'farm_db_pool_checkouts_total {pool["checkouts"]}',
+                  '# TYPE farm_db_pool_timeouts_total counter',
+                  f'farm_db_pool_timeouts_total {pool["timeouts"]}']
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,100 @@
+import re
+from datetime import date
+from sql_dialect import is_sqlite, translate
+from app.utils.status_engine import herd_state_query, DUE_QUERY
+from app.utils.pagination import keyset_sql
+from app.utils.milk_sessions import ACTIVE_CATTLE_QUERY
+from app.utils.herd_records import ELIGIBLE_DAM_QUERY
+from app.utils.timeline import TIMELINE_QUERY, TIMELINE_VERSION_QUERY
+from app.routes.cattle import CATTLE_LIST_QUERY, CATTLE_LIST_KEYS
+from app.routes.milk import MILK_LIST_QUERY, MILK_LIST_KEYS
+
+# The statements the hot paths actually run, imported from where they are
+# defined, with sample params. Paged lists are checked in every shape
+# keyset_sql() produces: first page, next page and previous page.
+_MILK_LIST = MILK_LIST_QUERY.format(filters="c.is_active = TRUE")
+
+HOT_QUERIES = [
+    ('cattle_list first page', keyset_sql(CATTLE_LIST_QUERY, CATTLE_LIST_KEYS), (11,)),
+    ('cattle_list next page', keyset_sql(CATTLE_LIST_QUERY, CATTLE_LIST_KEYS, 'after'), (1000000, 11)),
+    ('cattle_list previous page', keyset_sql(CATTLE_LIST_QUERY, CATTLE_LIST_KEYS, 'before'), (0, 11)),
+    ('milk_list first page', keyset_sql(_MILK_LIST, MILK_LIST_KEYS), (11,)),
+    ('milk_list next page', keyset_sql(_MILK_LIST, MILK_LIST_KEYS, 'after'), (date.today(), 1000000000, 11)),
+    ('milk_list previous page', keyset_sql(_MILK_LIST, MILK_LIST_KEYS, 'before'), (date(2000, 1, 1), 0, 11)),
+    ('milk session active cows', ACTIVE_CATTLE_QUERY.format(marks='%s, %s, %s'), (1, 2, 3)),
+    ('add_calving dam eligibility', ELIGIBLE_DAM_QUERY, (1,)),
+    ('animal timeline', TIMELINE_QUERY, (1,) * 6),
+    ('animal timeline etag', TIMELINE_VERSION_QUERY, (1,) * 4),
+    ('status daily due set', DUE_QUERY, (date.today(),)),
+    ('status dirty set', *herd_state_query([1, 2, 3])),
+]
+
+_TABLE_REFS = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+def table_sizes(db):
+    cursor = db.cursor()
+    if is_sqlite(db):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%%'")
+        sizes = {}
+        for row in cursor.fetchall():
+            cursor.execute(f"SELECT COUNT(*) AS n FROM {row['name']}")
+            sizes[row['name']] = cursor.fetchone()['n']
+        return sizes
+
+    cursor.execute("ANALYZE")
+    db.commit()
+    cursor.execute("""
+        SELECT c.relname, GREATEST(c.reltuples, 0)::bigint AS n
+        FROM pg_class c JOIN pg_namespace ns ON ns.oid = c.relnamespace
+        WHERE c.relkind = 'r' AND ns.nspname = current_schema()
+    """)
+    return {row['relname']: row['n'] for row in cursor.fetchall()}
+
+
+def _postgres_seq_scans(plan):
+    if plan.get('Node Type') == 'Seq Scan':
+        yield plan['Relation Name']
+    for child in plan.get('Plans', []):
+        yield from _postgres_seq_scans(child)
+
+
+def sequential_scans(db, sql, params):
+    """Tables the planner would read with a full sequential scan for this statement."""
+    cursor = db.cursor()
+    if is_sqlite(db):
+        aliases = {}
+        for table, alias in _TABLE_REFS.findall(translate(sql)):
+            aliases[table] = table
+            if alias and alias.upper() not in ('WHERE', 'JOIN', 'LEFT', 'ON', 'ORDER', 'GROUP', 'LIMIT'):
+                aliases[alias] = table
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        details = [row['detail'] for row in cursor.fetchall()]
+        # A LIMITed statement whose outer table is walked in rowid order (no
+        # temp B-tree sort) stops after LIMIT rows: SQLite still calls it SCAN
+        if (details and sql.rstrip().upper().endswith('LIMIT %S')
+                and 'USE TEMP B-TREE FOR ORDER BY' not in details):
+            details = details[1:]
+        scans = []
+        for detail in details:
+            match = _SQLITE_SCAN.match(detail)
+            if match and match.group(1) in aliases:
+                scans.append(aliases[match.group(1)])
+        return scans
+
+    cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+    plan = cursor.fetchone()['QUERY PLAN'][0]['Plan']
+    return list(_postgres_seq_scans(plan))
+
+
+def verify_plans(db, min_rows=10000):
+    """EXPLAIN every hot query; returns [(name, table, rows)] for scans of large tables."""
+    sizes = table_sizes(db)
+    failures = []
+    for name, sql, params in HOT_QUERIES:
+        for table in sequential_scans(db, sql, params):
+            if sizes.get(table, 0) >= min_rows:
+                failures.append((name, table, sizes[table]))
+    db.rollback()
+    return failures
@@ -0,0 +1,44 @@
+from sql_dialect import is_sqlite
+
+MIN_TRIGRAM = 3  # shorter terms have no trigram to look up and fall back to LIKE
+
+# Searchable tables: their key, the text columns a search covers, and the
+# SQLite FTS5 index over them (migration 0010). On PostgreSQL the same columns
+# carry pg_trgm GIN indexes, which serve ILIKE '%term%' directly.
+SEARCHES = {
+    'cattle': {'key': 'cattle_id', 'columns': ('name', 'tag_number', 'breed'), 'fts': 'cattle_search'},
+    'users': {'key': 'id', 'columns': ('username', 'email', 'first_name', 'last_name'), 'fts': 'users_search'},
+}
+
+
+def like_escape(term):
+    """Escape LIKE wildcards so user input only ever matches literally."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _fts_phrase(term, columns):
+    phrase = '"' + term.replace('"', '""') + '"'
+    return '{' + ' '.join(columns) + '} : ' + phrase
+
+
+def search_filter(cursor, table, term, columns=None, key=None):
+    """Return (sql, params) restricting a query to rows of `table` whose text contains `term`.
+
+    `columns` narrows the search to some of the table's SEARCHES columns. With
+    `key` (the outer query's column referencing `table`, e.g. 'mp.cattle_id')
+    the filter is an IN (...) lookup; without it the filter applies to
+    `table`'s own rows. Matching is case-insensitive everywhere: ILIKE over
+    trigram indexes on PostgreSQL, an FTS5 trigram MATCH on SQLite.
+    """
+    spec = SEARCHES[table]
+    columns = columns or spec['columns']
+    if is_sqlite(cursor) and len(term) >= MIN_TRIGRAM:
+        return (f"{key or spec['key']} IN (SELECT rowid FROM {spec['fts']} WHERE {spec['fts']} MATCH %s)",
+                [_fts_phrase(term, columns)])
+
+    pattern = f"%{like_escape(term)}%"
+    matches = ' OR '.join(f"{column} ILIKE %s ESCAPE '\\'" for column in columns)
+    if key:
+        return f"{key} IN (SELECT {spec['key']} FROM {table} WHERE {matches})", [pattern] * len(columns)
+    return f"({matches})", [pattern] * len(columns)
+
@@ -0,0 +1,261 @@
+from collections import Counter
+from datetime import datetime, date
+from dateutil.relativedelta import relativedelta
+from sql_dialect import bulk_update
+from app.utils.herd_history import record_events
+
+
+# One round trip: every active animal with its latest breeding and calving date.
+# {breeding_filter}/{calving_filter}/{cattle_filter} narrow it to a dirty set.
+HERD_STATE_QUERY = """
+    SELECT c.cattle_id, c.tag_number, c.name, c.sex, c.birth_date,
+           c.status, c.status_category, c.next_status_change,
+           lb.breeding_date AS last_breeding_date,
+           lc.birth_date AS last_calving_date
+    FROM cattle c
+    LEFT JOIN (
+        SELECT cattle_id, breeding_date,
+               ROW_NUMBER() OVER (PARTITION BY cattle_id ORDER BY breeding_date DESC) AS rn
+        FROM breeding_records
+        WHERE remark IS DISTINCT FROM 'deleted' {breeding_filter}
+    ) lb ON lb.cattle_id = c.cattle_id AND lb.rn = 1
+    LEFT JOIN (
+        SELECT dam_id, birth_date,
+               ROW_NUMBER() OVER (PARTITION BY dam_id ORDER BY birth_date DESC) AS rn
+        FROM calving
+        WHERE is_active = TRUE {calving_filter}
+    ) lc ON lc.dam_id = c.cattle_id AND lc.rn = 1
+    WHERE c.is_active = TRUE {cattle_filter}
+"""
+
+DUE_QUERY = """
+    SELECT cattle_id FROM cattle
+    WHERE is_active = TRUE AND next_status_change <= %s
+"""
+
+# Ages (in months) at which the age rules move an animal to its next status
+FEMALE_AGE_THRESHOLDS = (4, 11)
+MALE_AGE_THRESHOLDS = (4, 11, 24)
+STEAMING_MONTHS = 7
+
+
+def to_date(value):
+    """Normalise DATE columns coming back as date, datetime or ISO string."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def age_in_months(birth_date, today):
+    delta = relativedelta(today, birth_date)
+    return delta.years * 12 + delta.months
+
+
+def classify_status(sex, birth_date, last_breeding_date, last_calving_date, today,
+                    current=(None, None)):
+    """Apply the herd age and reproduction rules to one animal.
+
+    Returns a (status_category, status) tuple; `current` is kept when no rule applies.
+    """
+    new_category, new_status = current
+    age_months = age_in_months(birth_date, today)
+    sex = (sex or '')[:1].upper()
+
+    # 🐄 FEMALES
+    if sex == 'F':
+        # Step 1: Age-based defaults
+        if age_months <= 3:
+            new_category, new_status = 'young_stock', 'newborn calf'
+        elif 4 <= age_months <= 10:
+            new_category, new_status = 'young_stock', 'weaned'
+        elif not last_breeding_date:
+            new_category, new_status = 'young_stock', 'bullying heifer'
+
+        # Step 2: Reproduction status
+        if last_breeding_date:
+            if not last_calving_date:
+                new_category, new_status = 'young_stock', 'in_calf heifer'
+            elif last_breeding_date > last_calving_date:
+                new_category, new_status = 'mature_stock', 'lactating in_calf'
+                if today >= last_breeding_date + relativedelta(months=STEAMING_MONTHS):
+                    new_status = 'dry'
+            else:
+                new_category, new_status = 'mature_stock', 'lactating'
+        elif last_calving_date:
+            new_category, new_status = 'mature_stock', 'lactating'
+
+    # 🐂 MALES
+    elif sex == 'M':
+        if age_months <= 3:
+            new_category, new_status = 'bull', 'newborn calf'
+        elif 4 <= age_months <= 10:
+            new_category, new_status = 'bull', 'weaned calf'
+        elif 11 <= age_months < 24:
+            new_category, new_status = 'bull', 'yearling'
+        else:
+            new_category, new_status = 'bull', 'mature bull'
+
+    return new_category, new_status
+
+
+def next_transition_date(sex, birth_date, last_breeding_date, last_calving_date, today):
+    """Date on which classify_status will next give a different answer with no new records.
+
+    Returns None when only a new breeding or calving record can move the animal on.
+    """
+    sex = (sex or '')[:1].upper()
+    candidates = []
+
+    if sex == 'F':
+        if last_breeding_date:
+            # Only lactating in_calf cows move on by themselves (to dry)
+            if last_calving_date and last_breeding_date > last_calving_date:
+                candidates.append(last_breeding_date + relativedelta(months=STEAMING_MONTHS))
+        else:
+            candidates += [birth_date + relativedelta(months=m) for m in FEMALE_AGE_THRESHOLDS]
+    elif sex == 'M':
+        candidates += [birth_date + relativedelta(months=m) for m in MALE_AGE_THRESHOLDS]
+
+    upcoming = [d for d in candidates if d > today]
+    return min(upcoming) if upcoming else None
+
+
+def classify_herd(rows, today):
+    """Classify a whole herd snapshot in memory, returning only the rows that change.
+
+    Each change is (row, (status_category, status, next_status_change)).
+    """
+    changes = []
+    skipped = 0
+    for row in rows:
+        try:
+            birth_date = to_date(row['birth_date'])
+            last_breeding = to_date(row['last_breeding_date'])
+            last_calving = to_date(row['last_calving_date'])
+        except (TypeError, ValueError) as e:
+            print(f"[SKIP] Invalid date for {row['tag_number'] or 'NoTag'}: {e}")
+            skipped += 1
+            continue
+        if birth_date is None:
+            skipped += 1
+            continue
+
+        current = (row['status_category'], row['status'])
+        category, status = classify_status(row['sex'], birth_date, last_breeding, last_calving, today, current)
+        next_change = next_transition_date(row['sex'], birth_date, last_breeding, last_calving, today)
+        if (category, status) != current or next_change != to_date(row['next_status_change']):
+            changes.append((row, (category, status, next_change)))
+    return changes, skipped
+
+
+def transition_date(row, today, backdate=False, last_event=None):
+    """When a status change took effect: today, or with `backdate` (the timer
+    path) the precomputed next_status_change it was waiting for. Never before
+    the animal's latest breeding or calving, the records a change can follow,
+    nor before `last_event`, its latest herd event, so replay order holds."""
+    due = to_date(row['next_status_change'])
+    day = due if backdate and due and due <= today else today
+    floors = [to_date(row[key]) for key in ('last_breeding_date', 'last_calving_date') if row[key]]
+    if last_event:
+        floors.append(to_date(last_event))
+    return max([day] + floors)
+
+
+def _last_event_dates(cursor, cattle_ids):
+    marks = ', '.join(['%s'] * len(cattle_ids))
+    cursor.execute(f"""
+        SELECT cattle_id, MAX(event_date) AS last_event FROM herd_events
+        WHERE cattle_id IN ({marks}) GROUP BY cattle_id
+    """, sorted(cattle_ids))
+    return {row['cattle_id']: row['last_event'] for row in cursor.fetchall()}
+
+
+def herd_state_query(cattle_ids=None):
+    """Build HERD_STATE_QUERY and its params, optionally limited to `cattle_ids`."""
+    if cattle_ids is None:
+        return HERD_STATE_QUERY.format(breeding_filter='', calving_filter='', cattle_filter=''), []
+
+    ids = sorted({int(cid) for cid in cattle_ids})
+    marks = ', '.join(['%s'] * len(ids))
+    query = HERD_STATE_QUERY.format(
+        breeding_filter=f"AND cattle_id IN ({marks})",
+        calving_filter=f"AND dam_id IN ({marks})",
+        cattle_filter=f"AND c.cattle_id IN ({marks})",
+    )
+    return query, ids * 3
+
+
+def recompute_statuses(db, cattle_ids=None, today=None, commit=True, backdate=False):
+    """Reclassify the active herd with one read and one bulk UPDATE in one transaction.
+
+    Pass `cattle_ids` to recompute only those animals, and `commit=False` to
+    leave the write in the caller's open transaction. Status changes are dated
+    today unless `backdate` (see transition_date()). Returns a summary dict:
+    animals scanned, skipped and updated, plus a count of each old → new transition.
+    """
+    today = today or date.today()
+    if cattle_ids is not None and not cattle_ids:
+        return {'scanned': 0, 'skipped': 0, 'updated': 0, 'updated_ids': [], 'transitions': {}}
+
+    cursor = db.cursor()
+    try:
+        query, params = herd_state_query(cattle_ids)
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        changes, skipped = classify_herd(rows, today)
+
+        if changes:
+            values = [(row['cattle_id'],) + new for row, new in changes]
+            bulk_update(cursor, 'cattle', 'cattle_id', ['status_category', 'status', 'next_status_change'],
+                        values, casts={'next_status_change': 'date'})
+            changed = {row['cattle_id'] for row, (category, status, _) in changes
+                       if (category, status) != (row['status_category'], row['status'])}
+            last_events = _last_event_dates(cursor, changed) if backdate and changed else {}
+            record_events(cursor, [
+                {
+                    'cattle_id': row['cattle_id'], 'event_type': 'status_change',
+                    'event_date': transition_date(row, today, backdate, last_events.get(row['cattle_id'])),
+                    'status_category': category, 'status': status,
+                    'details': {'from': [row['status_category'], row['status']]},
+                }
+                for row, (category, status, _) in changes
+                if (category, status) != (row['status_category'], row['status'])
+            ])
+        if commit:
+            db.commit()
+    except Exception:
+        if commit:
+            db.rollback()
+        raise
+
+    status_changes = [
+        (row, category, status) for row, (category, status, _) in changes
+        if (category, status) != (row['status_category'], row['status'])
+    ]
+    transitions = Counter(
+        (f"{row['status_category']}/{row['status']}", f"{category}/{status}")
+        for row, category, status in status_changes
+    )
+    return {
+        'scanned': len(rows),
+        'skipped': skipped,
+        'updated': len(status_changes),
+        'updated_ids': [row['cattle_id'] for row, _, _ in status_changes],
+        'transitions': dict(transitions),
+    }
+
+
+def recompute_due_statuses(db, today=None):
+    """Recompute only animals whose next_status_change has arrived (the daily timer wheel)."""
+    today = today or date.today()
+    cursor = db.cursor()
+    cursor.execute(DUE_QUERY, (today,))
+    due_ids = [row['cattle_id'] for row in cursor.fetchall()]
+    # A run that is late (missed days, no clock process) dates changes when they fell due
+    summary = recompute_statuses(db, cattle_ids=due_ids, today=today, backdate=True)
+    summary['due'] = len(due_ids)
+    return summary
@@ -1,8 +1,11 @@
 from datetime import datetime
 
-def determine_initial_status(sex, dob):
+MATURE_STOCK_STATUSES = ('lactating', 'lactating in_calf', 'dry', 'in_calf heifer')
+
+
+def determine_initial_status(sex, dob, today=None):
     """Determine the status and status category based on sex and age in months."""
-    today = datetime.today().date()
+    today = today or datetime.today().date()
     age_in_months = (today.year - dob.year) * 12 + (today.month - dob.month)
 
     if sex.lower() == 'male':
@@ -25,3 +28,43 @@ def determine_initial_status(sex, dob):
             return None, None
 
     return None, None
+
+
+def resolve_initial_status(sex, dob, status_category=None, status=None, today=None):
+    """(status_category, status) for a new registration; raises ValueError when it cannot be settled.
+
+    Age decides for males and for females up to 10 months. Older females take
+    the category chosen on the form: young stock are bullying heifers, mature
+    stock need a status.
+    """
+    sex = (sex or '').lower()
+    if sex not in ('male', 'female'):
+        raise ValueError("Invalid sex value.")
+    derived = determine_initial_status(sex, dob, today)
+    if derived != (None, None):
+        return derived
+    if status_category == 'young_stock':
+        return 'young_stock', 'bullying heifer'
+    if status_category == 'mature_stock':
+        if status not in MATURE_STOCK_STATUSES:
+            raise ValueError("Please select a valid status for mature stock cattle.")
+        return 'mature_stock', status
+    raise ValueError("Invalid or missing status category for female cattle over 10 months old.")
+
+
+def initial_statuses(animals, today=None):
+    """One pass over a batch of registrations, each a dict with sex, birth_date and
+    the optional status_category/status choices.
+
+    Returns ([(status_category, status)] in batch order, [(index, error)]).
+    """
+    today = today or datetime.today().date()
+    statuses, errors = [], []
+    for i, animal in enumerate(animals):
+        try:
+            statuses.append(resolve_initial_status(animal['sex'], animal['birth_date'],
+                                                   animal.get('status_category'), animal.get('status'), today))
+        except ValueError as e:
+            statuses.append((None, None))
+            errors.append((i, str(e)))
+    return statuses, errors
@@ -1,6 +1,7 @@
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
-from database import get_cursor  # Make sure this works with PostgreSQL
+from flask import g
+from app.utils.status_engine import recompute_statuses, recompute_due_statuses
 
 
 def calculate_age_in_months(birth_date):
@@ -11,114 +12,34 @@ def calculate_age_in_months(birth_date):
     return delta.years * 12 + delta.months
 
 
-def update_cattle_statuses(db):
-    cursor = get_cursor()
-    cursor.execute("SELECT * FROM cattle")
-    all_cattle = cursor.fetchall()
-
-    for c in all_cattle:
-        try:
-            b = c['birth_date']
-            if isinstance(b, str):
-                birth_date = datetime.strptime(b, "%Y-%m-%d").date()
-            elif isinstance(b, datetime):
-                birth_date = b.date()
-            elif isinstance(b, date):
-                birth_date = b
-            else:
-                raise ValueError("Unrecognized birth_date format")
+def log_transitions(summary):
+    for (old, new), count in summary['transitions'].items():
+        print(f"[STATUS UPDATE] {count} × {old} → {new}")
 
-        except Exception as e:
-            print(f"[SKIP] Invalid birth_date for {c['tag_number']}: {e}")
-            continue
 
-        age_months = calculate_age_in_months(birth_date)
-        status_category = c['status_category']
-        current_status = c['status']
-        sex = c['sex']
-        cattle_id = c['cattle_id']
-        tag_number = c['tag_number'] or 'NoTag'
-        name = c['name'] or 'Unnamed'
-
-        new_status_category = status_category
-        new_status = current_status
+def update_cattle_statuses(db):
+    """Recompute every active animal's status in one set-based pass."""
+    summary = recompute_statuses(db)
+    log_transitions(summary)
+    return summary
 
-        # 🐄 FEMALES
-        if sex == 'F':
-            # Get latest breeding record
-            cursor.execute("""
-                SELECT * FROM breeding_records
-                WHERE cattle_id = %s
-                ORDER BY breeding_date DESC LIMIT 1
-            """, (cattle_id,))
-            last_breeding = cursor.fetchone()
 
-            # Get latest calving record
-            cursor.execute("""
-                SELECT * FROM calving
-                WHERE dam_tag_number = %s
-                ORDER BY birth_date DESC LIMIT 1
-            """, (tag_number,))
-            last_calving = cursor.fetchone()
+def update_due_cattle_statuses(db):
+    """Recompute only the animals with a status transition due today or earlier."""
+    summary = recompute_due_statuses(db)
+    log_transitions(summary)
+    return summary
 
-            # Step 1: Age-based defaults
-            if age_months <= 3:
-                new_status_category = 'young_stock'
-                new_status = 'newborn calf'
-            elif 4 <= age_months <= 10:
-                new_status_category = 'young_stock'
-                new_status = 'weaned'
-            elif age_months >= 11 and not last_breeding:
-                new_status_category = 'young_stock'
-                new_status = 'bullying heifer'
 
-            # Step 2: Reproduction status
-            if last_breeding:
-                try:
-                    breeding_date = datetime.strptime(last_breeding['breeding_date'], "%Y-%m-%d")
-                except:
-                    breeding_date = None
-                if not last_calving:
-                    new_status_category = 'young_stock'
-                    new_status = 'in_calf heifer'
-                else:
-                    try:
-                        calving_date = datetime.strptime(last_calving['birth_date'], "%Y-%m-%d")
-                        if breeding_date and breeding_date > calving_date:
-                            new_status_category = 'mature_stock'
-                            new_status = 'lactating in_calf'
-                            steaming_date = breeding_date + relativedelta(months=7)
-                            if datetime.today().date() >= steaming_date.date():
-                                new_status = 'dry'
-                        else:
-                            new_status_category = 'mature_stock'
-                            new_status = 'lactating'
-                    except:
-                        pass
-            elif last_calving:
-                new_status_category = 'mature_stock'
-                new_status = 'lactating'
+def mark_status_dirty(*cattle_ids):
+    """Queue animals whose status may have changed because of the current request's writes."""
+    dirty = g.setdefault('status_dirty', set())
+    dirty.update(int(cid) for cid in cattle_ids if cid)
 
-        # 🐂 MALES
-        elif sex == 'M':
-            if age_months <= 3:
-                new_status_category = 'bull'
-                new_status = 'newborn calf'
-            elif 4 <= age_months <= 10:
-                new_status_category = 'bull'
-                new_status = 'weaned calf'
-            elif 11 <= age_months < 24:
-                new_status_category = 'bull'
-                new_status = 'yearling'
-            else:
-                new_status_category = 'bull'
-                new_status = 'mature bull'
 
-        # 🔄 Save changes
-        if new_status != current_status or new_status_category != status_category:
-            print(f"[STATUS UPDATE] {tag_number} - {name}: {status_category}/{current_status} → {new_status_category}/{new_status}")
-            cursor.execute("""
-                UPDATE cattle SET status_category = %s, status = %s
-                WHERE cattle_id = %s
-            """, (new_status_category, new_status, cattle_id))
-            db.commit()
+def flush_status_dirty(db):
+    """Recompute only the queued animals, inside the caller's open transaction."""
+    dirty = g.pop('status_dirty', set())
+    if not dirty:
+        return None
+    return recompute_statuses(db, cattle_ids=dirty, commit=False)
@@ -0,0 +1,41 @@
+from datetime import date
+
+CATTLE_PREFIX = 'TNF'   # TNF0042/07/2025: running number, then month and year of registration
+CALF_PREFIX = 'CLF'     # CLF0042: calves registered at birth
+
+
+def allocate(cursor, prefix, count=1):
+    """Reserve `count` consecutive numbers for `prefix` and return them as a range.
+
+    One UPDATE ... RETURNING on the prefix's tag_counters row: the row lock is
+    held until the caller's transaction ends, so concurrent allocations queue
+    rather than collide. A rollback returns the numbers along with the rows
+    that would have carried them.
+    """
+    if count < 1:
+        return range(0)
+    cursor.execute("""
+        UPDATE tag_counters SET last_value = last_value + %s, updated_at = NOW()
+        WHERE prefix = %s
+        RETURNING last_value
+    """, (count, prefix))
+    row = cursor.fetchone()
+    if row is None:  # a prefix seen for the first time
+        cursor.execute("""
+            INSERT INTO tag_counters (prefix, last_value) VALUES (%s, 0)
+            ON CONFLICT (prefix) DO NOTHING
+        """, (prefix,))
+        return allocate(cursor, prefix, count)
+    last = row['last_value']
+    return range(last - count + 1, last + 1)
+
+
+def cattle_tags(cursor, count=1, on=None):
+    """`count` new TNF####/MM/YYYY tags stamped with the registration month of `on` (default today)."""
+    on = on or date.today()
+    return [f"{CATTLE_PREFIX}{number:04}/{on:%m/%Y}" for number in allocate(cursor, CATTLE_PREFIX, count)]
+
+
+def calf_tags(cursor, count=1):
+    """`count` new CLF#### calf tags."""
+    return [f"{CALF_PREFIX}{number:04}" for number in allocate(cursor, CALF_PREFIX, count)]
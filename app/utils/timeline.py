@@ -0,0 +1,117 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import current_app
+from app.utils.status_engine import to_date
+
+# One animal's whole history in one round trip: its own row, then breedings,
+# calvings (as dam), herd events and monthly milk totals, each an index range
+# read on cattle_id. Everything but the milk rollup reads the *_all views, so
+# archived animals keep their timeline; their rollup rows are dropped on
+# archival, so their months are summed from milk_production_archive instead.
+# Columns a/b/c, amount and count mean different things per kind; _entry() names them.
+TIMELINE_QUERY = """
+    SELECT 'animal' AS kind, birth_date AS day, cattle_id AS ref_id,
+           tag_number AS a, name AS b, status AS c,
+           CAST(NULL AS NUMERIC) AS amount, CASE WHEN archived THEN 1 ELSE 0 END AS count
+    FROM cattle_all WHERE cattle_id = %s
+    UNION ALL
+    SELECT 'breeding', breeding_date, id, method, sire_name, pregnancy_test_result,
+           NULL, breeding_attempt_number
+    FROM breeding_records_all WHERE cattle_id = %s AND remark IS DISTINCT FROM 'deleted'
+    UNION ALL
+    SELECT 'calving', cv.birth_date, cv.calving_id, cv.calf_name, cv.calf_sex, calf.tag_number, NULL, calf.cattle_id
+    FROM calving_all cv LEFT JOIN cattle_all calf ON calf.cattle_id = cv.calf_id
+    WHERE cv.dam_id = %s AND cv.is_active = TRUE
+    UNION ALL
+    SELECT 'event', event_date, event_id, event_type, status_category, status, NULL, NULL
+    FROM herd_events_all WHERE cattle_id = %s AND event_type NOT IN ('breeding', 'calving')
+    UNION ALL
+    SELECT 'milk', month_start, NULL, NULL, NULL, NULL, total_litres, days
+    FROM milk_rollup_cow_monthly WHERE cattle_id = %s
+    UNION ALL
+    SELECT 'milk', DATE_TRUNC('month', date), NULL, NULL, NULL, NULL,
+           SUM(COALESCE(morning_milk, 0) + COALESCE(mid_day_milk, 0) + COALESCE(evening_milk, 0)), COUNT(*)
+    FROM milk_production_archive WHERE cattle_id = %s
+    GROUP BY DATE_TRUNC('month', date)
+    ORDER BY day DESC, kind, ref_id DESC
+"""
+
+# Archiving moves rows without adding an event, so the archived flag is part of the version
+TIMELINE_VERSION_QUERY = """
+    SELECT (SELECT MAX(event_id) FROM herd_events_all WHERE cattle_id = %s) AS last_event,
+           (SELECT COUNT(*) FROM cattle_archive WHERE cattle_id = %s) AS archived,
+           (SELECT MAX(updated_at) FROM milk_rollup_cow_monthly WHERE cattle_id = %s) AS milk_modified,
+           (SELECT SUM(total_litres) FROM milk_rollup_cow_monthly WHERE cattle_id = %s) AS litres
+"""
+
+_cache = OrderedDict()   # cattle_id -> (etag, timeline), least recently used first
+_cache_lock = threading.Lock()
+
+
+def timeline_version(cursor, cattle_id):
+    """ETag for one animal's timeline; moves whenever a write touches the animal.
+
+    Registrations, edits, restores, breedings, calvings (and their deletion),
+    pedigree edits and status changes all append a herd event, archival flips
+    the archived flag, and milk writes move the cow's monthly rollup. Four
+    primary-key range reads.
+    """
+    cursor.execute(TIMELINE_VERSION_QUERY, (cattle_id,) * 4)
+    row = cursor.fetchone()
+    fingerprint = f"{cattle_id}:{row['last_event']}:{row['archived']}:{row['milk_modified']}:{row['litres']}"
+    return hashlib.sha1(fingerprint.encode()).hexdigest()[:20]
+
+
+def _entry(row):
+    day = to_date(row['day'])
+    kind = row['kind']
+    entry = {'type': kind, 'date': day.isoformat() if day else None}
+    if kind == 'breeding':
+        entry.update(id=row['ref_id'], method=row['a'], sire_name=row['b'],
+                     pregnancy_test_result=row['c'], attempt=row['count'])
+    elif kind == 'calving':
+        entry.update(calving_id=row['ref_id'], calf_name=row['a'], calf_sex=row['b'],
+                     calf_tag_number=row['c'], calf_id=row['count'])
+    elif kind == 'event':
+        entry.update(event_id=row['ref_id'], event_type=row['a'], status_category=row['b'], status=row['c'])
+    elif kind == 'milk':
+        entry.update(litres=round(float(row['amount'] or 0), 2), days=row['count'])
+    return entry
+
+
+def _load(cursor, cattle_id):
+    cursor.execute(TIMELINE_QUERY, (cattle_id,) * 6)
+    animal, entries = None, []
+    for row in cursor.fetchall():
+        if row['kind'] == 'animal':
+            animal = {'cattle_id': row['ref_id'], 'tag_number': row['a'], 'name': row['b'], 'status': row['c'],
+                      'birth_date': row['day'] and to_date(row['day']).isoformat(), 'archived': bool(row['count'])}
+        else:
+            entries.append(_entry(row))
+    if animal is None:
+        return None
+    return {'animal': animal, 'entries': entries}
+
+
+def animal_timeline(cursor, cattle_id):
+    """(etag, timeline) for one animal, from this process's LRU cache while the etag holds.
+
+    timeline is None for an unknown cattle_id.
+    """
+    etag = timeline_version(cursor, cattle_id)
+    with _cache_lock:
+        cached = _cache.get(cattle_id)
+        if cached and cached[0] == etag:
+            _cache.move_to_end(cattle_id)
+            return cached
+
+    timeline = _load(cursor, cattle_id)
+    if timeline is None:
+        return etag, None
+    with _cache_lock:
+        _cache[cattle_id] = (etag, timeline)
+        _cache.move_to_end(cattle_id)
+        while len(_cache) > current_app.config['TIMELINE_CACHE_SIZE']:
+            _cache.popitem(last=False)
+    return etag, timeline
@@ -0,0 +1,93 @@
+import hashlib
+from datetime import date, datetime
+from app.utils.status_engine import to_date
+from app.utils.milk_rollups import DAY_TOTAL, month_start
+
+DEFAULT_POINTS = 250
+MAX_POINTS = 2000
+
+
+def lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets downsampling of [(x, y)] sorted by x.
+
+    Keeps the first and last points and, from each bucket in between, the
+    point forming the largest triangle with its neighbours, so peaks and
+    troughs survive while the point count drops to `threshold`.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # Average of the next bucket is the triangle's third corner
+        next_start, next_end = end, min(int((i + 2) * bucket_size) + 1, n)
+        span = next_end - next_start or 1
+        avg_x = sum(p[0] for p in points[next_start:next_end]) / span
+        avg_y = sum(p[1] for p in points[next_start:next_end]) / span
+
+        ax, ay = points[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def series_version(cursor, start, end, cattle_id=None):
+    """(etag, last_modified) for a herd or per-cow series over start..end.
+
+    Read from the rollup tables' updated_at markers, so it costs one small
+    aggregate and changes whenever a milk write touches the range.
+    """
+    if cattle_id is None:
+        cursor.execute("""
+            SELECT COUNT(*) AS n, MAX(updated_at) AS modified, SUM(total_litres) AS litres
+            FROM milk_rollup_daily WHERE date >= %s AND date <= %s
+        """, (start, end))
+    else:
+        cursor.execute("""
+            SELECT COUNT(*) AS n, MAX(updated_at) AS modified, SUM(total_litres) AS litres
+            FROM milk_rollup_cow_monthly
+            WHERE cattle_id = %s AND month_start >= %s AND month_start <= %s
+        """, (cattle_id, month_start(start), end))
+    row = cursor.fetchone()
+    modified = row['modified']
+    if isinstance(modified, str):  # SQLite returns aggregates of TIMESTAMP columns as text
+        modified = datetime.fromisoformat(modified)
+    fingerprint = f"{cattle_id}:{start}:{end}:{row['n']}:{modified}:{row['litres']}"
+    return hashlib.sha1(fingerprint.encode()).hexdigest()[:20], modified
+
+
+def daily_yield(cursor, start, end, cattle_id=None):
+    """[(date, litres)] for the herd (from the daily rollup) or one cow."""
+    if cattle_id is None:
+        cursor.execute("""
+            SELECT date, total_litres AS litres FROM milk_rollup_daily
+            WHERE date >= %s AND date <= %s AND records > 0
+            ORDER BY date
+        """, (start, end))
+    else:
+        cursor.execute(f"""
+            SELECT date, {DAY_TOTAL} AS litres FROM milk_production
+            WHERE cattle_id = %s AND date >= %s AND date <= %s
+            ORDER BY date
+        """, (cattle_id, start, end))
+    return [(to_date(row['date']), float(row['litres'] or 0)) for row in cursor.fetchall()]
+
+
+def downsample(series, points):
+    """LTTB over a [(date, litres)] series, keyed on the day ordinal."""
+    sampled = lttb([(day.toordinal(), litres) for day, litres in series], points)
+    return [(date.fromordinal(x), y) for x, y in sampled]
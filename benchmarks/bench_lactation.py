@@ -0,0 +1,78 @@
+"""Benchmark the batched lactation analytics behind /milk/milk/lactation.
+
+Run with:  python benchmarks/bench_lactation.py [--loop] [cows] [years]
+
+Generates `cows` cows (default 5000) with `years` (default 3) of daily
+records drawn from Wood's curve plus noise, calving roughly once a year,
+and times analyse_lactations over every record at once. It also checks that
+the fitted curves recover the parameters the data was drawn from. --loop
+adds a per-cow lstsq baseline on a 500-cow sample for comparison.
+"""
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.lactation import analyse_lactations  # noqa: E402
+
+
+def synthetic_records(cows, years, today, seed=42):
+    rng = np.random.default_rng(seed)
+    end = today.toordinal()
+    days = np.arange(end - 365 * years + 1, end + 1)
+
+    # Latest calving 30..400 days ago; earlier lactations a year apart
+    calved = end - rng.integers(30, 400, cows)
+    a = rng.uniform(12, 20, cows)
+    b = rng.uniform(0.15, 0.30, cows)
+    c = rng.uniform(0.002, 0.004, cows)
+
+    record_cow = np.repeat(np.arange(cows), len(days))
+    record_day = np.tile(days, cows)
+    t = (record_day - calved[record_cow]) % 365 + 1
+    litres = a[record_cow] * t ** b[record_cow] * np.exp(-c[record_cow] * t)
+    litres *= rng.lognormal(0, 0.05, len(litres))
+    return calved, record_cow, record_day, litres, (a, b, c)
+
+
+def per_cow_loop(calved, record_cow, record_day, litres, sample):
+    bounds = np.searchsorted(record_cow, np.arange(sample + 1))  # records are grouped by cow
+    for cow in range(sample):
+        days, cow_litres = record_day[bounds[cow]:bounds[cow + 1]], litres[bounds[cow]:bounds[cow + 1]]
+        mask = days > calved[cow]
+        t = (days[mask] - calved[cow]).astype(float)
+        design = np.column_stack([np.ones_like(t), np.log(t), -t])
+        np.linalg.lstsq(design, np.log(cow_litres[mask]), rcond=None)
+
+
+def run(cows, years, loop=False):
+    today = date.today()
+    calved, record_cow, record_day, litres, (a, b, c) = synthetic_records(cows, years, today)
+    print(f"{cows} cows × {years} years = {len(litres):,} daily records")
+
+    start = time.perf_counter()
+    metrics = analyse_lactations(np.arange(cows), calved, record_cow, record_day, litres, today)
+    elapsed = time.perf_counter() - start
+    print(f"batched:  {elapsed:8.3f} s   {elapsed / cows * 1e6:8.1f} µs/cow")
+
+    fitted = ~np.isnan(metrics['wood_b'])
+    b_error = np.nanmedian(np.abs(metrics['wood_b'][fitted] - b[fitted]) / b[fitted])
+    c_error = np.nanmedian(np.abs(metrics['wood_c'][fitted] - c[fitted]) / c[fitted])
+    print(f"fitted {fitted.sum()} cows; median relative error b {b_error:.1%}, c {c_error:.1%}; "
+          f"median 305-day projection {np.nanmedian(metrics['projected_305']):.0f} L")
+
+    if loop:
+        sample = min(cows, 500)
+        start = time.perf_counter()
+        per_cow_loop(calved, record_cow, record_day, litres, sample)
+        loop_elapsed = time.perf_counter() - start
+        print(f"per-cow:  {loop_elapsed:8.3f} s   {loop_elapsed / sample * 1e6:8.1f} µs/cow ({sample}-cow sample)")
+
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg.isdigit()]
+    run(int(args[0]) if args else 5000, int(args[1]) if len(args) > 1 else 3, loop='--loop' in sys.argv)
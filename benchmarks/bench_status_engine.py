@@ -0,0 +1,105 @@
+"""Benchmark the herd classification pass used by update_cattle_statuses.
+
+Run with:  python benchmarks/bench_status_engine.py [--sqlite] [sizes...]
+
+Generates a synthetic herd shaped like HERD_STATE_QUERY rows and times
+classify_herd + building the bulk UPDATE payload. With --sqlite the herd is
+loaded into a throwaway migrated SQLite database and the full
+recompute_statuses round trip (read, classify, bulk UPDATE, events) is
+timed instead. Per-animal cost should stay flat as the herd grows.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.status_engine import classify_herd, recompute_statuses  # noqa: E402
+
+
+def synthetic_herd(size, today, seed=42):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(size):
+        birth = today - timedelta(days=rng.randint(0, 365 * 10))
+        sex = rng.choice('FM')
+        breeding = calving = None
+        if sex == 'F' and rng.random() < 0.7:
+            breeding = birth + timedelta(days=rng.randint(400, max(401, (today - birth).days)))
+            if rng.random() < 0.6:
+                calving = breeding - timedelta(days=rng.randint(-300, 300))
+        rows.append({
+            'cattle_id': i + 1,
+            'tag_number': f"TNF{i + 1:05}",
+            'name': f"cow-{i + 1}",
+            'sex': sex,
+            'birth_date': birth,
+            'status': 'unknown',
+            'status_category': 'unknown',
+            'next_status_change': None,
+            'last_breeding_date': min(breeding, today) if breeding else None,
+            'last_calving_date': min(calving, today) if calving else None,
+        })
+    return rows
+
+
+def run_sqlite(sizes):
+    from app import create_app
+    from database import get_db, close_db
+    from sql_dialect import bulk_insert
+    from app.utils.migrations import upgrade
+
+    today = date.today()
+    print(f"{'animals':>10} {'seconds':>10} {'µs/animal':>10} {'updated':>10}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            app = create_app()
+            app.config['DATABASE_URL'] = os.path.join(tmp, 'bench.db')
+            with app.app_context():
+                db = get_db()
+                upgrade(db, log=lambda _: None)
+                cursor = db.cursor()
+                rows = synthetic_herd(size, today)
+                bulk_insert(cursor, 'cattle',
+                            ['cattle_id', 'name', 'tag_number', 'breed', 'birth_date', 'sex', 'status', 'status_category'],
+                            [(r['cattle_id'], r['name'], r['tag_number'], 'Friesian', r['birth_date'], r['sex'],
+                              r['status'], r['status_category']) for r in rows])
+                bulk_insert(cursor, 'breeding_records',
+                            ['cattle_id', 'method', 'breeding_date', 'breeding_attempt_number'],
+                            [(r['cattle_id'], 'AI', r['last_breeding_date'], 1) for r in rows if r['last_breeding_date']])
+                bulk_insert(cursor, 'calving',
+                            ['dam_id', 'dam_tag_number', 'dam_name', 'calf_name', 'calf_sex', 'birth_date', 'breed', 'recorded_by'],
+                            [(r['cattle_id'], r['tag_number'], r['name'], 'calf', 'Female', r['last_calving_date'], 'Friesian', 'bench')
+                             for r in rows if r['last_calving_date']])
+                db.commit()
+
+                start = time.perf_counter()
+                summary = recompute_statuses(db, today=today)
+                elapsed = time.perf_counter() - start
+                close_db()
+        print(f"{size:>10} {elapsed:>10.4f} {elapsed / size * 1e6:>10.2f} {summary['updated']:>10}")
+
+
+def run(sizes):
+    today = date.today()
+    print(f"{'animals':>10} {'seconds':>10} {'µs/animal':>10}")
+    for size in sizes:
+        rows = synthetic_herd(size, today)
+        start = time.perf_counter()
+        changes, _ = classify_herd(rows, today)
+        values = [(row['cattle_id'],) + new for row, new in changes]
+        elapsed = time.perf_counter() - start
+        assert len(values) == len(changes)
+        print(f"{size:>10} {elapsed:>10.4f} {elapsed / size * 1e6:>10.2f}")
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    sizes = [int(arg) for arg in args if arg.isdigit()] or [1_000, 10_000, 50_000, 100_000]
+    if '--sqlite' in args:
+        run_sqlite(sizes)
+    else:
+        run(sizes)
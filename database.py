@@ -1,24 +1,262 @@
 import sqlite3
 import psycopg2
 import psycopg2.extras
+import psycopg2.pool
 import os
+import threading
+import time
+from datetime import date, datetime
 from flask import g, current_app
+from sql_dialect import SQLiteConnection, SQLiteCursor
+
+# Store dates the way Postgres prints them (the implicit sqlite3 adapters are deprecated)
+# and hand DATE/TIMESTAMP columns back as objects, like psycopg2 does
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+
+
+def _convert_date(value):
+    try:
+        return date.fromisoformat(value.decode()[:10])
+    except ValueError:
+        return value.decode()
+
+def _convert_timestamp(value):
+    try:
+        return datetime.fromisoformat(value.decode())
+    except ValueError:
+        return value.decode()
+
+sqlite3.register_converter('DATE', _convert_date)
+sqlite3.register_converter('TIMESTAMP', _convert_timestamp)
+sqlite3.register_converter('DATETIME', _convert_timestamp)
+
+# 📈 Query listeners: called with (sql, seconds) after every statement
+_query_listeners = []
+
+
+def on_query(listener):
+    _query_listeners.append(listener)
+    return listener
+
+
+def _timed(execute, sql, *args):
+    started = time.perf_counter()
+    try:
+        return execute(sql, *args)
+    finally:
+        elapsed = time.perf_counter() - started
+        for listener in _query_listeners:
+            listener(sql, elapsed)
+
+
+class InstrumentedDictCursor(psycopg2.extras.RealDictCursor):
+
+    def execute(self, sql, params=None):
+        return _timed(super().execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return _timed(super().executemany, sql, seq_of_params)
+
+
+class InstrumentedTupleCursor(psycopg2.extensions.cursor):
+    """Plain-tuple rows, for streaming reads where building a dict per row dominates."""
+
+    def execute(self, sql, params=None):
+        return _timed(super().execute, sql, params)
+
+
+class InstrumentedSQLiteCursor(SQLiteCursor):
+
+    def execute(self, sql, params=()):
+        return _timed(super().execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return _timed(super().executemany, sql, seq_of_params)
+
+
+class InstrumentedSQLiteConnection(SQLiteConnection):
+
+    def cursor(self, factory=InstrumentedSQLiteCursor):
+        return super().cursor(factory)
+
+
+# 🔌 Connection pool: one per process, created lazily so each gunicorn worker
+# builds its own after fork (a pool inherited from the master is never reused).
+_pool = None
+_pool_pid = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+_last_used = {}
+_stats = {
+    'checkouts': 0,
+    'waiting': 0,
+    'checkout_ms_total': 0.0,
+    'checkout_ms_max': 0.0,
+    'health_check_failures': 0,
+    'timeouts': 0,
+}
+
+# SQLite: one connection per thread (and database file), kept open between requests
+_sqlite_local = threading.local()
+
+
+def get_db_url():
+    return current_app.config.get('DATABASE_URL') or os.getenv('DATABASE_URL')
+
+def is_postgres():
+    return get_db_url().startswith('postgresql')
+
+
+def _get_pool():
+    global _pool, _pool_pid, _pool_slots
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                min_size = current_app.config.get('DB_POOL_MIN', 1)
+                max_size = current_app.config.get('DB_POOL_MAX', 5)
+                _pool = psycopg2.pool.ThreadedConnectionPool(
+                    min_size, max_size, get_db_url(),
+                    cursor_factory=InstrumentedDictCursor
+                )
+                _pool_slots = threading.BoundedSemaphore(max_size)
+                _pool_pid = os.getpid()
+                _last_used.clear()
+    return _pool
+
+
+def _healthy(conn):
+    """Cheap liveness check; only pings connections idle longer than DB_POOL_PING_AFTER."""
+    if conn.closed:
+        return False
+    idle_for = time.monotonic() - _last_used.get(id(conn), 0)
+    if idle_for < current_app.config.get('DB_POOL_PING_AFTER', 30):
+        return True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _checkout():
+    pool = _get_pool()
+    started = time.perf_counter()
+
+    _stats['waiting'] += 1
+    try:
+        acquired = _pool_slots.acquire(timeout=current_app.config.get('DB_POOL_TIMEOUT', 10))
+    finally:
+        _stats['waiting'] -= 1
+    if not acquired:
+        _stats['timeouts'] += 1
+        raise psycopg2.pool.PoolError("Timed out waiting for a database connection")
+
+    try:
+        conn = pool.getconn()
+        if not _healthy(conn):
+            _stats['health_check_failures'] += 1
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
+    except Exception:
+        _pool_slots.release()
+        raise
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _stats['checkouts'] += 1
+    _stats['checkout_ms_total'] += elapsed_ms
+    _stats['checkout_ms_max'] = max(_stats['checkout_ms_max'], elapsed_ms)
+    return conn
+
+
+def _checkin(conn):
+    try:
+        if not conn.closed:
+            conn.rollback()  # discard anything the request left uncommitted
+        _last_used[id(conn)] = time.monotonic()
+        _pool.putconn(conn, close=bool(conn.closed))
+    finally:
+        _pool_slots.release()
+
+
+def _sqlite_path(db_url):
+    return db_url[len('sqlite:///'):] if db_url.startswith('sqlite:///') else db_url
+
+
+def _sqlite_connection(db_url):
+    """Embedded backend: WAL journal, tuned pragmas and memory-mapped reads."""
+    connections = _sqlite_local.__dict__.setdefault('connections', {})
+    conn = connections.get(db_url)
+    if conn is None:
+        conn = sqlite3.connect(_sqlite_path(db_url), factory=InstrumentedSQLiteConnection, timeout=5,
+                               detect_types=sqlite3.PARSE_DECLTYPES)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")      # durable at checkpoints, fast commits
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute(f"PRAGMA cache_size = -{int(current_app.config.get('SQLITE_CACHE_KB', 20000))}")
+        conn.execute(f"PRAGMA mmap_size = {int(current_app.config.get('SQLITE_MMAP_SIZE', 268435456))}")
+        connections[db_url] = conn
+    return conn
+
 
 def get_db():
     if 'db' not in g:
-        db_url = current_app.config.get('DATABASE_URL') or os.getenv('DATABASE_URL')
+        db_url = get_db_url()
         if db_url.startswith('postgresql'):
-            g.db = psycopg2.connect(db_url, cursor_factory=psycopg2.extras.RealDictCursor)
+            g.db = _checkout()
         else:
-            g.db = sqlite3.connect(db_url)
-            g.db.row_factory = sqlite3.Row
+            g.db = _sqlite_connection(db_url)
     return g.db
 
 def get_cursor():
     db = get_db()
     return db.cursor()
 
+def get_stream_cursor(name, itersize=2000):
+    """Cursor for reading large results in batches as they are iterated, as tuples.
+
+    Postgres gets a server-side (named) cursor fetching `itersize` rows per
+    round trip; SQLite cursors already step through results lazily.
+    """
+    db = get_db()
+    if isinstance(db, sqlite3.Connection):
+        cursor = db.cursor()
+        cursor.row_factory = None
+        return cursor
+    cursor = db.cursor(name=name, cursor_factory=InstrumentedTupleCursor)
+    cursor.itersize = itersize
+    return cursor
+
 def close_db(e=None):
     db = g.pop('db', None)
-    if db is not None:
-        db.close()
+    if db is None:
+        return
+    if isinstance(db, sqlite3.Connection):
+        db.rollback()  # connection stays open for this thread's next request
+    else:
+        _checkin(db)
+
+
+def pool_stats():
+    """Snapshot of this worker's pool usage for the metrics endpoints."""
+    if _pool is None or _pool_pid != os.getpid():
+        return {'pid': os.getpid(), 'pool': None}
+    checkouts = _stats['checkouts']
+    return {
+        'pid': os.getpid(),
+        'pool': {
+            'min': _pool.minconn,
+            'max': _pool.maxconn,
+            'in_use': len(_pool._used),
+            'idle': len(_pool._pool),
+            'waiting': _stats['waiting'],
+            'checkouts': checkouts,
+            'timeouts': _stats['timeouts'],
+            'health_check_failures': _stats['health_check_failures'],
+            'checkout_ms_avg': round(_stats['checkout_ms_total'] / checkouts, 3) if checkouts else 0.0,
+            'checkout_ms_max': round(_stats['checkout_ms_max'], 3),
+        },
+    }
@@ -0,0 +1,104 @@
+-- Baseline: the schema the routes expect. Safe on existing databases — tables
+-- are only created when missing and older copies (e.g. dairy_farm.db) get the
+-- columns they lack.
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    username TEXT UNIQUE NOT NULL,
+    password TEXT NOT NULL,
+    role TEXT DEFAULT 'user',
+    first_name TEXT,
+    last_name TEXT,
+    age INTEGER,
+    national_id TEXT,
+    address TEXT,
+    qualification TEXT,
+    email TEXT,
+    phone TEXT,
+    reset_token TEXT,
+    token_expiry TIMESTAMP,
+    profile_pic TEXT
+);
+
+CREATE TABLE IF NOT EXISTS cattle (
+    cattle_id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL,
+    tag_number TEXT NOT NULL,
+    breed TEXT NOT NULL,
+    birth_date DATE NOT NULL,
+    sex TEXT NOT NULL,
+    status TEXT,
+    status_category TEXT,
+    recorded_by TEXT,
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    remark TEXT
+);
+
+CREATE TABLE IF NOT EXISTS breeding_records (
+    id SERIAL PRIMARY KEY,
+    cattle_id INTEGER NOT NULL REFERENCES cattle (cattle_id) ON DELETE CASCADE,
+    recorded_by INTEGER,
+    method TEXT NOT NULL,
+    semen_type TEXT,
+    semen_price NUMERIC(10, 2),
+    semen_batch_number TEXT,
+    sire_name TEXT,
+    breeding_date DATE NOT NULL,
+    breeding_attempt_number INTEGER NOT NULL,
+    notes TEXT,
+    steaming_date DATE,
+    pregnancy_check_date DATE,
+    pregnancy_test_result TEXT,
+    created_at TIMESTAMP DEFAULT NOW(),
+    breeding_outcome TEXT,
+    remark TEXT,
+    expected_calving_date DATE
+);
+
+CREATE TABLE IF NOT EXISTS calving (
+    calving_id SERIAL PRIMARY KEY,
+    dam_id INTEGER REFERENCES cattle (cattle_id),
+    dam_tag_number TEXT NOT NULL,
+    dam_name TEXT NOT NULL,
+    calf_name TEXT NOT NULL,
+    calf_sex TEXT NOT NULL,
+    birth_date DATE NOT NULL,
+    breed TEXT NOT NULL,
+    calf_condition TEXT,
+    notes TEXT,
+    recorded_by TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW(),
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    remark TEXT
+);
+
+CREATE TABLE IF NOT EXISTS milk_production (
+    id SERIAL PRIMARY KEY,
+    cattle_id INTEGER NOT NULL REFERENCES cattle (cattle_id) ON DELETE CASCADE,
+    date DATE NOT NULL,
+    morning_milk NUMERIC(10, 2),
+    mid_day_milk NUMERIC(10, 2),
+    evening_milk NUMERIC(10, 2),
+    notes TEXT,
+    recorded_by INTEGER
+);
+
+-- Columns missing from older copies of the schema
+ALTER TABLE cattle ADD COLUMN IF NOT EXISTS recorded_by TEXT;
+ALTER TABLE cattle ADD COLUMN IF NOT EXISTS is_active BOOLEAN NOT NULL DEFAULT TRUE;
+ALTER TABLE cattle ADD COLUMN IF NOT EXISTS remark TEXT;
+ALTER TABLE breeding_records ADD COLUMN IF NOT EXISTS recorded_by INTEGER;
+ALTER TABLE breeding_records ADD COLUMN IF NOT EXISTS created_at TIMESTAMP;
+ALTER TABLE breeding_records ADD COLUMN IF NOT EXISTS breeding_outcome TEXT;
+ALTER TABLE breeding_records ADD COLUMN IF NOT EXISTS remark TEXT;
+ALTER TABLE breeding_records ADD COLUMN IF NOT EXISTS expected_calving_date DATE;
+ALTER TABLE calving ADD COLUMN IF NOT EXISTS dam_id INTEGER;
+ALTER TABLE calving ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+ALTER TABLE calving ADD COLUMN IF NOT EXISTS is_active BOOLEAN NOT NULL DEFAULT TRUE;
+ALTER TABLE calving ADD COLUMN IF NOT EXISTS remark TEXT;
+ALTER TABLE milk_production ADD COLUMN IF NOT EXISTS recorded_by INTEGER;
+
+-- Older calving rows only carry the dam's tag
+UPDATE calving
+SET dam_id = (SELECT cattle.cattle_id FROM cattle WHERE cattle.tag_number = calving.dam_tag_number)
+WHERE dam_id IS NULL;
@@ -0,0 +1,10 @@
+-- Date on which each animal's status next changes on its own (age thresholds,
+-- steaming). The daily job only loads rows whose date has arrived.
+ALTER TABLE cattle ADD COLUMN IF NOT EXISTS next_status_change DATE DEFAULT CURRENT_DATE;
+
+-- Existing rows have never been scheduled: make them all due on the next run
+UPDATE cattle SET next_status_change = CURRENT_DATE WHERE next_status_change IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_cattle_next_status_change
+    ON cattle (next_status_change)
+    WHERE is_active = TRUE;
@@ -0,0 +1,9 @@
+-- SQLite cannot add a column with a non-constant default; rows inserted
+-- outside the app's write paths get scheduled by the next full recompute.
+ALTER TABLE cattle ADD COLUMN IF NOT EXISTS next_status_change DATE;
+
+UPDATE cattle SET next_status_change = CURRENT_DATE WHERE next_status_change IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_cattle_next_status_change
+    ON cattle (next_status_change)
+    WHERE is_active = TRUE;
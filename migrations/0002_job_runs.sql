@@ -0,0 +1,15 @@
+-- One row per background job execution (scheduler or `flask run-job`)
+CREATE TABLE IF NOT EXISTS job_runs (
+    id SERIAL PRIMARY KEY,
+    job_name TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'running',   -- running | success | failed
+    started_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMP,
+    duration_ms INTEGER,
+    rows_touched INTEGER,
+    error TEXT,
+    host TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_runs_job_started
+    ON job_runs (job_name, started_at DESC);
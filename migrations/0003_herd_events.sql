@@ -0,0 +1,32 @@
+-- Append-only log of everything that shapes herd state. Events that carry
+-- status_category/status/is_active set the animal's state from event_date on.
+CREATE TABLE IF NOT EXISTS herd_events (
+    event_id BIGSERIAL PRIMARY KEY,
+    cattle_id INTEGER NOT NULL,
+    event_type TEXT NOT NULL,   -- baseline | registered | status_change | updated | archived | breeding | calving
+    event_date DATE NOT NULL,
+    status_category TEXT,
+    status TEXT,
+    is_active BOOLEAN,
+    details TEXT,               -- JSON
+    recorded_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_herd_events_date ON herd_events (event_date, event_id);
+CREATE INDEX IF NOT EXISTS idx_herd_events_cattle ON herd_events (cattle_id, event_id);
+
+-- Compact checkpoints of herd state: {"cattle_id": [status_category, status, is_active], ...}
+CREATE TABLE IF NOT EXISTS herd_snapshots (
+    snapshot_id SERIAL PRIMARY KEY,
+    as_of DATE NOT NULL UNIQUE,
+    last_event_id BIGINT NOT NULL,
+    animal_count INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- History starts today: seed one baseline event per existing animal
+INSERT INTO herd_events (cattle_id, event_type, event_date, status_category, status, is_active)
+SELECT cattle_id, 'baseline', CURRENT_DATE, status_category, status, is_active
+FROM cattle
+WHERE NOT EXISTS (SELECT 1 FROM herd_events);
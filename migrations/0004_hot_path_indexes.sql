@@ -0,0 +1,20 @@
+-- Indexes behind the joins and sorts on the busiest pages
+-- (milk_list, status recomputation, calving_list, cattle_list, breeding).
+
+-- milk_production: per-cow lookups by date, and the newest-first listing
+CREATE INDEX IF NOT EXISTS idx_milk_cattle_date ON milk_production (cattle_id, date);
+CREATE INDEX IF NOT EXISTS idx_milk_date_id ON milk_production (date DESC, id DESC);
+
+-- breeding_records: latest breeding per cow, eligible dams past steaming
+CREATE INDEX IF NOT EXISTS idx_breeding_cattle_date ON breeding_records (cattle_id, breeding_date DESC);
+CREATE INDEX IF NOT EXISTS idx_breeding_steaming ON breeding_records (steaming_date, cattle_id);
+CREATE INDEX IF NOT EXISTS idx_breeding_date ON breeding_records (breeding_date DESC);
+
+-- calving: latest calving per dam and the active listing (soft-deleted rows excluded)
+CREATE INDEX IF NOT EXISTS idx_calving_dam_birth ON calving (dam_id, birth_date DESC) WHERE is_active = TRUE;
+CREATE INDEX IF NOT EXISTS idx_calving_active_birth ON calving (birth_date DESC) WHERE is_active = TRUE;
+
+-- cattle: status filters and the newest-first active listing
+CREATE INDEX IF NOT EXISTS idx_cattle_active_status ON cattle (is_active, status);
+CREATE INDEX IF NOT EXISTS idx_cattle_active_id ON cattle (cattle_id DESC) WHERE is_active = TRUE;
+CREATE INDEX IF NOT EXISTS idx_cattle_tag_number ON cattle (tag_number);
@@ -0,0 +1,22 @@
+-- One milk_production row per cow per day, so a session sheet can be written
+-- with a single INSERT ... ON CONFLICT (cattle_id, date) DO UPDATE.
+
+-- Fold duplicate rows left by concurrent submissions into the oldest one
+UPDATE milk_production SET
+    morning_milk = (SELECT MAX(d.morning_milk) FROM milk_production d
+                    WHERE d.cattle_id = milk_production.cattle_id AND d.date = milk_production.date),
+    mid_day_milk = (SELECT MAX(d.mid_day_milk) FROM milk_production d
+                    WHERE d.cattle_id = milk_production.cattle_id AND d.date = milk_production.date),
+    evening_milk = (SELECT MAX(d.evening_milk) FROM milk_production d
+                    WHERE d.cattle_id = milk_production.cattle_id AND d.date = milk_production.date)
+WHERE id IN (
+    SELECT MIN(id) FROM milk_production GROUP BY cattle_id, date HAVING COUNT(*) > 1
+);
+
+DELETE FROM milk_production
+WHERE id NOT IN (SELECT MIN(id) FROM milk_production GROUP BY cattle_id, date);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_milk_cattle_date ON milk_production (cattle_id, date);
+
+-- Superseded by the unique index
+DROP INDEX IF EXISTS idx_milk_cattle_date;
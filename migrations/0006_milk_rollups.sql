@@ -0,0 +1,53 @@
+-- Pre-aggregated milk totals, kept current in the same transaction as every
+-- milk write (app/utils/milk_rollups.py). `flask rebuild-milk-rollups`
+-- regenerates them from milk_production after imports.
+
+CREATE TABLE IF NOT EXISTS milk_rollup_daily (
+    date DATE PRIMARY KEY,
+    total_litres NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    records INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS milk_rollup_weekly (
+    week_start DATE PRIMARY KEY,       -- Monday
+    total_litres NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    records INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS milk_rollup_monthly (
+    month_start DATE PRIMARY KEY,
+    total_litres NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    records INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS milk_rollup_cow_monthly (
+    cattle_id INTEGER NOT NULL REFERENCES cattle (cattle_id) ON DELETE CASCADE,
+    month_start DATE NOT NULL,
+    total_litres NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    days INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (cattle_id, month_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_milk_rollup_cow_month ON milk_rollup_cow_monthly (month_start);
+
+-- Initial fill from existing history
+INSERT INTO milk_rollup_daily (date, total_litres, records)
+SELECT date, SUM(COALESCE(morning_milk, 0) + COALESCE(mid_day_milk, 0) + COALESCE(evening_milk, 0)), COUNT(*)
+FROM milk_production
+GROUP BY date;
+
+INSERT INTO milk_rollup_weekly (week_start, total_litres, records)
+SELECT DATE_TRUNC('week', date)::date, SUM(total_litres), SUM(records)
+FROM milk_rollup_daily
+GROUP BY DATE_TRUNC('week', date)::date;
+
+INSERT INTO milk_rollup_monthly (month_start, total_litres, records)
+SELECT DATE_TRUNC('month', date)::date, SUM(total_litres), SUM(records)
+FROM milk_rollup_daily
+GROUP BY DATE_TRUNC('month', date)::date;
+
+INSERT INTO milk_rollup_cow_monthly (cattle_id, month_start, total_litres, days)
+SELECT cattle_id, DATE_TRUNC('month', date)::date,
+       SUM(COALESCE(morning_milk, 0) + COALESCE(mid_day_milk, 0) + COALESCE(evening_milk, 0)), COUNT(*)
+FROM milk_production
+GROUP BY cattle_id, DATE_TRUNC('month', date)::date;
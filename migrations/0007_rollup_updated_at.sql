@@ -0,0 +1,6 @@
+-- Change markers for the milk time-series endpoint's ETag / Last-Modified
+ALTER TABLE milk_rollup_daily ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+ALTER TABLE milk_rollup_cow_monthly ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+
+UPDATE milk_rollup_daily SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL;
+UPDATE milk_rollup_cow_monthly SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL;
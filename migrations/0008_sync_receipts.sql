@@ -0,0 +1,12 @@
+-- Idempotency receipts for offline batches posted to /sync/batch. A device
+-- retrying a batch gets the stored result for keys it already sent instead
+-- of a second write.
+CREATE TABLE IF NOT EXISTS sync_receipts (
+    idempotency_key TEXT PRIMARY KEY,
+    device_id TEXT,
+    entry_type TEXT NOT NULL,
+    result TEXT,                       -- JSON of the per-entry result
+    received_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_receipts_received ON sync_receipts (received_at);
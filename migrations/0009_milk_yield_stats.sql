@@ -0,0 +1,24 @@
+-- Rolling per-cow, per-session yield statistics (EWMA mean and variance),
+-- updated in O(1) on every milk save by app/utils/milk_anomalies.py.
+-- prev_* hold the state before the latest observation so a session re-saved
+-- for the same day replaces it instead of counting twice.
+-- `flask rebuild-milk-anomalies` regenerates the table from milk_production.
+
+CREATE TABLE IF NOT EXISTS milk_yield_stats (
+    cattle_id INTEGER NOT NULL REFERENCES cattle (cattle_id) ON DELETE CASCADE,
+    session TEXT NOT NULL,                  -- morning | mid_day | evening
+    mean DOUBLE PRECISION NOT NULL,
+    variance DOUBLE PRECISION NOT NULL DEFAULT 0,
+    samples INTEGER NOT NULL DEFAULT 0,
+    prev_mean DOUBLE PRECISION,
+    prev_variance DOUBLE PRECISION,
+    last_date DATE NOT NULL,
+    last_value DOUBLE PRECISION,
+    last_z DOUBLE PRECISION,
+    flagged BOOLEAN NOT NULL DEFAULT FALSE,
+    flagged_on DATE,
+    updated_at TIMESTAMP,
+    PRIMARY KEY (cattle_id, session)
+);
+
+CREATE INDEX IF NOT EXISTS idx_milk_yield_stats_flagged ON milk_yield_stats (flagged_on) WHERE flagged = TRUE;
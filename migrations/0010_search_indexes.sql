@@ -0,0 +1,26 @@
+-- Indexed search for the cattle, milk and user lists.
+
+-- Substring search ('%term%', case-insensitive) is served by trigram GIN
+-- indexes. pg_trgm ships with PostgreSQL's contrib package; where it cannot be
+-- installed the searches still work, just without these indexes.
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+EXCEPTION WHEN OTHERS THEN
+    RAISE NOTICE 'pg_trgm unavailable (%), substring search stays unindexed', SQLERRM;
+END
+$$;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        CREATE INDEX IF NOT EXISTS idx_cattle_name_trgm ON cattle USING gin (name gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_cattle_tag_trgm ON cattle USING gin (tag_number gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_cattle_breed_trgm ON cattle USING gin (breed gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_users_username_trgm ON users USING gin (username gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_users_email_trgm ON users USING gin (email gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_users_first_name_trgm ON users USING gin (first_name gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_users_last_name_trgm ON users USING gin (last_name gin_trgm_ops);
+    END IF;
+END
+$$;
@@ -0,0 +1,49 @@
+-- SQLite: FTS5 tables with the trigram tokenizer (SQLite 3.34+) stand in for
+-- pg_trgm. They are external-content indexes over cattle and users, kept in
+-- step by triggers, so the rows themselves are not duplicated.
+CREATE VIRTUAL TABLE IF NOT EXISTS cattle_search USING fts5(
+    name, tag_number, breed,
+    content='cattle', content_rowid='cattle_id', tokenize='trigram'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS users_search USING fts5(
+    username, email, first_name, last_name,
+    content='users', content_rowid='id', tokenize='trigram'
+);
+
+INSERT INTO cattle_search (cattle_search) VALUES ('rebuild');
+INSERT INTO users_search (users_search) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS cattle_search_insert AFTER INSERT ON cattle BEGIN
+    INSERT INTO cattle_search (rowid, name, tag_number, breed)
+    VALUES (new.cattle_id, new.name, new.tag_number, new.breed);
+END;
+
+CREATE TRIGGER IF NOT EXISTS cattle_search_delete AFTER DELETE ON cattle BEGIN
+    INSERT INTO cattle_search (cattle_search, rowid, name, tag_number, breed)
+    VALUES ('delete', old.cattle_id, old.name, old.tag_number, old.breed);
+END;
+
+CREATE TRIGGER IF NOT EXISTS cattle_search_update AFTER UPDATE OF name, tag_number, breed ON cattle BEGIN
+    INSERT INTO cattle_search (cattle_search, rowid, name, tag_number, breed)
+    VALUES ('delete', old.cattle_id, old.name, old.tag_number, old.breed);
+    INSERT INTO cattle_search (rowid, name, tag_number, breed)
+    VALUES (new.cattle_id, new.name, new.tag_number, new.breed);
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_search_insert AFTER INSERT ON users BEGIN
+    INSERT INTO users_search (rowid, username, email, first_name, last_name)
+    VALUES (new.id, new.username, new.email, new.first_name, new.last_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_search_delete AFTER DELETE ON users BEGIN
+    INSERT INTO users_search (users_search, rowid, username, email, first_name, last_name)
+    VALUES ('delete', old.id, old.username, old.email, old.first_name, old.last_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_search_update AFTER UPDATE OF username, email, first_name, last_name ON users BEGIN
+    INSERT INTO users_search (users_search, rowid, username, email, first_name, last_name)
+    VALUES ('delete', old.id, old.username, old.email, old.first_name, old.last_name);
+    INSERT INTO users_search (rowid, username, email, first_name, last_name)
+    VALUES (new.id, new.username, new.email, new.first_name, new.last_name);
+END;
@@ -0,0 +1,37 @@
+-- Tag numbers come from one counter row per prefix (TNF for registered
+-- animals, CLF for calves), bumped with UPDATE ... RETURNING so concurrent
+-- writers queue on the row lock instead of reading the same "latest" tag.
+CREATE TABLE IF NOT EXISTS tag_counters (
+    prefix TEXT PRIMARY KEY,
+    last_value INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Start each counter after the highest number already issued
+INSERT INTO tag_counters (prefix, last_value)
+SELECT 'TNF', COALESCE(MAX(CAST(SUBSTRING(tag_number FROM '[0-9]+') AS INTEGER)), 0)
+FROM cattle WHERE tag_number LIKE 'TNF%'
+ON CONFLICT (prefix) DO NOTHING;
+
+INSERT INTO tag_counters (prefix, last_value)
+SELECT 'CLF', COALESCE(MAX(CAST(SUBSTRING(tag_number FROM '[0-9]+') AS INTEGER)), 0)
+FROM cattle WHERE tag_number LIKE 'CLF%'
+ON CONFLICT (prefix) DO NOTHING;
+
+-- Duplicates handed out by the old read-the-latest-tag logic keep their tag on
+-- the first animal; later ones get their cattle_id appended so the unique
+-- index can be built and both animals stay recognisable. Each rename is logged
+-- as a 'tag_renamed' herd event, so it shows in the animal's history and an
+-- operator can find and re-tag them.
+INSERT INTO herd_events (cattle_id, event_type, event_date, status_category, status, is_active, details)
+SELECT cattle_id, 'tag_renamed', CURRENT_DATE, status_category, status, is_active,
+       '{"from": "' || REPLACE(REPLACE(tag_number, '\', '\\'), '"', '\"') ||
+       '", "to": "' || REPLACE(REPLACE(tag_number, '\', '\\'), '"', '\"') || '-' || CAST(cattle_id AS TEXT) || '"}'
+FROM cattle
+WHERE cattle_id NOT IN (SELECT MIN(cattle_id) FROM cattle GROUP BY tag_number);
+
+UPDATE cattle SET tag_number = tag_number || '-' || CAST(cattle_id AS TEXT)
+WHERE cattle_id NOT IN (SELECT MIN(cattle_id) FROM cattle GROUP BY tag_number);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_cattle_tag_number ON cattle (tag_number);
+DROP INDEX IF EXISTS idx_cattle_tag_number;
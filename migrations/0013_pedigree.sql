@@ -0,0 +1,68 @@
+-- Pedigree: each animal's dam and sire, and an ancestor closure table so
+-- ancestor/descendant lookups are one indexed read instead of a recursive walk.
+
+-- A herd sire is linked by sire_id; AI semen and outside bulls only have a
+-- name, kept in sire_name (the same text as breeding_records.sire_name).
+ALTER TABLE cattle ADD COLUMN IF NOT EXISTS dam_id INTEGER REFERENCES cattle (cattle_id);
+ALTER TABLE cattle ADD COLUMN IF NOT EXISTS sire_id INTEGER REFERENCES cattle (cattle_id);
+ALTER TABLE cattle ADD COLUMN IF NOT EXISTS sire_name TEXT;
+ALTER TABLE calving ADD COLUMN IF NOT EXISTS calf_id INTEGER REFERENCES cattle (cattle_id);
+
+-- One row per (ancestor, descendant) with the shortest path length; depth 1 is a parent
+CREATE TABLE IF NOT EXISTS cattle_ancestry (
+    ancestor_id INTEGER NOT NULL REFERENCES cattle (cattle_id) ON DELETE CASCADE,
+    descendant_id INTEGER NOT NULL REFERENCES cattle (cattle_id) ON DELETE CASCADE,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_cattle_ancestry_descendant ON cattle_ancestry (descendant_id, depth);
+CREATE INDEX IF NOT EXISTS idx_cattle_dam ON cattle (dam_id) WHERE dam_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_cattle_sire ON cattle (sire_id) WHERE sire_id IS NOT NULL;
+
+-- Backfill: calves registered by a calving carry its name and birth date
+UPDATE calving AS cv SET calf_id = calf.cattle_id
+FROM (
+    SELECT name, birth_date, MIN(cattle_id) AS cattle_id FROM cattle
+    WHERE tag_number LIKE 'CLF%'
+    GROUP BY name, birth_date
+) AS calf
+WHERE calf.name = cv.calf_name AND calf.birth_date = cv.birth_date
+  AND cv.calf_id IS NULL AND cv.is_active = TRUE;
+
+UPDATE cattle AS c SET dam_id = cv.dam_id
+FROM (
+    SELECT calf_id, MIN(dam_id) AS dam_id FROM calving
+    WHERE calf_id IS NOT NULL AND dam_id IS NOT NULL
+    GROUP BY calf_id
+) AS cv
+WHERE cv.calf_id = c.cattle_id AND c.dam_id IS NULL;
+
+-- The sire is whoever the dam's latest breeding before the birth names
+UPDATE cattle SET sire_name = (
+    SELECT b.sire_name FROM breeding_records b
+    WHERE b.cattle_id = cattle.dam_id AND b.breeding_date <= cattle.birth_date
+      AND b.remark IS DISTINCT FROM 'deleted'
+    ORDER BY b.breeding_date DESC LIMIT 1
+)
+WHERE dam_id IS NOT NULL AND sire_name IS NULL;
+
+UPDATE cattle SET sire_id = (
+    SELECT s.cattle_id FROM cattle s WHERE s.tag_number = cattle.sire_name AND s.cattle_id <> cattle.cattle_id
+)
+WHERE sire_name IS NOT NULL AND sire_id IS NULL;
+
+INSERT INTO cattle_ancestry (ancestor_id, descendant_id, depth)
+WITH RECURSIVE parent_links (child, parent) AS (
+    SELECT cattle_id, dam_id FROM cattle WHERE dam_id IS NOT NULL
+    UNION ALL
+    SELECT cattle_id, sire_id FROM cattle WHERE sire_id IS NOT NULL
+), lineage (descendant_id, ancestor_id, depth) AS (
+    SELECT child, parent, 1 FROM parent_links
+    UNION ALL
+    SELECT l.descendant_id, p.parent, l.depth + 1
+    FROM lineage l JOIN parent_links p ON p.child = l.ancestor_id
+    WHERE l.depth < 64
+)
+SELECT ancestor_id, descendant_id, MIN(depth) FROM lineage
+GROUP BY ancestor_id, descendant_id;
@@ -0,0 +1,155 @@
+-- Cold storage for animals inactive longer than ARCHIVE_AFTER_DAYS, with all
+-- their history (`flask archive-inactive` moves them, `flask restore-animal`
+-- brings one back). Each archive table mirrors its hot table column for
+-- column, keeps the original ids, and stamps archived_at. No foreign keys:
+-- a calving kept here may name a calf that is still in the live herd.
+CREATE TABLE IF NOT EXISTS cattle_archive (
+    cattle_id INTEGER PRIMARY KEY,
+    name TEXT,
+    tag_number TEXT,
+    breed TEXT,
+    birth_date DATE,
+    sex TEXT,
+    status TEXT,
+    status_category TEXT,
+    recorded_by TEXT,
+    is_active BOOLEAN,
+    remark TEXT,
+    next_status_change DATE,
+    dam_id INTEGER,
+    sire_id INTEGER,
+    sire_name TEXT,
+    archived_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS breeding_records_archive (
+    id INTEGER PRIMARY KEY,
+    cattle_id INTEGER NOT NULL,
+    recorded_by INTEGER,
+    method TEXT,
+    semen_type TEXT,
+    semen_price NUMERIC(10, 2),
+    semen_batch_number TEXT,
+    sire_name TEXT,
+    breeding_date DATE,
+    breeding_attempt_number INTEGER,
+    notes TEXT,
+    steaming_date DATE,
+    pregnancy_check_date DATE,
+    pregnancy_test_result TEXT,
+    created_at TIMESTAMP,
+    breeding_outcome TEXT,
+    remark TEXT,
+    expected_calving_date DATE,
+    archived_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS calving_archive (
+    calving_id INTEGER PRIMARY KEY,
+    dam_id INTEGER,
+    dam_tag_number TEXT,
+    dam_name TEXT,
+    calf_name TEXT,
+    calf_sex TEXT,
+    birth_date DATE,
+    breed TEXT,
+    calf_condition TEXT,
+    notes TEXT,
+    recorded_by TEXT,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    is_active BOOLEAN,
+    remark TEXT,
+    calf_id INTEGER,
+    archived_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS milk_production_archive (
+    id INTEGER PRIMARY KEY,
+    cattle_id INTEGER NOT NULL,
+    date DATE,
+    morning_milk NUMERIC(10, 2),
+    mid_day_milk NUMERIC(10, 2),
+    evening_milk NUMERIC(10, 2),
+    notes TEXT,
+    recorded_by INTEGER,
+    archived_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS herd_events_archive (
+    event_id BIGINT PRIMARY KEY,
+    cattle_id INTEGER NOT NULL,
+    event_type TEXT NOT NULL,
+    event_date DATE NOT NULL,
+    status_category TEXT,
+    status TEXT,
+    is_active BOOLEAN,
+    details TEXT,
+    recorded_at TIMESTAMP,
+    archived_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Archival deletes cattle rows in bulk; every delete checks the tables that
+-- reference cattle, which needs a plain index on each referencing column
+CREATE INDEX IF NOT EXISTS idx_calving_dam ON calving (dam_id);
+CREATE INDEX IF NOT EXISTS idx_calving_calf ON calving (calf_id) WHERE calf_id IS NOT NULL;
+
+-- Restores find an animal's rows by cattle_id; reports filter on the same dates as the hot tables
+CREATE INDEX IF NOT EXISTS idx_cattle_archive_tag ON cattle_archive (tag_number);
+CREATE INDEX IF NOT EXISTS idx_breeding_archive_cattle ON breeding_records_archive (cattle_id, breeding_date);
+CREATE INDEX IF NOT EXISTS idx_breeding_archive_date ON breeding_records_archive (breeding_date);
+CREATE INDEX IF NOT EXISTS idx_calving_archive_dam ON calving_archive (dam_id, birth_date);
+CREATE INDEX IF NOT EXISTS idx_calving_archive_birth ON calving_archive (birth_date);
+CREATE INDEX IF NOT EXISTS idx_milk_archive_cattle_date ON milk_production_archive (cattle_id, date);
+CREATE INDEX IF NOT EXISTS idx_milk_archive_date ON milk_production_archive (date);
+CREATE INDEX IF NOT EXISTS idx_herd_events_archive_cattle ON herd_events_archive (cattle_id, event_id);
+CREATE INDEX IF NOT EXISTS idx_herd_events_archive_date ON herd_events_archive (event_date, event_id);
+
+-- Hot and cold rows together, for reports and history. Each branch keeps its own indexes.
+DROP VIEW IF EXISTS cattle_all;
+CREATE VIEW cattle_all AS
+    SELECT cattle_id, name, tag_number, breed, birth_date, sex, status, status_category, recorded_by,
+           is_active, remark, next_status_change, dam_id, sire_id, sire_name, FALSE AS archived
+    FROM cattle
+    UNION ALL
+    SELECT cattle_id, name, tag_number, breed, birth_date, sex, status, status_category, recorded_by,
+           is_active, remark, next_status_change, dam_id, sire_id, sire_name, TRUE
+    FROM cattle_archive;
+
+DROP VIEW IF EXISTS breeding_records_all;
+CREATE VIEW breeding_records_all AS
+    SELECT id, cattle_id, recorded_by, method, semen_type, semen_price, semen_batch_number, sire_name,
+           breeding_date, breeding_attempt_number, notes, steaming_date, pregnancy_check_date,
+           pregnancy_test_result, created_at, breeding_outcome, remark, expected_calving_date
+    FROM breeding_records
+    UNION ALL
+    SELECT id, cattle_id, recorded_by, method, semen_type, semen_price, semen_batch_number, sire_name,
+           breeding_date, breeding_attempt_number, notes, steaming_date, pregnancy_check_date,
+           pregnancy_test_result, created_at, breeding_outcome, remark, expected_calving_date
+    FROM breeding_records_archive;
+
+DROP VIEW IF EXISTS calving_all;
+CREATE VIEW calving_all AS
+    SELECT calving_id, dam_id, dam_tag_number, dam_name, calf_name, calf_sex, birth_date, breed,
+           calf_condition, notes, recorded_by, created_at, updated_at, is_active, remark, calf_id
+    FROM calving
+    UNION ALL
+    SELECT calving_id, dam_id, dam_tag_number, dam_name, calf_name, calf_sex, birth_date, breed,
+           calf_condition, notes, recorded_by, created_at, updated_at, is_active, remark, calf_id
+    FROM calving_archive;
+
+DROP VIEW IF EXISTS milk_production_all;
+CREATE VIEW milk_production_all AS
+    SELECT id, cattle_id, date, morning_milk, mid_day_milk, evening_milk, notes, recorded_by
+    FROM milk_production
+    UNION ALL
+    SELECT id, cattle_id, date, morning_milk, mid_day_milk, evening_milk, notes, recorded_by
+    FROM milk_production_archive;
+
+DROP VIEW IF EXISTS herd_events_all;
+CREATE VIEW herd_events_all AS
+    SELECT event_id, cattle_id, event_type, event_date, status_category, status, is_active, details, recorded_at
+    FROM herd_events
+    UNION ALL
+    SELECT event_id, cattle_id, event_type, event_date, status_category, status, is_active, details, recorded_at
+    FROM herd_events_archive;
@@ -8,7 +8,10 @@ from scheduler import start_scheduler  # ✅ Starts automated background tasks
 app = create_app()
 
 # ✅ Start any background jobs (e.g., updating statuses)
-start_scheduler()
+# Off by default: the `clock` process runs scheduler.py. Only enable it for a
+# single-process deployment, or every web worker starts its own timer.
+if app.config.get('SCHEDULER_ENABLED'):
+    start_scheduler(app)
 
 # ✅ Development-only run block
 if __name__ == '__main__':
@@ -1,16 +1,39 @@
 # scheduler.py
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.blocking import BlockingScheduler
 from datetime import datetime
-from database import get_db
-from app.utils.status_updater import update_cattle_statuses
+from app.utils.job_runner import run_job
+import app.jobs  # noqa: F401  (registers jobs)
 
-def start_scheduler():
-    scheduler = BackgroundScheduler()
+# In run order: statuses first, so snapshots and rollups see today's herd
+DAILY_JOBS = ['status_check', 'herd_snapshot', 'milk_rollups', 'sync_receipts_prune', 'cold_archive']
+
+
+def start_scheduler(app, blocking=False):
+    """Schedule the periodic jobs. Meant for the single `clock` process; a job
+    that already succeeded today is skipped, so a scheduler started elsewhere
+    by mistake does not repeat the day's work."""
+    scheduler = BlockingScheduler() if blocking else BackgroundScheduler()
 
     @scheduler.scheduled_job('interval', days=1)
     def daily_status_check():
         print(f"[SCHEDULER] ✅ Running cattle status update at {datetime.now()}")
-        db = get_db()
-        update_cattle_statuses(db)
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        with app.app_context():
+            for name in DAILY_JOBS:
+                # A failure is already recorded in job_runs; the other jobs still run
+                try:
+                    run_job(name, since=today)
+                except Exception as e:
+                    print(f"[SCHEDULER] ❌ {name} failed: {e}")
 
     scheduler.start()
+
+
+# ✅ Standalone clock process: `python scheduler.py` (keeps batch work off web workers)
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from app import create_app
+    start_scheduler(create_app(), blocking=True)
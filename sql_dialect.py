@@ -0,0 +1,202 @@
+# sql_dialect.py — run the app's PostgreSQL-flavoured SQL on SQLite
+import re
+import sqlite3
+from functools import lru_cache
+import psycopg2.extras
+
+# SQLite's default SQLITE_MAX_VARIABLE_NUMBER since 3.32
+SQLITE_MAX_VARIABLES = 32766
+
+_TRUNC_MODIFIERS = {
+    'day': [],
+    'week': ["'weekday 0'", "'-6 days'"],   # Monday, like Postgres
+    'month': ["'start of month'"],
+    'year': ["'start of year'"],
+}
+
+_INTERVAL = re.compile(
+    r"(?P<operand>CURRENT_DATE|CURRENT_TIMESTAMP|\?|[\w.]+|\))\s*(?P<op>[+-])\s*"
+    r"INTERVAL\s*'(?P<amount>\d+)\s*(?P<unit>[a-z]+?)s?'",
+    re.IGNORECASE
+)
+
+_SIMPLE_REWRITES = [
+    (re.compile(r"\bSUBSTRING\(\s*([\w.]+)\s+FROM\s+('[^']*')\s*\)", re.I), r"regexp_substr(\1, \2)"),
+    (re.compile(r"\bIS\s+NOT\s+DISTINCT\s+FROM\b", re.I), "IS"),
+    (re.compile(r"\bIS\s+DISTINCT\s+FROM\b", re.I), "IS NOT"),
+    (re.compile(r"\bILIKE\b", re.I), "LIKE"),
+    (re.compile(r"\bNOW\(\)", re.I), "CURRENT_TIMESTAMP"),
+    (re.compile(r"\b(?:BIG)?SERIAL\s+PRIMARY\s+KEY\b", re.I), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\bJSONB\b", re.I), "TEXT"),
+    (re.compile(r"::[a-z_]+(?:\[\])?", re.I), ""),
+]
+
+
+def _matching_paren(sql, open_index):
+    depth = 0
+    for i in range(open_index, len(sql)):
+        if sql[i] == '(':
+            depth += 1
+        elif sql[i] == ')':
+            depth -= 1
+            if depth == 0:
+                return i
+    raise ValueError(f"Unbalanced parentheses in: {sql}")
+
+
+def _opening_paren(sql, close_index):
+    depth = 0
+    for i in range(close_index, -1, -1):
+        if sql[i] == ')':
+            depth += 1
+        elif sql[i] == '(':
+            depth -= 1
+            if depth == 0:
+                return i
+    raise ValueError(f"Unbalanced parentheses in: {sql}")
+
+
+def _rewrite_date_trunc(sql):
+    pattern = re.compile(r"DATE_TRUNC\(\s*'(\w+)'\s*,", re.IGNORECASE)
+    while True:
+        match = pattern.search(sql)
+        if not match:
+            return sql
+        unit = match.group(1).lower()
+        open_index = sql.index('(', match.start())
+        close_index = _matching_paren(sql, open_index)
+        expr = sql[match.end():close_index].strip()
+        args = ', '.join([expr] + _TRUNC_MODIFIERS[unit])
+        sql = f"{sql[:match.start()]}date({args}){sql[close_index + 1:]}"
+
+
+def _rewrite_intervals(sql):
+    while True:
+        match = _INTERVAL.search(sql)
+        if not match:
+            return sql
+        start = match.start('operand')
+        operand = match.group('operand')
+        if operand == ')':
+            start = _opening_paren(sql, match.start('operand'))
+            # include a function name directly before the parenthesis
+            while start > 0 and (sql[start - 1].isalnum() or sql[start - 1] == '_'):
+                start -= 1
+            operand = sql[start:match.end('operand')]
+
+        amount, unit = int(match.group('amount')), match.group('unit').lower()
+        if unit == 'week':
+            amount, unit = amount * 7, 'day'
+        func = 'datetime' if unit in ('hour', 'minute', 'second') or operand.upper() == 'CURRENT_TIMESTAMP' else 'date'
+        if operand.upper() == 'CURRENT_DATE':
+            operand = "'now'"
+        modifier = f"'{match.group('op')}{amount} {unit}s'"
+        sql = f"{sql[:start]}{func}({operand}, {modifier}){sql[match.end():]}"
+
+
+@lru_cache(maxsize=1024)
+def translate(sql):
+    """Rewrite one PostgreSQL statement for SQLite (placeholders, dates, ILIKE, ...)."""
+    sql = _rewrite_date_trunc(sql)
+    sql = _rewrite_intervals(sql)
+    for pattern, replacement in _SIMPLE_REWRITES:
+        sql = pattern.sub(replacement, sql)
+    return sql.replace('%%', '\0').replace('%s', '?').replace('\0', '%')
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class SQLiteCursor(sqlite3.Cursor):
+    """sqlite3 cursor that accepts the app's Postgres SQL and returns dict rows."""
+
+    def execute(self, sql, params=()):
+        return super().execute(translate(sql), tuple(params or ()))
+
+    def executemany(self, sql, seq_of_params):
+        return super().executemany(translate(sql), seq_of_params)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _regexp_substr(value, pattern):
+    match = re.search(pattern, value) if value is not None else None
+    return match.group(0) if match else None
+
+
+class SQLiteConnection(sqlite3.Connection):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.row_factory = _dict_row
+        self.create_function('regexp_substr', 2, _regexp_substr, deterministic=True)
+
+    def cursor(self, factory=SQLiteCursor):
+        return super().cursor(factory)
+
+
+def is_sqlite(cursor_or_conn):
+    return isinstance(cursor_or_conn, (sqlite3.Cursor, sqlite3.Connection))
+
+
+def bulk_insert(cursor, table, columns, rows, returning=None, on_conflict=None):
+    """Insert many rows with multi-row VALUES; returns RETURNING rows when asked.
+
+    `on_conflict` is the clause after ON CONFLICT, e.g.
+    "(cattle_id, date) DO UPDATE SET notes = EXCLUDED.notes" (both backends accept it).
+    """
+    if not rows:
+        return []
+    column_sql = ', '.join(columns)
+    suffix_sql = f" ON CONFLICT {on_conflict}" if on_conflict else ""
+    suffix_sql += f" RETURNING {returning}" if returning else ""
+
+    if not is_sqlite(cursor):
+        return psycopg2.extras.execute_values(
+            cursor, f"INSERT INTO {table} ({column_sql}) VALUES %s{suffix_sql}",
+            rows, page_size=len(rows), fetch=bool(returning)
+        ) or []
+
+    results = []
+    row_marks = '(' + ', '.join(['?'] * len(columns)) + ')'
+    chunk = max(1, SQLITE_MAX_VARIABLES // len(columns))
+    for i in range(0, len(rows), chunk):
+        batch = rows[i:i + chunk]
+        sql = f"INSERT INTO {table} ({column_sql}) VALUES {', '.join([row_marks] * len(batch))}{suffix_sql}"
+        cursor.execute(sql, [value for row in batch for value in row])
+        if returning:
+            results += cursor.fetchall()
+    return results
+
+
+def bulk_update(cursor, table, key, columns, rows, casts=None):
+    """Update many rows keyed by `key`; each row is (key_value, *column_values).
+
+    Postgres gets one UPDATE ... FROM (VALUES ...); `casts` maps columns to a
+    type for VALUES lists where every value may be NULL. SQLite uses executemany.
+    """
+    if not rows:
+        return
+    casts = casts or {}
+
+    if not is_sqlite(cursor):
+        assignments = ', '.join(
+            f"{col} = v.{col}" + (f"::{casts[col]}" if col in casts else '') for col in columns
+        )
+        psycopg2.extras.execute_values(cursor, f"""
+            UPDATE {table} AS t SET {assignments}
+            FROM (VALUES %s) AS v({key}, {', '.join(columns)})
+            WHERE t.{key} = v.{key}
+        """, rows, page_size=len(rows))
+        return
+
+    assignments = ', '.join(f"{col} = ?" for col in columns)
+    cursor.executemany(
+        f"UPDATE {table} SET {assignments} WHERE {key} = ?",
+        [tuple(row[1:]) + (row[0],) for row in rows]
+    )